@@ -0,0 +1,130 @@
+# Some licensing message
+#
+# Command line of the benchmark suite:
+#
+#   python -m benchmarks run [--cases aggregate ...] [--modes 2 3 ...] [--repeats N] [--save-baseline]
+#   python -m benchmarks compare [--threshold 0.2]
+#   python -m benchmarks backends [--sizes 2 3 ...] [--shots N] [--table FILE]
+#   python -m benchmarks imports [--modules base ...] [--budget SECONDS]
+#
+import argparse
+import json
+import os
+import sys
+import time
+
+from .harness import append_to_history, compare_runs, load_history, run_cases
+
+DIRECTORY = os.path.dirname (os.path.abspath (__file__))
+DEFAULT_HISTORY = os.path.join (DIRECTORY, "history.json")
+DEFAULT_BASELINE = os.path.join (DIRECTORY, "baseline.json")
+DEFAULT_BACKEND_HISTORY = os.path.join (DIRECTORY, "backend_history.json")
+DEFAULT_BACKEND_TABLE = os.path.join (DIRECTORY, "backend_recommendations.json")
+
+def print_measurement (measurement):
+    print ("{:<30} m={:<3} {:>12.6f} s {:>14} B {:>10} blocks".format (measurement ["case"], measurement ["modes"], measurement ["wall_time"],
+                                                                     measurement ["peak_memory"], measurement ["allocated_blocks"]))
+
+def run (arguments) -> int:
+    from .cases import get_cases
+
+    run_ = run_cases (get_cases (arguments.cases), arguments.modes, arguments.repeats, print_measurement)
+    append_to_history (arguments.history, run_)
+    if arguments.save_baseline:
+        with open (arguments.baseline, "w") as baseline_file:
+            json.dump (run_, baseline_file, indent=1)
+    return 0
+
+def compare (arguments) -> int:
+    history = load_history (arguments.history)
+    if not history:
+        print ("No run in {}.".format (arguments.history))
+        return 2
+    if not os.path.exists (arguments.baseline):
+        print ("No baseline in {}, store one with run --save-baseline.".format (arguments.baseline))
+        return 2
+    with open (arguments.baseline) as baseline_file:
+        baseline = json.load (baseline_file)
+
+    comparisons = compare_runs (baseline, history [-1], arguments.threshold)
+    for comparison in comparisons:
+        print ("{:<30} m={:<3} time x{:<8.3f} memory x{:<8.3f} {}".format (comparison ["case"], comparison ["modes"], comparison ["time_ratio"],
+                                                                         comparison ["memory_ratio"], "REGRESSION" if comparison ["regressed"] else ""))
+
+    regressions = sum (comparison ["regressed"] for comparison in comparisons)
+    print ("{} regressions over {} measurements (threshold {:.0%}).".format (regressions, len (comparisons), arguments.threshold))
+    return 1 if regressions else 0
+
+def print_backend_measurement (measurement):
+    if "error" in measurement:
+        outcome = measurement ["error"][:60]
+    else:
+        outcome = "{:>10.4f} s  error {:.2e}{}".format (measurement ["time"], max (measurement ["errors"].values ()),
+                                                      "" if measurement ["accurate"] else "  INACCURATE")
+    print ("{:<22} {:<9} n=m={:<3} {}".format (measurement ["backend"], measurement ["mode"], measurement ["modes"], outcome))
+
+def backends (arguments) -> int:
+    from base.devices import DeviceMode
+    from .backends import benchmark_backends, recommend_backends
+
+    modes = None if not arguments.device_modes else [DeviceMode (mode) for mode in arguments.device_modes]
+    measurements = benchmark_backends (arguments.sizes, modes, arguments.backends, arguments.shots, report=print_backend_measurement)
+    append_to_history (arguments.backend_history, {"timestamp": time.time (), "results": measurements})
+
+    recommendations = recommend_backends (measurements)
+    recommendations.save (arguments.table)
+    print ()
+    for row in recommendations.to_rows ():
+        print ("{:<9} n={:<3} m={:<3} {:<22} {:.4f} s".format (row ["mode"], row ["photons"], row ["modes"], row ["backend"], row ["time"]))
+    return 0
+
+def imports (arguments) -> int:
+    from .imports import find_import_regressions, measure_imports
+
+    measurements = measure_imports (arguments.modules, arguments.repeats)
+    for measurement in measurements:
+        print ("{:<50} {:>8.3f} s {}".format (measurement ["module"], measurement ["time"], "perceval" if measurement ["perceval"] else ""))
+
+    regressions = find_import_regressions (measurements, arguments.budget)
+    for regression in regressions:
+        print ("{} should import without Perceval{}.".format (regression ["module"], "" if arguments.budget is None else
+                                                               " in less than {} s".format (arguments.budget)))
+    return 1 if regressions else 0
+
+def main (argv=None) -> int:
+    parser = argparse.ArgumentParser (prog="python -m benchmarks", description="Benchmarks of the certification hot paths.")
+    parser.add_argument ("--history", default=DEFAULT_HISTORY, help="The JSON history of the runs.")
+    parser.add_argument ("--baseline", default=DEFAULT_BASELINE, help="The JSON file of the reference run.")
+    commands = parser.add_subparsers (dest="command", required=True)
+
+    run_parser = commands.add_parser ("run", help="Measure the cases and append the run to the history.")
+    run_parser.add_argument ("--cases", nargs="*", help="The cases to run. Defaults to every case.")
+    run_parser.add_argument ("--modes", nargs="*", type=int, help="The numbers of modes. Defaults to 2 to 16.")
+    run_parser.add_argument ("--repeats", type=int, help="The number of timed runs of each measurement.")
+    run_parser.add_argument ("--save-baseline", action="store_true", help="Also store the run as the baseline.")
+    run_parser.set_defaults (function=run)
+
+    compare_parser = commands.add_parser ("compare", help="Compare the last run of the history with the baseline.")
+    compare_parser.add_argument ("--threshold", type=float, default=0.2, help="The relative slowdown flagged as a regression.")
+    compare_parser.set_defaults (function=compare)
+
+    backends_parser = commands.add_parser ("backends", help="Measure the local backends on the standard experiments and write the recommendation table.")
+    backends_parser.add_argument ("--sizes", nargs="*", type=int, help="The numbers of modes, with one photon per mode. Defaults to 2 to 6.")
+    backends_parser.add_argument ("--backends", nargs="*", help="The local backends. Defaults to every backend.")
+    backends_parser.add_argument ("--device-modes", nargs="*", choices=["Sampler", "Analyzer"], help="The device modes. Defaults to both.")
+    backends_parser.add_argument ("--shots", type=int, default=1000, help="The number of samples of the sampler.")
+    backends_parser.add_argument ("--backend-history", default=DEFAULT_BACKEND_HISTORY, help="The JSON history of the backend measurements.")
+    backends_parser.add_argument ("--table", default=DEFAULT_BACKEND_TABLE, help="The recommendation table to write.")
+    backends_parser.set_defaults (function=backends)
+
+    imports_parser = commands.add_parser ("imports", help="Measure the cold import time of the packages.")
+    imports_parser.add_argument ("--modules", nargs="*", help="The modules. Defaults to the light modules and the Perceval integration.")
+    imports_parser.add_argument ("--repeats", type=int, default=3, help="The number of fresh interpreters per module.")
+    imports_parser.add_argument ("--budget", type=float, help="The largest import time of a light module, in seconds.")
+    imports_parser.set_defaults (function=imports)
+
+    arguments = parser.parse_args (argv)
+    return arguments.function (arguments)
+
+if __name__ == "__main__":
+    sys.exit (main ())
@@ -0,0 +1,142 @@
+# Some licensing message
+#
+# This piece of code runs the standard bunching and variance experiments on every local Quandela
+# backend over a grid of sizes, and turns the measurements into the recommendation table that
+# QuandelaDeviceFactory consults.
+#
+import math
+import time
+import numpy as np
+
+from typing import Any, Callable, Dict, List, Optional
+
+from base.circuit_helpers import generate_fourier_transform_circuit
+from base.devices import DeviceMode
+from base.fock_space import FockSpaceIndex
+from base.logger import get_logger
+from base.permanents import permanents
+from base.results import StatesAndProbabilities
+from photonic_indistinguishability_measures.bunching import BunchingCalculator
+from photonic_indistinguishability_measures.variance import Variance
+from quandela.backend_selection import BackendRecommendations
+from quandela.quandela_devices import QuandelaDeviceFactory, QuandelaLocalDevices
+
+logger = get_logger (__name__)
+
+DEFAULT_SIZES = [2, 3, 4, 5, 6]
+
+def exact_distribution (unitary: np.ndarray, input_pattern: List[int]) -> StatesAndProbabilities:
+    """
+    Compute the exact output distribution of indistinguishable photons with permanents.
+
+    Parameters:
+    unitary (np.ndarray): The unitary of the circuit, indexed by [output][input].
+    input_pattern (List[int]): The occupation of each input mode.
+
+    Returns:
+    StatesAndProbabilities: The probability of every output state.
+    """
+    number_of_modes = len (input_pattern)
+    index = FockSpaceIndex (sum (input_pattern), number_of_modes)
+    patterns = index.unrank (np.arange (index.size))
+    columns = np.repeat (np.arange (number_of_modes), input_pattern)
+
+    submatrices = np.array ([unitary [np.ix_ (np.repeat (np.arange (number_of_modes), pattern), columns)] for pattern in patterns])
+    factorials = np.array ([float (np.prod ([math.factorial (o) for o in pattern])) for pattern in patterns])
+    input_factorial = float (np.prod ([math.factorial (o) for o in input_pattern]))
+    return index.from_dense (np.abs (permanents (submatrices)) ** 2 / (factorials * input_factorial))
+
+def exact_values (number_of_modes: int) -> Dict[str, float]:
+    """
+    The exact full bunching probability and expected variance of the standard experiments.
+    """
+    results = exact_distribution (generate_fourier_transform_circuit (number_of_modes).m, [1] * number_of_modes)
+    return {"bunching": BunchingCalculator (None, number_of_modes).calculate_full_bunching_probability (results),
+            "variance": Variance (None, number_of_modes).calculate_expected_variance (results, number_of_modes)}
+
+def run_standard_experiments (device: Any, number_of_modes: int) -> Dict[str, float]:
+    """
+    Run the full bunching and expected variance experiments of indistinguishable photons on a device.
+    """
+    return {"bunching": BunchingCalculator (device, number_of_modes).do_the_experiments_for_full_bunching_indistinguishable_case (),
+            "variance": Variance (device, number_of_modes).execute_experiment_variance_indistinguishable_scenario (number_of_modes)}
+
+def benchmark_backends (sizes: Optional[List[int]] = None, modes: Optional[List[DeviceMode]] = None, backends: Optional[List[str]] = None,
+                        number_of_samples: int = 1000, sampler_tolerance: Optional[float] = None, exact_tolerance: float = 1e-6,
+                        report: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Run the standard experiments on every local backend, device mode and size.
+
+    Each size m sends one photon in each of the m modes of the Fourier circuit. The values are
+    compared to the exact ones: a sampler result is accurate when it is within the sampler
+    tolerance, an analyzer result when it is within the exact tolerance. Backends that fail
+    are recorded with their error.
+
+    Parameters:
+    sizes (Optional[List[int]]): The numbers of modes. Defaults to 2 to 6.
+    modes (Optional[List[DeviceMode]]): The device modes. Defaults to both.
+    backends (Optional[List[str]]): The local processor names. Defaults to every QuandelaLocalDevices but auto.
+    number_of_samples (int): The shots of the sampler.
+    sampler_tolerance (Optional[float]): The largest error of an accurate sampler result. Defaults to 5/sqrt(shots).
+    exact_tolerance (float): The largest error of an accurate analyzer result.
+    report (Optional[Callable[[Dict[str, Any]], None]]): Called with each measurement as soon as it is done.
+
+    Returns:
+    List[Dict[str, Any]]: The measurements, with the time to result, the errors and the accuracy of each run.
+    """
+    sizes = DEFAULT_SIZES if sizes is None else sizes
+    modes = list (DeviceMode) if modes is None else modes
+    if backends is None:
+        backends = [backend.value for backend in QuandelaLocalDevices if backend != QuandelaLocalDevices.AUTO]
+    if sampler_tolerance is None:
+        sampler_tolerance = 5 / math.sqrt (number_of_samples)
+
+    factory = QuandelaDeviceFactory ()
+    measurements = []
+    for number_of_modes in sizes:
+        exact = exact_values (number_of_modes)
+        for mode in modes:
+            tolerance = sampler_tolerance if mode == DeviceMode.SAMPLER else exact_tolerance
+            for backend in backends:
+                measurement = {"backend": backend, "mode": mode.value, "photons": number_of_modes, "modes": number_of_modes,
+                               "shots": number_of_samples if mode == DeviceMode.SAMPLER else None}
+                try:
+                    device = factory.create_local_device (backend, mode)
+                    device.number_of_samples = number_of_samples
+                    start = time.perf_counter ()
+                    values = run_standard_experiments (device, number_of_modes)
+                    measurement ["time"] = time.perf_counter () - start
+                    measurement ["errors"] = {key: abs (values [key] - exact [key]) for key in exact}
+                    measurement ["accurate"] = max (measurement ["errors"].values ()) <= tolerance
+                except Exception as error:
+                    logger.debug ("[Backend benchmark] %s failed in %s mode: %s", backend, mode.value, error)
+                    measurement ["error"] = "{}: {}".format (type (error).__name__, error)
+                    measurement ["accurate"] = False
+
+                measurements.append (measurement)
+                if report is not None:
+                    report (measurement)
+    return measurements
+
+def recommend_backends (measurements: List[Dict[str, Any]]) -> BackendRecommendations:
+    """
+    Build the recommendation table: the fastest accurate backend of each workload.
+
+    Parameters:
+    measurements (List[Dict[str, Any]]): The measurements of benchmark_backends.
+
+    Returns:
+    BackendRecommendations: The table. Workloads without any accurate backend are left out.
+    """
+    best = {}
+    for measurement in measurements:
+        if not measurement ["accurate"]:
+            continue
+        key = (measurement ["photons"], measurement ["modes"], measurement ["mode"])
+        if key not in best or measurement ["time"] < best [key]["time"]:
+            best [key] = measurement
+
+    recommendations = BackendRecommendations ()
+    for (photons, modes, mode), measurement in best.items ():
+        recommendations.add (photons, modes, DeviceMode (mode), measurement ["backend"], measurement ["time"])
+    return recommendations
@@ -0,0 +1,117 @@
+# Some licensing message
+#
+# The benchmark cases of the certification hot paths. Every case builds its input from a seeded
+# random generator and runs on local code only, so the suite needs no network access.
+#
+import itertools
+import warnings
+import numpy as np
+
+from typing import Any, Dict, List, Tuple
+
+from base.circuit_helpers import random_unitaries
+from base.permanents import permanents
+from base.results import StatesAndProbabilities
+from base.state_generation_helpers import generate_partitions, generate_state_from_list
+from photonic_indistinguishability_measures.distinguishable import DistinguishablePhotons
+from photonic_indistinguishability_measures.variance import Variance
+from quandela.circuit_helpers import approximate_with_MZ
+from tomography.estimating_overlaps import GramMatrixFromVariance
+from tomography.process_tomography_methods import SuperStableMethod
+
+from .harness import BenchmarkCase
+
+# The aggregated distributions grow as C(photons + m - 1, photons), so the photon number is capped
+# to keep the largest cases polynomial in the number of modes
+MAX_PHOTONS = 4
+
+def random_unitary (number_of_modes: int, seed: int = 0) -> np.ndarray:
+    return random_unitaries (1, number_of_modes, np.random.default_rng ([seed, number_of_modes])) [0]
+
+def single_photon_results (number_of_modes: int) -> List[StatesAndProbabilities]:
+    """
+    The output distributions of single photons sent in the first modes of a random unitary.
+    """
+    rows = np.abs (random_unitary (number_of_modes).T [:min (number_of_modes, MAX_PHOTONS)]) ** 2
+    results = []
+    for row in rows:
+        results_ = StatesAndProbabilities ()
+        for mode, probability in enumerate (row):
+            results_.set_probability (generate_state_from_list ([1 if j == mode else 0 for j in range (number_of_modes)]), probability)
+        results.append (results_)
+    return results
+
+def aggregate (results: List[StatesAndProbabilities]) -> StatesAndProbabilities:
+    aggregated = StatesAndProbabilities ()
+    for results_ in results:
+        aggregated.aggregate (results_.get_probabilities ())
+    return aggregated
+
+def expected_variance_setup (number_of_modes: int) -> Tuple[Variance, StatesAndProbabilities, int]:
+    rows = np.abs (random_unitary (number_of_modes).T [:min (number_of_modes, MAX_PHOTONS)]) ** 2
+    return Variance (None, number_of_modes), DistinguishablePhotons (rows).joint_distribution (), number_of_modes
+
+def tomography_results (number_of_modes: int) -> Tuple[int, Dict[str, Dict[str, float]], Dict[str, Dict[str, float]]]:
+    """
+    The exact single and double photon results of a random unitary, keyed as QuandelaProcessTomographyProber keys them.
+    """
+    unitary = random_unitary (number_of_modes)
+    single = {str ([k]): {str ([j]): float (abs (unitary [j][k]) ** 2) for j in range (number_of_modes)} for k in range (number_of_modes)}
+
+    outputs = list (itertools.combinations_with_replacement (range (number_of_modes), 2))
+    double = {}
+    for k, h in itertools.combinations (range (number_of_modes), 2):
+        submatrices = np.array ([unitary [np.ix_ ([j, g], [k, h])] for j, g in outputs])
+        probabilities = np.abs (permanents (submatrices)) ** 2 / np.array ([2 if j == g else 1 for j, g in outputs])
+        double [str ([k, h])] = {str ([j, g]): float (p) for (j, g), p in zip (outputs, probabilities)}
+    return number_of_modes, single, double
+
+def recover_state (inputs: Tuple[int, Dict[str, Dict[str, float]], Dict[str, Dict[str, float]]]) -> Any:
+    # Random unitaries hit the branch cuts of the phase recovery, whose warnings would flood the report
+    with warnings.catch_warnings (), np.errstate (all="ignore"):
+        warnings.simplefilter ("ignore")
+        return SuperStableMethod (*inputs).recover_state ()
+
+def find_overlaps_setup (number_of_modes: int) -> Tuple[GramMatrixFromVariance, List[Tuple[Any, float]], int]:
+    rng = np.random.default_rng ([1, number_of_modes])
+    gram_matrix = np.ones ((number_of_modes, number_of_modes))
+    upper = np.triu_indices (number_of_modes, 1)
+    gram_matrix [upper] = rng.uniform (0, 1, len (upper [0]))
+    gram_matrix.T [upper] = gram_matrix [upper]
+
+    unitaries = random_unitaries (max (len (upper [0]), 1), number_of_modes, rng)
+    pairs = [(unitary, Variance.calculate_expected_variance_from_gram_matrix_and_interferometer (gram_matrix, unitary, number_of_modes))
+             for unitary in unitaries]
+    return GramMatrixFromVariance (), pairs, number_of_modes
+
+def find_overlaps (inputs: Tuple[GramMatrixFromVariance, List[Tuple[Any, float]], int]) -> Any:
+    estimator, pairs, number_of_modes = inputs
+    return estimator.find_overlaps (pairs, number_of_modes)
+
+CASES = [
+    BenchmarkCase ("aggregate", single_photon_results, aggregate),
+    BenchmarkCase ("calculate_expected_variance", expected_variance_setup,
+                   lambda inputs: inputs [0].calculate_expected_variance (inputs [1], inputs [2])),
+    BenchmarkCase ("super_stable_recover_state", tomography_results, recover_state),
+    BenchmarkCase ("approximate_with_MZ", random_unitary, approximate_with_MZ, repeats=1),
+    BenchmarkCase ("generate_partitions", lambda number_of_modes: number_of_modes, generate_partitions),
+    BenchmarkCase ("find_overlaps", find_overlaps_setup, find_overlaps),
+]
+
+def get_cases (names: List[str] = None) -> List[BenchmarkCase]:
+    """
+    Get the benchmark cases.
+
+    Parameters:
+    names (List[str]): The names of the cases to keep. Defaults to every case.
+
+    Returns:
+    List[BenchmarkCase]: The cases.
+    """
+    if not names:
+        return list (CASES)
+
+    unknown = set (names) - {case.name for case in CASES}
+    if unknown:
+        raise ValueError("Unknown benchmark cases {}.".format (sorted (unknown)))
+    return [case for case in CASES if case.name in names]
@@ -0,0 +1,174 @@
+# Some licensing message
+#
+# This piece of code measures benchmark cases and keeps their measurements in a JSON history, so
+# that a run can be compared against a stored baseline.
+#
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from base.logger import get_logger
+
+logger = get_logger (__name__)
+
+DEFAULT_MODES = list (range (2, 17))
+
+class BenchmarkCase:
+
+    def __init__ (self, name: str, setup: Callable[[int], Any], run: Callable[[Any], Any], modes: Optional[List[int]] = None, repeats: int = 5):
+        """
+        Initialize a benchmark case.
+
+        Parameters:
+        name (str): The name of the case.
+        setup (Callable[[int], Any]): Builds the input of the case for a number of modes. It is not measured.
+        run (Callable[[Any], Any]): The measured code, called with the input built by setup.
+        modes (Optional[List[int]]): The numbers of modes the case supports. Defaults to 2 to 16.
+        repeats (int): The number of measured runs for each number of modes.
+        """
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.modes = DEFAULT_MODES if modes is None else modes
+        self.repeats = repeats
+
+def measure (case: BenchmarkCase, number_of_modes: int, repeats: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Measure a case for a number of modes.
+
+    The wall time is measured on its own, once per repeat. A last run is traced with tracemalloc
+    for the peak memory, and the difference of allocated blocks before and after it, with the
+    result of the run still alive, counts the allocations the run kept.
+
+    Parameters:
+    case (BenchmarkCase): The case.
+    number_of_modes (int): The number of modes.
+    repeats (Optional[int]): The number of timed runs. Defaults to the repeats of the case.
+
+    Returns:
+    Dict[str, Any]: The measurement, with the best and median wall times in seconds, the peak memory in bytes and the allocated blocks.
+    """
+    repeats = case.repeats if repeats is None else repeats
+    state = case.setup (number_of_modes)
+
+    wall_times = []
+    for _ in range (repeats):
+        gc.collect ()
+        start = time.perf_counter ()
+        case.run (state)
+        wall_times.append (time.perf_counter () - start)
+
+    gc.collect ()
+    blocks = sys.getallocatedblocks ()
+    tracemalloc.start ()
+    result = case.run (state)
+    _, peak_memory = tracemalloc.get_traced_memory ()
+    tracemalloc.stop ()
+    allocated_blocks = sys.getallocatedblocks () - blocks
+    del result
+
+    logger.debug ("[Benchmarks] %s with %s modes: %s s", case.name, number_of_modes, min (wall_times))
+    return {"case": case.name, "modes": number_of_modes, "wall_time": min (wall_times), "median_wall_time": statistics.median (wall_times),
+            "wall_times": wall_times, "peak_memory": peak_memory, "allocated_blocks": allocated_blocks}
+
+def current_commit () -> Optional[str]:
+    """
+    Get the commit of the working tree, if it is a git repository.
+
+    Returns:
+    Optional[str]: The commit hash, or None.
+    """
+    try:
+        return subprocess.run (["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname (os.path.abspath (__file__))).stdout.strip ()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_cases (cases: Iterable[BenchmarkCase], modes: Optional[List[int]] = None, repeats: Optional[int] = None,
+               report: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Measure every case on the numbers of modes it supports.
+
+    Parameters:
+    cases (Iterable[BenchmarkCase]): The cases.
+    modes (Optional[List[int]]): Restricts the numbers of modes. Defaults to every number each case supports.
+    repeats (Optional[int]): The number of timed runs. Defaults to the repeats of each case.
+    report (Optional[Callable[[Dict[str, Any]], None]]): Called with each measurement as soon as it is done.
+
+    Returns:
+    Dict[str, Any]: The run, with its measurements and a description of the environment.
+    """
+    results = []
+    for case in cases:
+        for number_of_modes in case.modes:
+            if modes is not None and number_of_modes not in modes:
+                continue
+            measurement = measure (case, number_of_modes, repeats)
+            results.append (measurement)
+            if report is not None:
+                report (measurement)
+
+    return {"timestamp": time.time (), "commit": current_commit (), "python": platform.python_version (),
+            "machine": platform.machine (), "results": results}
+
+def load_history (path: str) -> List[Dict[str, Any]]:
+    """
+    Load the runs of a history file.
+
+    Parameters:
+    path (str): The history file.
+
+    Returns:
+    List[Dict[str, Any]]: The runs, oldest first. Empty if the file does not exist.
+    """
+    if not os.path.exists (path):
+        return []
+    with open (path) as history_file:
+        return json.load (history_file)
+
+def append_to_history (path: str, run: Dict[str, Any]) -> None:
+    """
+    Append a run to a history file.
+
+    Parameters:
+    path (str): The history file.
+    run (Dict[str, Any]): The run.
+    """
+    history = load_history (path)
+    history.append (run)
+    with open (path, "w") as history_file:
+        json.dump (history, history_file, indent=1)
+
+def compare_runs (baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.2) -> List[Dict[str, Any]]:
+    """
+    Compare the measurements of two runs, on the cases and numbers of modes they share.
+
+    Parameters:
+    baseline (Dict[str, Any]): The reference run.
+    current (Dict[str, Any]): The run to check.
+    threshold (float): The relative slowdown, or memory growth, above which a measurement is flagged.
+
+    Returns:
+    List[Dict[str, Any]]: For each shared measurement the time and memory ratios current/baseline and whether it regressed.
+    """
+    reference = {(result ["case"], result ["modes"]): result for result in baseline ["results"]}
+
+    comparisons = []
+    for result in current ["results"]:
+        key = (result ["case"], result ["modes"])
+        if key not in reference:
+            continue
+
+        time_ratio = result ["wall_time"] / max (reference [key]["wall_time"], 1e-9)
+        memory_ratio = result ["peak_memory"] / max (reference [key]["peak_memory"], 1)
+        comparisons.append ({"case": key [0], "modes": key [1], "time_ratio": time_ratio, "memory_ratio": memory_ratio,
+                             "regressed": time_ratio > 1 + threshold or memory_ratio > 1 + threshold})
+    return comparisons
@@ -0,0 +1,98 @@
+# Some licensing message
+#
+# This piece of code measures the cold import time of the packages in fresh interpreters, and
+# checks that the modules without a Perceval dependency do not pull it in.
+#
+import json
+import os
+import subprocess
+import sys
+
+from typing import Any, Dict, Iterable, List, Optional
+
+SOURCE_DIRECTORY = os.path.abspath (os.path.join (os.path.dirname (__file__), '..', 'src'))
+
+# Modules that must import without Perceval
+LIGHT_MODULES = [
+    "base",
+    "base.circuit_helpers",
+    "base.state_generation_helpers",
+    "base.experiment_plan",
+    "base.results_archive",
+    "photonic_indistinguishability_measures",
+    "photonic_indistinguishability_measures.variance",
+    "photonic_indistinguishability_measures.bunching",
+    "photonic_indistinguishability_measures.sweeps",
+    "quandela",
+    "quandela.backend_selection",
+    "tomography",
+    "tomography.process_tomography_methods",
+    "tomography.estimating_overlaps",
+    "tomography.tomography_archive",
+    "certification",
+    "certification.plan",
+    "certification.checkpoints",
+    "certification.cli",
+]
+
+# Modules that need Perceval, measured for reference
+HEAVY_MODULES = [
+    "quandela.quandela_devices",
+]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter ()
+__import__ (sys.argv [1])
+print (json.dumps ({"time": time.perf_counter () - start, "perceval": "perceval" in sys.modules}))
+"""
+
+def measure_import (module: str, repeats: int = 3) -> Dict[str, Any]:
+    """
+    Measure the import of a module in fresh interpreters.
+
+    Parameters:
+    module (str): The name of the module.
+    repeats (int): The number of interpreters started.
+
+    Returns:
+    Dict[str, Any]: The measurement, with the best import time in seconds and whether Perceval was imported.
+    """
+    environment = dict (os.environ)
+    environment ["PYTHONPATH"] = os.pathsep.join ([SOURCE_DIRECTORY] + [path for path in [environment.get ("PYTHONPATH")] if path])
+
+    times = []
+    for _ in range (repeats):
+        output = subprocess.run ([sys.executable, "-c", IMPORT_SCRIPT, module], env=environment, capture_output=True, text=True, check=True)
+        result = json.loads (output.stdout.strip ().splitlines () [-1])
+        times.append (result ["time"])
+
+    return {"module": module, "time": min (times), "perceval": result ["perceval"], "light": module in LIGHT_MODULES}
+
+def measure_imports (modules: Optional[Iterable[str]] = None, repeats: int = 3) -> List[Dict[str, Any]]:
+    """
+    Measure the import of several modules.
+
+    Parameters:
+    modules (Optional[Iterable[str]]): The modules. Defaults to the light and heavy modules.
+    repeats (int): The number of interpreters started per module.
+
+    Returns:
+    List[Dict[str, Any]]: The measurements.
+    """
+    modules = LIGHT_MODULES + HEAVY_MODULES if modules is None else modules
+    return [measure_import (module, repeats) for module in modules]
+
+def find_import_regressions (measurements: List[Dict[str, Any]], budget: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Find the light modules that import Perceval or exceed a time budget.
+
+    Parameters:
+    measurements (List[Dict[str, Any]]): The measurements.
+    budget (Optional[float]): The largest import time of a light module, in seconds. Not checked if None.
+
+    Returns:
+    List[Dict[str, Any]]: The offending measurements.
+    """
+    return [measurement for measurement in measurements
+            if measurement ["light"] and (measurement ["perceval"] or (budget is not None and measurement ["time"] > budget))]
@@ -0,0 +1,12 @@
+from setuptools import find_packages, setup
+
+setup (
+    name="quindcert",
+    version="0.1.0",
+    description="Certification of the indistinguishability of photons and of photonic devices.",
+    package_dir={"": "src"},
+    packages=find_packages ("src"),
+    python_requires=">=3.8",
+    install_requires=["numpy", "perceval-quandela"],
+    entry_points={"console_scripts": ["quindcert=certification.cli:main"]},
+)
@@ -1,5 +1,18 @@
-from base import *
+import importlib
+
 from main import *
-from photonic_indistinguishability_measures import *
-from quandela import *
-from tomography import *
\ No newline at end of file
+
+# The packages are searched last to first, so a name exported by two of them resolves as with star imports
+PACKAGES = ("base", "photonic_indistinguishability_measures", "quandela", "tomography")
+
+def __getattr__(name):
+    for package_name in reversed (PACKAGES):
+        package = importlib.import_module (package_name)
+        if name in package.__all__:
+            return getattr (package, name)
+    raise AttributeError("module {!r} has no attribute {!r}".format (__name__, name))
+
+def __dir__():
+    return sorted (set ().union (*(importlib.import_module (package_name).__all__ for package_name in PACKAGES)))
+
+__all__ = __dir__ ()
@@ -1,5 +1,35 @@
-from .abstract_circuit import *
-from .circuit_helpers import *
-from .devices import *
-from .state_generation_helpers import *
-from .results import *
+# The submodules are only imported when one of their attributes is first read
+from .lazy_imports import attach
+
+__getattr__, __dir__, __all__ = attach (__name__, {
+    "abstract_circuit": ["AbstractCircuit"],
+    "circuit_helpers": ["random_unitaries", "random_preparation", "fully_indistinguishable_matrix", "fully_distinguishable_matrix",
+                        "random_matrix", "constant_matrix_gram_matrix", "overlap_calculation_for_three_modes",
+                        "generate_matrix_from_parameters", "random_gram_matrices", "constant_gram_matrices",
+                        "generate_matrices_from_parameters", "generate_overlap_matrices_from_parameters",
+                        "random_GramMatrix_three_modes", "cached_fourier_matrix",
+                        "fourier_matrix", "is_unitary", "cached_fourier_transform_circuit", "generate_fourier_transform_circuit", "generate_random_abstract_circuit",
+                        "generate_random_abstract_circuits", "generate_random_abstract_circuit_stack"],
+    "devices": ["DeviceMode", "DeviceFactory", "Device"],
+    "state_generation_helpers": ["create_dummy_state", "polarize_state", "generate_bunching_initial_state", "generate_states_on_indexes",
+                                 "valid", "generate_a_state_with_n_photons", "generate_a_blank_state", "generate_a_full_ones_partition",
+                                 "sum_states", "generate_state_from_list", "state_to_list", "states_to_occupation_matrix",
+                                 "occupation_matrix_to_states", "generate_initial_states", "generate_partition_h", "iter_partitions", "generate_partitions",
+                                 "iter_multiset_permutations", "unique_permutations", "generate_all_orders_for_partitions",
+                                 "generate_trivial_orders_for_partitions", "generate_states_from_orders", "generate_states_from_order",
+                                 "iter_state_combinations", "generate_all_state_combinations", "generate_state_combinations_no_orders"],
+    "results": ["StatesAndProbabilities"],
+    "structured_circuit": ["UnitarityCheck", "CircuitFactor", "DenseFactor", "PermutationFactor", "DiagonalPhaseFactor",
+                           "BlockDiagonalFactor", "FourierFactor", "StructuredCircuit", "permutation_circuit", "phase_circuit",
+                           "block_diagonal_circuit", "fourier_circuit"],
+    "fingerprints": ["fingerprint_matrix", "fingerprint_state", "fingerprint_circuit"],
+    "circuit_stack": ["AbstractCircuitStack"],
+    "fock_space": ["FockSpaceIndex"],
+    "permanents": ["permanents", "permanent"],
+    "instrumentation": ["SpanNode", "Span", "NullSpan", "NULL_SPAN", "Instrumentation", "PROFILER"],
+    "logger": ["PROJECT_LOGGER_NAME", "get_logger", "LazyRender", "lazy", "configure_logging"],
+    "lazy_imports": ["attach"],
+    "experiment_plan": ["ExperimentRequest", "ExperimentPlan"],
+    "results_archive": ["ARCHIVE_VERSION", "occupation_dtype", "result_sets_to_columns", "save_result_sets", "save_results",
+                        "memory_map_npz", "ResultsArchive", "load_results"]
+})
@@ -1,22 +1,30 @@
 import numpy as np
 from typing import Optional, Any
 
+from .fingerprints import fingerprint_matrix
+
 class AbstractCircuit:
 
-    def __init__(self, n: int, m: Optional[Any] = None):
+    frozen = False
+
+    def __init__(self, n: int, m: Optional[Any] = None, view: bool = False):
         """
         Initialize the AbstractCircuit with a matrix.
         
         Parameters:
         n (int): The size of the identity matrix if m is not provided.
         m (Optional[Any]): The matrix to initialize the circuit with.
+        view (bool): If True the matrix is wrapped without being copied nor checked, for matrices that are already known to be unitary.
         """
         if m is None:
             self.m = np.eye (n)
+        elif view:
+            self.m = m
         else:
             self.m = np.array(m)
             if not self.is_unitary():
                 raise ValueError("The provided matrix is not unitary.")
+        self._fingerprints = {}
     
     def is_unitary(self) -> bool:
         """
@@ -38,12 +46,46 @@ class AbstractCircuit:
         """
         if not isinstance(abstract_circuit, AbstractCircuit):
             raise TypeError("Expected an instance of AbstractCircuit.")
+        if self.frozen:
+            raise ValueError("The circuit is frozen, compose a copy of it instead.")
         
         self.m = self.m @ abstract_circuit.m
         
         if not self.is_unitary():
             raise ValueError("The resulting matrix after composition is not unitary.")
 
+    def freeze (self) -> None:
+        """
+        Make the circuit read-only, so that it can be shared. Composing it afterwards raises an error.
+        """
+        self.m.flags.writeable = False
+        self.frozen = True
+
+    def copy (self) -> 'AbstractCircuit':
+        """
+        Get a mutable copy of the circuit.
+
+        Returns:
+        AbstractCircuit: The copy.
+        """
+        return AbstractCircuit (self.m.shape [0], np.array (self.m), view=True)
+
+    def fingerprint (self, decimals: int = 8) -> str:
+        """
+        Get the content fingerprint of the circuit, computed once per matrix and cached on the instance.
+
+        Parameters:
+        decimals (int): The number of decimals the unitary is rounded to.
+
+        Returns:
+        str: The fingerprint of the unitary, insensitive to its global phase.
+        """
+        matrix = self.m
+        cache = self._fingerprints
+        if decimals not in cache or cache [decimals][0] is not matrix:
+            cache [decimals] = (matrix, fingerprint_matrix (matrix, decimals))
+        return cache [decimals][1]
+
     def __repr__(self) -> str:
         """
         Return a string representation of the circuit's matrix.
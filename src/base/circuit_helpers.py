@@ -1,18 +1,42 @@
+import functools
 import logging
 import random
 import numpy as np
 import cmath
 
-from typing import Tuple
+from typing import Iterator, Optional, Tuple
 
-from perceval import Matrix
 from base import AbstractCircuit
+from base.circuit_stack import AbstractCircuitStack
 
-def random_preparation(n):
+def random_unitaries(number_of_unitaries: int, dimension: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Generate a stack of Haar random unitary matrices, from the QR decomposition of complex Ginibre matrices.
+
+    Parameters:
+    number_of_unitaries (int): The number of unitaries to generate.
+    dimension (int): The dimension of each unitary.
+    rng (Optional[np.random.Generator]): The random generator to use. Defaults to a freshly seeded one.
+
+    Returns:
+    np.ndarray: A (number_of_unitaries x dimension x dimension) array of unitaries.
+    """
+    if rng is None:
+        rng = np.random.default_rng ()
+
+    shape = (number_of_unitaries, dimension, dimension)
+    ginibre = (rng.standard_normal (shape) + 1j * rng.standard_normal (shape)) / np.sqrt (2)
+    q, r = np.linalg.qr (ginibre)
+
+    # Fixing the phases of the diagonal of R makes the distribution of Q the Haar measure
+    diagonal = np.diagonal (r, axis1=1, axis2=2)
+    return q * (diagonal / np.abs (diagonal)) [:, np.newaxis, :]
+
+def random_preparation(n, rng: Optional[np.random.Generator] = None):
     """
     Generate a random unitary matrix of dimension n.
     """
-    return Matrix.random_unitary(n).tolist()
+    return random_unitaries (1, n, rng) [0].tolist()
 
 
 
@@ -83,6 +107,82 @@ def generate_matrix_from_parameters (gamma, beta, alpha, phi):
     return gram_matrix
 
 
+def random_gram_matrices(number_of_matrices: int, n: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Generate a stack of random matrices with the distribution of random_matrix.
+
+    Parameters:
+    number_of_matrices (int): The number of matrices to generate.
+    n (int): The dimension of each matrix.
+    rng (Optional[np.random.Generator]): The random generator to use. Defaults to a freshly seeded one.
+
+    Returns:
+    np.ndarray: A (number_of_matrices x n x n) array with unit diagonal and off diagonal entries in {0, 0.01, ..., 1}.
+    """
+    if rng is None:
+        rng = np.random.default_rng ()
+
+    matrices = rng.integers (0, 101, (number_of_matrices, n, n)) * 0.01
+    matrices [:, np.arange (n), np.arange (n)] = 1
+    return matrices
+
+def constant_gram_matrices(n: int, values: np.ndarray) -> np.ndarray:
+    """
+    Generate the matrices of constant_matrix_gram_matrix for many values at once.
+
+    Parameters:
+    n (int): The dimension of each matrix.
+    values (np.ndarray): The off diagonal value of each matrix.
+
+    Returns:
+    np.ndarray: A (len(values) x n x n) array of matrices.
+    """
+    values = np.asarray (values, dtype=float).reshape (-1)
+    matrices = np.broadcast_to (values [:, np.newaxis, np.newaxis], (len (values), n, n)).copy ()
+    matrices [:, np.arange (n), np.arange (n)] = 1
+    return matrices
+
+def generate_overlap_matrices_from_parameters(gamma: np.ndarray, beta: np.ndarray, alpha: np.ndarray, phi: np.ndarray) -> np.ndarray:
+    """
+    Generate the complex overlaps of the three photons of generate_matrix_from_parameters for arrays of parameters at once.
+
+    The overlaps are the ones of the internal states (1, 0, 0), (cos b, sin b sin a e^-i phi, sin b cos a)
+    and (cos g, sin g, 0) of the photons A, B and C, so the matrices are Hermitian with a unit diagonal.
+
+    Parameters:
+    gamma, beta, alpha (np.ndarray): Angles in radians, broadcast against each other.
+    phi (np.ndarray): Phase angles in radians.
+
+    Returns:
+    np.ndarray: A (k x 3 x 3) complex array of overlap matrices, one for each broadcast set of parameters.
+    """
+    gamma, beta, alpha, phi = (np.ravel (parameter) for parameter in np.broadcast_arrays (gamma, beta, alpha, phi))
+
+    s_AB = np.cos (beta * np.pi / 2)
+    s_BC = (np.cos (gamma * np.pi / 2) * np.cos (beta * np.pi / 2)
+            + np.sin (gamma * np.pi / 2) * np.sin (beta * np.pi / 2) * np.sin (alpha * np.pi / 2) * np.exp (1j * phi * np.pi))
+    s_AC = np.cos (gamma * np.pi / 2)
+
+    matrices = np.ones ((len (gamma), 3, 3), dtype=complex)
+    matrices [:, 0, 1] = matrices [:, 1, 0] = s_AB
+    matrices [:, 1, 2] = s_BC
+    matrices [:, 2, 1] = np.conj (s_BC)
+    matrices [:, 0, 2] = matrices [:, 2, 0] = s_AC
+    return matrices
+
+def generate_matrices_from_parameters(gamma: np.ndarray, beta: np.ndarray, alpha: np.ndarray, phi: np.ndarray) -> np.ndarray:
+    """
+    Generate the matrices of generate_matrix_from_parameters for arrays of parameters at once.
+
+    Parameters:
+    gamma, beta, alpha (np.ndarray): Angles in radians, broadcast against each other.
+    phi (np.ndarray): Phase angles in radians.
+
+    Returns:
+    np.ndarray: A (k x 3 x 3) array of matrices, one for each broadcast set of parameters.
+    """
+    return np.abs (generate_overlap_matrices_from_parameters (gamma, beta, alpha, phi)) ** 2
+
 def random_GramMatrix_three_modes():
     """
     Generate a random Gram matrix for three modes.
@@ -108,6 +208,24 @@ def random_GramMatrix_three_modes():
     return gram_matrix
 
 
+@functools.lru_cache (maxsize=None)
+def cached_fourier_matrix(matrix_dimension: int) -> np.ndarray:
+    """
+    Get the Fourier matrix for a given dimension, built once and shared read-only.
+
+    Parameters:
+    matrix_dimension (int): The dimension of the Fourier matrix.
+
+    Returns:
+    np.ndarray: The read-only Fourier matrix.
+    """
+    indexes = np.arange (matrix_dimension)
+    # Reducing the exponents modulo the dimension keeps the phases exact for large dimensions
+    exponents = np.outer (indexes, indexes) % matrix_dimension
+    fourier = np.exp (2 * np.pi * 1j * exponents / matrix_dimension) / np.sqrt (matrix_dimension)
+    fourier.flags.writeable = False
+    return fourier
+
 def fourier_matrix(matrix_dimension):
     """
     Generate the Fourier matrix for a given dimension.
@@ -118,26 +236,7 @@ def fourier_matrix(matrix_dimension):
     Returns:
     np.ndarray: The generated Fourier matrix.
     """
-    fourier = np.zeros ((matrix_dimension,matrix_dimension),dtype=np.complex_)
-    root_of_unity = 2 * np.pi * 1j
-
-    for y in range(0, matrix_dimension):
-        for x in range(0, matrix_dimension):
-            fourier [x][y] = np.exp(root_of_unity*y*x/matrix_dimension)
-    
-    phases = np.zeros ((matrix_dimension,matrix_dimension),dtype=np.complex_)
-    for y in range(0, matrix_dimension):
-        for x in range(0, matrix_dimension):
-            phases [x][y] = cmath.phase (cmath.exp (root_of_unity*y*x/matrix_dimension))
-    
-    logging.debug ("Phases {}".format (phases))
-    
-    # Normalize the Fourier matrix
-    fourier*=1/np.sqrt(matrix_dimension)
-    
-    logging.debug ("Fourier matrix {}".format (fourier))
-    
-    return fourier
+    return cached_fourier_matrix (matrix_dimension).copy ()
     
 def is_unitary(m: np.ndarray) -> bool:
     """
@@ -151,6 +250,21 @@ def is_unitary(m: np.ndarray) -> bool:
     """
     return np.allclose(np.eye(len(m)), m.dot(m.T.conj()))
 
+@functools.lru_cache (maxsize=None)
+def cached_fourier_transform_circuit (dimension: int) -> AbstractCircuit:
+    """
+    Get the Fourier transform circuit for the given dimension, built once and shared, so it is frozen.
+
+    Parameters:
+    dimension (int): The dimension of the circuit.
+
+    Returns:
+    AbstractCircuit: The shared Fourier transform circuit. Compose a copy of it instead.
+    """
+    circuit = AbstractCircuit (dimension, cached_fourier_matrix (dimension), view=True)
+    circuit.freeze ()
+    return circuit
+
 def generate_fourier_transform_circuit (dimension):
     """
     Generate a Fourier transform circuit.
@@ -159,9 +273,38 @@ def generate_fourier_transform_circuit (dimension):
     dimension (int): The dimension of the circuit.
     
     Returns:
-    AbstractCircuit: The generated Fourier transform circuit.
+    AbstractCircuit: The generated Fourier transform circuit, that the caller may modify.
     """
-    return AbstractCircuit (dimension, fourier_matrix (dimension))
+    return AbstractCircuit (dimension, fourier_matrix (dimension), view=True)
+
+def generate_random_abstract_circuit (dimension, rng: Optional[np.random.Generator] = None):
+    return AbstractCircuit (dimension, random_unitaries (1, dimension, rng) [0])
+
+def generate_random_abstract_circuits (number_of_circuits: int, dimension: int, rng: Optional[np.random.Generator] = None) -> Iterator[AbstractCircuit]:
+    """
+    Lazily generate Haar random abstract circuits, drawing all the unitaries in one batch.
+
+    Parameters:
+    number_of_circuits (int): The number of circuits to generate.
+    dimension (int): The dimension of the circuits.
+    rng (Optional[np.random.Generator]): The random generator to use. Defaults to a freshly seeded one.
 
-def generate_random_abstract_circuit (dimension):
-    return AbstractCircuit (dimension, random_preparation (dimension))
\ No newline at end of file
+    Returns:
+    Iterator[AbstractCircuit]: The generated circuits.
+    """
+    for unitary in random_unitaries (number_of_circuits, dimension, rng):
+        yield AbstractCircuit (dimension, unitary)
+
+def generate_random_abstract_circuit_stack (number_of_circuits: int, dimension: int, rng: Optional[np.random.Generator] = None) -> AbstractCircuitStack:
+    """
+    Generate a stack of Haar random abstract circuits.
+
+    Parameters:
+    number_of_circuits (int): The number of circuits to generate.
+    dimension (int): The dimension of the circuits.
+    rng (Optional[np.random.Generator]): The random generator to use. Defaults to a freshly seeded one.
+
+    Returns:
+    AbstractCircuitStack: The generated circuits.
+    """
+    return AbstractCircuitStack (dimension, random_unitaries (number_of_circuits, dimension, rng), check=False)
\ No newline at end of file
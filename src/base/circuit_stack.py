@@ -0,0 +1,94 @@
+import numpy as np
+
+from typing import Any, Iterator, List, Optional, Union
+
+from .abstract_circuit import AbstractCircuit
+
+class AbstractCircuitStack:
+    """
+    A stack of k interferometers on m modes, held as one (k x m x m) complex array.
+
+    Indexing with an integer returns an AbstractCircuit whose matrix is a view on the
+    stack, and indexing with a slice returns a stack sharing the same memory.
+    """
+
+    def __init__(self, n: int, matrices: Optional[Any] = None, check: bool = True):
+        """
+        Initialize the stack with an array of matrices.
+
+        Parameters:
+        n (int): The number of modes.
+        matrices (Optional[Any]): A (k x n x n) array of unitaries. An empty stack if not provided.
+        check (bool): If True the unitarity of every matrix is checked.
+        """
+        self.n = n
+        if matrices is None:
+            self.matrices = np.zeros ((0, n, n), dtype=complex)
+        else:
+            self.matrices = np.asarray (matrices)
+
+        if self.matrices.ndim != 3 or self.matrices.shape [1:] != (n, n):
+            raise ValueError("Expected a stack of {} x {} matrices, got shape {}.".format (n, n, self.matrices.shape))
+        if check and not np.all (self.is_unitary ()):
+            raise ValueError("The provided matrices are not unitary: {}".format (np.flatnonzero (~self.is_unitary ()).tolist ()))
+
+    @staticmethod
+    def from_circuits(circuits: List[AbstractCircuit]) -> 'AbstractCircuitStack':
+        """
+        Stack the matrices of already validated circuits.
+
+        Parameters:
+        circuits (List[AbstractCircuit]): The circuits to stack.
+
+        Returns:
+        AbstractCircuitStack: The resulting stack.
+        """
+        matrices = np.array ([circuit.m for circuit in circuits])
+        return AbstractCircuitStack (matrices.shape [1], matrices, check=False)
+
+    def is_unitary(self) -> np.ndarray:
+        """
+        Check the unitarity of every matrix of the stack.
+
+        Returns:
+        np.ndarray: A boolean per matrix, True if it is unitary.
+        """
+        products = self.matrices @ np.conj (np.swapaxes (self.matrices, 1, 2))
+        return np.all (np.isclose (products, np.eye (self.n)), axis=(1, 2))
+
+    def compose(self, circuits: Union[AbstractCircuit, 'AbstractCircuitStack']) -> None:
+        """
+        Compose every circuit of the stack by matrix multiplication, with a single circuit or pairwise with another stack of the same length.
+
+        Parameters:
+        circuits (Union[AbstractCircuit, AbstractCircuitStack]): The circuit or the stack to compose with.
+        """
+        if isinstance (circuits, AbstractCircuitStack):
+            if len (circuits) != len (self):
+                raise ValueError("Cannot compose a stack of {} circuits with a stack of {}.".format (len (self), len (circuits)))
+            self.matrices = self.matrices @ circuits.matrices
+        elif isinstance (circuits, AbstractCircuit):
+            self.matrices = self.matrices @ circuits.m
+        else:
+            raise TypeError("Expected an instance of AbstractCircuit or AbstractCircuitStack.")
+
+        if not np.all (self.is_unitary ()):
+            raise ValueError("The resulting matrices after composition are not unitary.")
+
+    def __len__(self) -> int:
+        return self.matrices.shape [0]
+
+    def __getitem__(self, index: Any) -> Union[AbstractCircuit, 'AbstractCircuitStack']:
+        if isinstance (index, (int, np.integer)):
+            return AbstractCircuit (self.n, self.matrices [index], view=True)
+        return AbstractCircuitStack (self.n, self.matrices [index], check=False)
+
+    def __iter__(self) -> Iterator[AbstractCircuit]:
+        for matrix in self.matrices:
+            yield AbstractCircuit (self.n, matrix, view=True)
+
+    def __array__(self, dtype: Optional[Any] = None) -> np.ndarray:
+        return self.matrices if dtype is None else self.matrices.astype (dtype)
+
+    def __repr__(self) -> str:
+        return "AbstractCircuitStack(k={}, m={})".format (len (self), self.n)
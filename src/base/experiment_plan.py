@@ -0,0 +1,165 @@
+import hashlib
+
+from typing import Callable, Dict, List, Optional
+
+from base.abstract_circuit import AbstractCircuit
+from base.devices import Device
+from base.fingerprints import fingerprint_circuit, fingerprint_state
+from base.instrumentation import PROFILER
+from base.logger import get_logger
+from base.results import StatesAndProbabilities
+
+logger = get_logger (__name__)
+
+class ExperimentRequest:
+    """
+    An experiment a measure needs: an input state through a circuit, with a number of samples.
+    """
+
+    def __init__ (self, input_state: str, circuit: AbstractCircuit, number_of_samples: Optional[int] = None):
+        """
+        Initialize the request.
+
+        Parameters:
+        input_state (str): The input state (e.g., '|1,1>').
+        circuit (AbstractCircuit): The circuit.
+        number_of_samples (Optional[int]): The number of samples. Defaults to the one of the device.
+        """
+        self.input_state = input_state
+        self.circuit = circuit
+        self.number_of_samples = number_of_samples
+        self.key = ExperimentPlan.experiment_key (input_state, circuit, number_of_samples)
+
+    def __repr__ (self) -> str:
+        return "ExperimentRequest({}, {})".format (self.input_state, self.key [:12])
+
+class ExperimentPlan:
+    """
+    The experiments declared by several measures, each physically distinct experiment executed once.
+
+    Measures request the experiments they need and get back a key; the requests of identical
+    experiments (same input state, same unitary and same number of samples) share the key. Once
+    the plan is executed on a device, every consumer reads the same results with the key. The mode
+    of the experiments is the one of the device the plan is executed on, and so is the number of
+    samples of the requests without one: they are merged with the requests of the same experiment
+    giving that number explicitly when the plan is executed.
+    """
+
+    def __init__ (self):
+        """
+        Initialize an empty plan.
+        """
+        self.experiments: Dict[str, ExperimentRequest] = {}
+        self.results: Dict[str, StatesAndProbabilities] = {}
+        # The key of each executed experiment with its number of samples resolved on the device
+        self.resolved_keys: Dict[str, str] = {}
+        self.number_of_requests = 0
+
+    @staticmethod
+    def experiment_key (input_state: str, circuit: AbstractCircuit, number_of_samples: Optional[int] = None) -> str:
+        """
+        Get the key of an experiment, shared by the physically identical experiments.
+
+        Parameters:
+        input_state (str): The input state.
+        circuit (AbstractCircuit): The circuit.
+        number_of_samples (Optional[int]): The number of samples, None for the one of the device.
+
+        Returns:
+        str: The key.
+        """
+        description = "|".join ([fingerprint_state (input_state), fingerprint_circuit (circuit), str (number_of_samples)])
+        return hashlib.sha256 (description.encode ()).hexdigest ()
+
+    def request (self, input_state: str, circuit: AbstractCircuit, number_of_samples: Optional[int] = None) -> str:
+        """
+        Declare an experiment.
+
+        Parameters:
+        input_state (str): The input state (e.g., '|1,1>').
+        circuit (AbstractCircuit): The circuit.
+        number_of_samples (Optional[int]): The number of samples. Defaults to the one of the device.
+
+        Returns:
+        str: The key of the results of the experiment.
+        """
+        experiment = ExperimentRequest (input_state, circuit, number_of_samples)
+        self.experiments.setdefault (experiment.key, experiment)
+        self.number_of_requests += 1
+        return experiment.key
+
+    @property
+    def number_of_experiments (self) -> int:
+        """
+        Get the number of distinct experiments of the plan. The requests without a number of samples
+        are only merged with the ones giving the default of the device once the plan is executed.
+
+        Returns:
+        int: The number of experiments.
+        """
+        return len ({self.resolved_keys.get (key, key) for key in self.experiments})
+
+    def pending_experiments (self) -> List[ExperimentRequest]:
+        """
+        Get the distinct experiments that were not executed yet, in the order they were first requested.
+
+        Returns:
+        List[ExperimentRequest]: The experiments.
+        """
+        return [experiment for key, experiment in self.experiments.items () if key not in self.results]
+
+    def execute (self, device: Device, run: Optional[Callable[[str, AbstractCircuit], StatesAndProbabilities]] = None) -> None:
+        """
+        Execute every pending experiment once. Experiments requested after an execution run on the next one.
+
+        The requests without a number of samples take the one of the device, so they share the
+        results of the requests giving that number explicitly.
+
+        Parameters:
+        device (Device): The device running the experiments.
+        run (Optional[Callable[[str, AbstractCircuit], StatesAndProbabilities]]): Runs one experiment on the device. Defaults to its execute_experiment.
+        """
+        run = device.execute_experiment if run is None else run
+        default_number_of_samples = getattr (device, "number_of_samples", None)
+
+        # The pending experiments by key with a resolved number of samples, the ones run before being reused
+        results_by_resolved_key = {self.resolved_keys [key]: results for key, results in self.results.items ()}
+        pending: Dict[str, List[ExperimentRequest]] = {}
+        for experiment in self.pending_experiments ():
+            number_of_samples = default_number_of_samples if experiment.number_of_samples is None else experiment.number_of_samples
+            resolved_key = self.experiment_key (experiment.input_state, experiment.circuit, number_of_samples)
+            self.resolved_keys [experiment.key] = resolved_key
+            pending.setdefault (resolved_key, []).append (experiment)
+        to_run = [key for key in pending if key not in results_by_resolved_key]
+
+        logger.debug ("[Experiment plan] %s requests, %s distinct experiments, %s to run", self.number_of_requests,
+                      self.number_of_experiments, len (to_run))
+        PROFILER.count ("planned experiments", len (to_run))
+
+        try:
+            for resolved_key, experiments in pending.items ():
+                if resolved_key not in results_by_resolved_key:
+                    experiment = experiments [0]
+                    number_of_samples = default_number_of_samples if experiment.number_of_samples is None else experiment.number_of_samples
+                    if number_of_samples is not None:
+                        device.number_of_samples = number_of_samples
+                    results_by_resolved_key [resolved_key] = run (experiment.input_state, experiment.circuit)
+                for experiment in experiments:
+                    self.results [experiment.key] = results_by_resolved_key [resolved_key]
+        finally:
+            if default_number_of_samples is not None:
+                device.number_of_samples = default_number_of_samples
+
+    def get (self, key: str) -> StatesAndProbabilities:
+        """
+        Get the results of an executed experiment. Every consumer of the experiment gets the same results.
+
+        Parameters:
+        key (str): The key returned by request.
+
+        Returns:
+        StatesAndProbabilities: The results.
+        """
+        if key not in self.results:
+            raise ValueError("The experiment {} was not executed, execute the plan first.".format (key [:12]))
+        return self.results [key]
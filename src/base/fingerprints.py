@@ -0,0 +1,61 @@
+import hashlib
+import numpy as np
+
+from typing import Any
+
+def fingerprint_matrix(matrix: Any, decimals: int = 8) -> str:
+    """
+    Compute a content fingerprint of a unitary, insensitive to its global phase.
+
+    The matrix is multiplied by the conjugate phase of its largest entry (the first one, in
+    row-major order, among those equal up to the rounding) and then rounded, so unitaries that
+    only differ by a global phase or by less than the tolerance share the same fingerprint.
+
+    Parameters:
+    matrix (Any): The matrix to fingerprint.
+    decimals (int): The number of decimals the matrix is rounded to.
+
+    Returns:
+    str: The fingerprint of the matrix.
+    """
+    matrix = np.asarray (matrix, dtype=complex)
+    moduli = np.round (np.abs (matrix), max (decimals - 2, 0))
+    pivot = matrix.flat [np.argmax (moduli)]
+    if abs (pivot) > 0:
+        matrix = matrix * (np.conj (pivot) / abs (pivot))
+
+    rounded = np.round (matrix, decimals) + 0
+    rounded.real [rounded.real == 0] = 0
+    rounded.imag [rounded.imag == 0] = 0
+
+    digest = hashlib.sha256 (str (rounded.shape).encode ())
+    digest.update (np.ascontiguousarray (rounded).tobytes ())
+    return digest.hexdigest ()
+
+def fingerprint_state(state: Any) -> str:
+    """
+    Compute a content fingerprint of an input state, given as a string (e.g., '|1,0,1>') or a Perceval BasicState.
+
+    Parameters:
+    state (Any): The state to fingerprint.
+
+    Returns:
+    str: The fingerprint of the state.
+    """
+    return hashlib.sha256 ("".join (str (state).split ()).encode ()).hexdigest ()
+
+def fingerprint_circuit(circuit: Any) -> str:
+    """
+    Compute a content fingerprint of the unitary of an AbstractCircuit or of a Perceval circuit.
+
+    Parameters:
+    circuit (Any): The circuit to fingerprint.
+
+    Returns:
+    str: The fingerprint of the unitary of the circuit.
+    """
+    if hasattr (circuit, "fingerprint"):
+        return circuit.fingerprint ()
+    if hasattr (circuit, "compute_unitary"):
+        return fingerprint_matrix (circuit.compute_unitary ())
+    return fingerprint_matrix (circuit.m)
@@ -0,0 +1,146 @@
+import math
+import numpy as np
+
+from typing import Any, Dict, Iterable, List, Union
+
+from .results import StatesAndProbabilities
+from .state_generation_helpers import generate_state_from_list, state_to_list
+
+class FockSpaceIndex:
+    """
+    A bijection between the occupation patterns of n photons in m modes and the range [0, C(n+m-1, n)).
+
+    A pattern is read as stars and bars: the m-1 bars sit at positions b_j = o_0 + ... + o_j + j,
+    and the rank of the pattern is the rank of the combination of bar positions in the
+    combinatorial number system, sum_j C(b_j, j+1). Distributions over the patterns can then
+    be held in dense arrays indexed by rank.
+    """
+
+    def __init__(self, number_of_photons: int, number_of_modes: int):
+        """
+        Initialize the index.
+
+        Parameters:
+        number_of_photons (int): The number of photons.
+        number_of_modes (int): The number of modes.
+        """
+        if number_of_photons < 0 or number_of_modes < 1:
+            raise ValueError("Expected a non-negative number of photons and a positive number of modes.")
+
+        self.number_of_photons = number_of_photons
+        self.number_of_modes = number_of_modes
+        self.size = math.comb (number_of_photons + number_of_modes - 1, number_of_photons)
+
+        slots = number_of_photons + number_of_modes - 1
+        self.binomials = np.array ([[math.comb (b, k) for k in range (number_of_modes)] for b in range (slots + 1)], dtype=np.int64)
+
+    def rank(self, patterns: Any) -> np.ndarray:
+        """
+        Get the rank of occupation patterns.
+
+        Parameters:
+        patterns (Any): A (k x m) array of occupation patterns, or a single pattern.
+
+        Returns:
+        np.ndarray: The rank of each pattern, or a scalar for a single pattern.
+        """
+        patterns = np.asarray (patterns, dtype=np.int64)
+        single = patterns.ndim == 1
+        patterns = np.atleast_2d (patterns)
+        if patterns.shape [1] != self.number_of_modes:
+            raise ValueError("Expected patterns on {} modes, got {}.".format (self.number_of_modes, patterns.shape [1]))
+        if np.any (patterns < 0) or np.any (patterns.sum (axis=1) != self.number_of_photons):
+            raise ValueError("Expected patterns of {} photons.".format (self.number_of_photons))
+
+        bars = np.cumsum (patterns [:, :-1], axis=1) + np.arange (self.number_of_modes - 1)
+        ranks = self.binomials [bars, np.arange (1, self.number_of_modes)].sum (axis=1)
+        return ranks [0] if single else ranks
+
+    def unrank(self, ranks: Any) -> np.ndarray:
+        """
+        Get the occupation patterns of ranks.
+
+        Parameters:
+        ranks (Any): An array of ranks, or a single rank.
+
+        Returns:
+        np.ndarray: A (k x m) array of occupation patterns, or a single pattern for a single rank.
+        """
+        ranks = np.asarray (ranks, dtype=np.int64)
+        single = ranks.ndim == 0
+        remainders = np.atleast_1d (ranks).copy ()
+        if np.any (remainders < 0) or np.any (remainders >= self.size):
+            raise ValueError("Ranks must lie in [0, {}).".format (self.size))
+
+        bars = np.zeros ((len (remainders), self.number_of_modes - 1), dtype=np.int64)
+        for j in range (self.number_of_modes - 2, -1, -1):
+            # The largest position b with C(b, j+1) <= remainder
+            bars [:, j] = np.searchsorted (self.binomials [:, j + 1], remainders, side='right') - 1
+            remainders -= self.binomials [bars [:, j], j + 1]
+
+        edges = np.concatenate ((np.full ((len (bars), 1), -1), bars,
+                                 np.full ((len (bars), 1), self.number_of_photons + self.number_of_modes - 1)), axis=1)
+        patterns = np.diff (edges, axis=1) - 1
+        return patterns [0] if single else patterns
+
+    def rank_states(self, states: Iterable[str]) -> np.ndarray:
+        """
+        Get the rank of state strings.
+
+        Parameters:
+        states (Iterable[str]): The states (e.g., '|1,0,2>').
+
+        Returns:
+        np.ndarray: The rank of each state.
+        """
+        patterns = [state_to_list (state) for state in states]
+        if not patterns:
+            return np.zeros (0, dtype=np.int64)
+        return self.rank (patterns)
+
+    def states(self) -> List[str]:
+        """
+        Get every state string, in rank order.
+
+        Returns:
+        List[str]: The states.
+        """
+        return [generate_state_from_list (pattern.tolist ()) for pattern in self.unrank (np.arange (self.size))]
+
+    def to_dense(self, distribution: Union[StatesAndProbabilities, Dict[str, float]]) -> np.ndarray:
+        """
+        Convert a distribution keyed by state strings to a dense array indexed by rank.
+
+        Parameters:
+        distribution (Union[StatesAndProbabilities, Dict[str, float]]): The distribution.
+
+        Returns:
+        np.ndarray: The probability of every pattern, zero for the absent ones.
+        """
+        if isinstance (distribution, StatesAndProbabilities):
+            distribution = distribution.get_probabilities ()
+
+        dense = np.zeros (self.size)
+        np.add.at (dense, self.rank_states (distribution.keys ()), np.fromiter (distribution.values (), dtype=float, count=len (distribution)))
+        return dense
+
+    def from_dense(self, dense: Any, keep_zeros: bool = False) -> StatesAndProbabilities:
+        """
+        Convert a dense array indexed by rank to a distribution keyed by state strings.
+
+        Parameters:
+        dense (Any): The probability of every pattern.
+        keep_zeros (bool): If True the patterns of zero probability are kept.
+
+        Returns:
+        StatesAndProbabilities: The distribution.
+        """
+        dense = np.asarray (dense, dtype=float)
+        ranks = np.arange (self.size) if keep_zeros else np.flatnonzero (dense)
+
+        results = StatesAndProbabilities ()
+        if len (ranks) == 0:
+            return results
+        for pattern, probability in zip (self.unrank (ranks), dense [ranks]):
+            results.set_probability (generate_state_from_list (pattern.tolist ()), float (probability))
+        return results
@@ -0,0 +1,261 @@
+import functools
+import json
+import os
+import threading
+import time
+
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+class SpanNode:
+    """
+    A node of the timing tree: the calls of a span with the same name under the same parent.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize the node.
+
+        Parameters:
+        name (str): The name of the span.
+        """
+        self.name = name
+        self.calls = 0
+        self.total_time = 0.0
+        self.counters = defaultdict (float)
+        self.children = {}
+
+    def child(self, name: str) -> 'SpanNode':
+        """
+        Get the child node of a span name, creating it on first use.
+
+        Parameters:
+        name (str): The name of the span.
+
+        Returns:
+        SpanNode: The child node.
+        """
+        node = self.children.get (name)
+        if node is None:
+            node = self.children [name] = SpanNode (name)
+        return node
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the subtree to plain dictionaries.
+
+        Returns:
+        Dict[str, Any]: The name, number of calls, total and self time in seconds, counters and children of the node.
+        """
+        children = [child.to_dict () for child in self.children.values ()]
+        return {"name": self.name, "calls": self.calls, "total_time": self.total_time,
+                "self_time": self.total_time - sum (child ["total_time"] for child in children),
+                "counters": dict (self.counters), "children": children}
+
+class Span:
+    """
+    A context manager timing one call of a stage.
+    """
+    __slots__ = ("instrumentation", "name", "args", "node", "start")
+
+    def __init__(self, instrumentation: 'Instrumentation', name: str, args: Dict[str, Any]):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.args = args
+
+    def __enter__(self) -> 'Span':
+        stack = self.instrumentation.stack ()
+        with self.instrumentation.lock:
+            self.node = stack [-1].child (self.name)
+        stack.append (self.node)
+        self.start = time.perf_counter ()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        end = time.perf_counter ()
+        stack = self.instrumentation.stack ()
+        # A reset while the span was open gave the thread a fresh stack, which does not hold the span
+        if stack [-1] is self.node:
+            stack.pop ()
+        with self.instrumentation.lock:
+            self.node.calls += 1
+            self.node.total_time += end - self.start
+            if self.instrumentation.keep_events:
+                self.instrumentation.events.append ({"name": self.name, "ph": "X", "ts": self.instrumentation.microseconds (self.start),
+                                                     "dur": (end - self.start) * 1e6, "pid": os.getpid (),
+                                                     "tid": threading.get_ident (), "args": self.args})
+
+class NullSpan:
+    """
+    The span handed out while the instrumentation is disabled. It does nothing.
+    """
+    __slots__ = ()
+
+    def __enter__(self) -> 'NullSpan':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+NULL_SPAN = NullSpan ()
+
+class Instrumentation:
+    """
+    Spans and counters recording where the time of a run goes.
+
+    Spans nest: a span opened inside another becomes its child in the timing tree, and calls
+    of the same span under the same parent are merged into one node. Counters are added to the
+    innermost open span. While disabled, span returns a shared do-nothing context manager and
+    count returns at once, so instrumented code pays one attribute test per call.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.keep_events = True
+        self.lock = threading.Lock ()
+        self.local = threading.local ()
+        self.reset ()
+
+    def reset(self) -> None:
+        """
+        Discard everything recorded so far.
+        """
+        with self.lock:
+            self.root = SpanNode ("run")
+            self.counters = defaultdict (float)
+            self.events = []
+            self.origin = time.perf_counter ()
+            self.local = threading.local ()
+
+    def enable(self, keep_events: bool = True) -> None:
+        """
+        Start recording.
+
+        Parameters:
+        keep_events (bool): If True every span call is kept for the Chrome trace, otherwise only the timing tree is built.
+        """
+        self.keep_events = keep_events
+        self.enabled = True
+
+    def disable(self) -> None:
+        """
+        Stop recording, keeping what was recorded.
+        """
+        self.enabled = False
+
+    def stack(self) -> List[SpanNode]:
+        """
+        Get the open spans of the current thread, the root of the tree first.
+
+        Returns:
+        List[SpanNode]: The stack of open spans.
+        """
+        stack = getattr (self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = [self.root]
+        return stack
+
+    def microseconds(self, instant: float) -> float:
+        """
+        Convert a perf_counter instant to microseconds since the last reset.
+
+        Parameters:
+        instant (float): The instant.
+
+        Returns:
+        float: The time since the last reset, in microseconds.
+        """
+        return (instant - self.origin) * 1e6
+
+    def span(self, name: str, **args: Any) -> Any:
+        """
+        Time a stage.
+
+        Parameters:
+        name (str): The name of the stage (e.g., 'simulation').
+        **args (Any): Details of the call, written to the Chrome trace.
+
+        Returns:
+        Any: A context manager.
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span (self, name, args)
+
+    def count(self, name: str, amount: float = 1) -> None:
+        """
+        Add to a counter, globally and on the innermost open span.
+
+        Parameters:
+        name (str): The name of the counter (e.g., 'output states').
+        amount (float): The amount to add.
+        """
+        if not self.enabled:
+            return
+        node = self.stack () [-1]
+        with self.lock:
+            node.counters [name] += amount
+            self.counters [name] += amount
+            if self.keep_events:
+                self.events.append ({"name": name, "ph": "C", "ts": self.microseconds (time.perf_counter ()), "pid": os.getpid (),
+                                     "tid": threading.get_ident (), "args": {name: self.counters [name]}})
+
+    def instrumented(self, name: Optional[str] = None) -> Callable:
+        """
+        Decorate a function so that each of its calls is a span.
+
+        Parameters:
+        name (Optional[str]): The name of the span. Defaults to the qualified name of the function.
+
+        Returns:
+        Callable: The decorator.
+        """
+        def decorator(function: Callable) -> Callable:
+            span_name = name or function.__qualname__
+
+            @functools.wraps (function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function (*args, **kwargs)
+                with Span (self, span_name, {}):
+                    return function (*args, **kwargs)
+
+            return wrapper
+        return decorator
+
+    def timing_tree(self) -> Dict[str, Any]:
+        """
+        Get the timing tree of the run.
+
+        Returns:
+        Dict[str, Any]: The root node, whose total time is the time spent in its children.
+        """
+        with self.lock:
+            self.root.total_time = sum (child.total_time for child in self.root.children.values ())
+            tree = self.root.to_dict ()
+        return tree
+
+    def save_json(self, path: str) -> None:
+        """
+        Save the timing tree and the counters as JSON.
+
+        Parameters:
+        path (str): The file to write.
+        """
+        with open (path, "w") as report_file:
+            json.dump ({"tree": self.timing_tree (), "counters": dict (self.counters)}, report_file, indent=1)
+
+    def save_chrome_trace(self, path: str) -> None:
+        """
+        Save the recorded span calls and counters in the Chrome trace event format, readable by chrome://tracing and Perfetto.
+
+        Parameters:
+        path (str): The file to write.
+        """
+        with self.lock:
+            events = list (self.events)
+        with open (path, "w") as trace_file:
+            json.dump ({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file, default=str)
+
+# The instrumentation shared by the devices and calculators
+PROFILER = Instrumentation ()
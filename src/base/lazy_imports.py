@@ -0,0 +1,42 @@
+import importlib
+import sys
+
+from typing import Any, Callable, Dict, List, Tuple
+
+def attach(package_name: str, submodule_attributes: Dict[str, List[str]]) -> Tuple[Callable[[str], Any], Callable[[], List[str]], List[str]]:
+    """
+    Export the attributes of the submodules of a package without importing them, with module level __getattr__ (PEP 562).
+
+    A submodule is imported the first time one of its attributes is read from the package, so
+    importing a package, or a light submodule of it, no longer pays for its heavy siblings.
+    'from package import *' still exports every listed attribute, importing every submodule.
+    Unlike with star imports, an attribute named like its submodule is shadowed by the submodule.
+
+    Parameters:
+    package_name (str): The name of the package, i.e. its __name__.
+    submodule_attributes (Dict[str, List[str]]): The attributes exported from each submodule. When two submodules export the same name the later one wins, as with star imports.
+
+    Returns:
+    Tuple[Callable[[str], Any], Callable[[], List[str]], List[str]]: The __getattr__, __dir__ and __all__ of the package.
+    """
+    owners = {}
+    for submodule, attributes in submodule_attributes.items ():
+        for attribute in attributes:
+            owners [attribute] = submodule
+
+    def __getattr__(name: str) -> Any:
+        # A submodule named like one of its attributes (e.g., permanents) is the submodule, as the import system binds it
+        if name in submodule_attributes:
+            return importlib.import_module ("{}.{}".format (package_name, name))
+        if name in owners:
+            module = importlib.import_module ("{}.{}".format (package_name, owners [name]))
+            value = getattr (module, name)
+            # Later reads find the attribute on the package and skip __getattr__
+            setattr (sys.modules [package_name], name, value)
+            return value
+        raise AttributeError("module {!r} has no attribute {!r}".format (package_name, name))
+
+    def __dir__() -> List[str]:
+        return sorted (set (owners) | set (submodule_attributes))
+
+    return __getattr__, __dir__, list (owners)
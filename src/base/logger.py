@@ -0,0 +1,77 @@
+import logging
+
+from typing import Any, Callable, Optional, TextIO
+
+# Every module logs under this name, so the whole package is silenced or enabled at once
+PROJECT_LOGGER_NAME = "quindcert"
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get the logger of a module, a child of the project logger.
+
+    Messages should be passed as a template and arguments (e.g., logger.debug ("[Tag] %s", value))
+    so that nothing is formatted when the level is disabled.
+
+    Parameters:
+    name (str): The name of the module.
+
+    Returns:
+    logging.Logger: The logger.
+    """
+    return logging.getLogger ("{}.{}".format (PROJECT_LOGGER_NAME, name))
+
+class LazyRender:
+    """
+    An argument of a log message that is only rendered if the message is emitted.
+
+    Lazy formatting only defers str () on the arguments; renders such as Circuit.describe ()
+    or matrix dumps are still computed when the arguments are built, unless they are wrapped.
+    """
+    __slots__ = ("function", "args")
+
+    def __init__(self, function: Callable[..., Any], *args: Any):
+        """
+        Initialize the render.
+
+        Parameters:
+        function (Callable[..., Any]): The function computing the value to log.
+        *args (Any): Its arguments.
+        """
+        self.function = function
+        self.args = args
+
+    def __str__(self) -> str:
+        return str (self.function (*self.args))
+
+    __repr__ = __str__
+
+def lazy(function: Callable[..., Any], *args: Any) -> LazyRender:
+    """
+    Defer an expensive render to the moment a log message is emitted.
+
+    Parameters:
+    function (Callable[..., Any]): The function computing the value to log (e.g., circuit.describe).
+    *args (Any): Its arguments.
+
+    Returns:
+    LazyRender: The deferred render.
+    """
+    return LazyRender (function, *args)
+
+def configure_logging(level: int = logging.INFO, stream: Optional[TextIO] = None) -> logging.Handler:
+    """
+    Send the messages of the project logger at or above a level to a stream.
+
+    Parameters:
+    level (int): The lowest level emitted.
+    stream (Optional[TextIO]): The stream. Defaults to the standard error.
+
+    Returns:
+    logging.Handler: The handler added to the project logger.
+    """
+    project_logger = logging.getLogger (PROJECT_LOGGER_NAME)
+    handler = logging.StreamHandler (stream)
+    handler.setFormatter (logging.Formatter ("%(levelname)s %(name)s: %(message)s"))
+    project_logger.addHandler (handler)
+    project_logger.setLevel (level)
+    return handler
@@ -0,0 +1,68 @@
+import numpy as np
+
+from typing import Any
+
+def permanents(matrices: Any, chunk_size: int = 1 << 14) -> np.ndarray:
+    """
+    Compute the permanents of a stack of square matrices with Glynn's formula.
+
+    perm(A) = 2^-(n-1) sum_delta (prod_k delta_k) prod_j (sum_i delta_i a_ij), over the
+    sign vectors delta with delta_0 = 1. The sign vectors are visited in Gray code order, so
+    consecutive ones differ by one sign and the sums of the signed rows of a term are the ones
+    of the previous term plus or minus twice one row. The terms are processed in chunks applied
+    to the whole stack at once: the row sums of the first term of a chunk are computed directly,
+    the others are a cumulative sum of these one row updates. The cost is O(2^(n-1) n) per
+    matrix, with no Python loop over the terms.
+
+    Parameters:
+    matrices (Any): A (k x n x n) stack of matrices.
+    chunk_size (int): The number of sign vectors handled per chunk.
+
+    Returns:
+    np.ndarray: The permanent of each matrix.
+    """
+    matrices = np.asarray (matrices)
+    if matrices.ndim != 3 or matrices.shape [1] != matrices.shape [2]:
+        raise ValueError("Expected a stack of square matrices, got shape {}.".format (matrices.shape))
+
+    k, n, _ = matrices.shape
+    dtype = np.result_type (matrices, float)
+    if n == 0:
+        return np.ones (k, dtype=dtype)
+
+    number_of_terms = 1 << (n - 1)
+    totals = np.zeros (k, dtype=dtype)
+    bits = np.arange (n - 1)
+    for start in range (0, number_of_terms, chunk_size):
+        terms = np.arange (start, min (start + chunk_size, number_of_terms))
+        # The sign vector of the term t flips the rows 1 + b for the bits b of its Gray code t ^ (t >> 1)
+        first_signs = np.ones (n)
+        first_signs [1:] -= 2 * (((start ^ (start >> 1)) >> bits) & 1)
+
+        # Going from the term t - 1 to t flips the row 1 + b, b the lowest set bit of t, to the sign of that bit in the Gray code of t
+        steps = terms [1:]
+        flipped = np.log2 (steps & -steps).astype (int)
+        directions = 1 - 2 * (((steps ^ (steps >> 1)) >> flipped) & 1)
+
+        # (k x terms x n) sums of the signed rows, multiplied along the columns
+        row_sums = np.empty ((k, len (terms), n), dtype=dtype)
+        row_sums [:, 0] = np.einsum ('i,kij->kj', first_signs, matrices)
+        row_sums [:, 1:] = 2 * directions [:, np.newaxis] * matrices [:, flipped + 1]
+        np.cumsum (row_sums, axis=1, out=row_sums)
+
+        # A Gray code has the parity of its term, so the product of the signs alternates
+        totals += np.prod (row_sums, axis=2) @ (1 - 2 * (terms & 1))
+
+    return totals / number_of_terms
+
+def permanent(matrix: Any) -> complex:
+    """
+    Compute the permanent of a square matrix with Glynn's formula.
+
+    Parameters:
+    matrix (Any): The matrix.
+
+    Returns:
+    complex: The permanent, a float for real matrices.
+    """
+    return permanents (np.asarray (matrix) [np.newaxis]) [0]
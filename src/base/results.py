@@ -92,4 +92,30 @@ class StatesAndProbabilities:
         
         self.states_and_probabilities = combined_probs
 
+    def save(self, path: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Save the results to an .npz archive of columns (see base.results_archive).
+
+        Parameters:
+        path (str): The file to write.
+        metadata (Optional[Dict[str, Any]]): Plain values describing the results, stored as JSON.
+        """
+        from base.results_archive import save_results
+        save_results (path, self, metadata)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'StatesAndProbabilities':
+        """
+        Load results saved with save.
+
+        Parameters:
+        path (str): The archive.
+        mmap (bool): Map the archive in memory instead of reading it.
+
+        Returns:
+        StatesAndProbabilities: The results.
+        """
+        from base.results_archive import load_results
+        return load_results (path, mmap)
+
 
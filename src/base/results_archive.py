@@ -0,0 +1,265 @@
+import json
+import struct
+import zipfile
+import numpy as np
+
+from typing import Any, Dict, Iterator, List, Optional
+
+from base.results import StatesAndProbabilities
+from base.state_generation_helpers import occupation_matrix_to_states, states_to_occupation_matrix
+
+ARCHIVE_VERSION = 1
+
+# The size of the fixed part of a zip local file header, before the file name and the extra field
+ZIP_LOCAL_HEADER_SIZE = 30
+
+def occupation_dtype (largest_occupation: int) -> np.dtype:
+    """
+    Get the smallest unsigned integer type holding the occupations of the modes.
+
+    Parameters:
+    largest_occupation (int): The largest number of photons in a mode.
+
+    Returns:
+    np.dtype: The type.
+    """
+    return np.min_scalar_type (max (int (largest_occupation), 0))
+
+def result_sets_to_columns (result_sets: Dict[str, StatesAndProbabilities]) -> Dict[str, np.ndarray]:
+    """
+    Convert named results to columns: one row per output state, the states of each set being contiguous.
+
+    The states of a set are the ones with a probability or a counting; a missing probability is
+    NaN and a missing counting is -1. The occupations of sets with fewer modes are padded with zeros.
+
+    Parameters:
+    result_sets (Dict[str, StatesAndProbabilities]): The results, by name.
+
+    Returns:
+    Dict[str, np.ndarray]: The names, offsets and modes of the sets, and the occupations, probabilities and countings of their states.
+    """
+    occupations, probabilities, countings, modes, offsets = [], [], [], [], [0]
+    for results in result_sets.values ():
+        states = list (results.states_and_probabilities)
+        states += [state for state in results.states_and_countings if state not in results.states_and_probabilities]
+        occupations.append (states_to_occupation_matrix (states))
+        probabilities.append (np.array ([results.states_and_probabilities.get (state, np.nan) for state in states], dtype=float))
+        countings.append (np.array ([results.states_and_countings.get (state, -1) for state in states], dtype=np.int64))
+        modes.append (occupations [-1].shape [1])
+        offsets.append (offsets [-1] + len (states))
+
+    width = max (modes, default=0)
+    largest = max ((int (matrix.max ()) for matrix in occupations if matrix.size), default=0)
+    matrix = np.zeros ((offsets [-1], width), dtype=occupation_dtype (largest))
+    for start, stop, occupations_ in zip (offsets [:-1], offsets [1:], occupations):
+        matrix [start:stop, :occupations_.shape [1]] = occupations_
+
+    countings = np.concatenate (countings) if countings else np.zeros (0, dtype=np.int64)
+    # The countings take the smallest signed type holding them and the -1 of the missing ones
+    countings_dtype = np.promote_types (np.int8, np.min_scalar_type (int (countings.max (initial=0))))
+    return {"names": np.array (list (result_sets), dtype=str), "offsets": np.array (offsets, dtype=np.int64),
+            "modes": np.array (modes, dtype=np.int64), "occupations": matrix,
+            "probabilities": np.concatenate (probabilities) if probabilities else np.zeros (0),
+            "countings": countings.astype (countings_dtype)}
+
+def save_result_sets (path: str, result_sets: Dict[str, StatesAndProbabilities], metadata: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Save named results to an uncompressed .npz archive of columns, which ResultsArchive maps in memory.
+
+    Parameters:
+    path (str): The file to write.
+    result_sets (Dict[str, StatesAndProbabilities]): The results, by name.
+    metadata (Optional[Dict[str, Any]]): Plain values describing the results, stored as JSON.
+    """
+    columns = result_sets_to_columns (result_sets)
+    columns ["metadata"] = np.array (json.dumps ({"version": ARCHIVE_VERSION, "metadata": metadata or {}}))
+    # Uncompressed members are stored as is, so their data can be mapped from the file
+    with open (path, "wb") as archive_file:
+        np.savez (archive_file, **columns)
+
+def save_results (path: str, results: StatesAndProbabilities, metadata: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Save results to an .npz archive.
+
+    Parameters:
+    path (str): The file to write.
+    results (StatesAndProbabilities): The results.
+    metadata (Optional[Dict[str, Any]]): Plain values describing the results, stored as JSON.
+    """
+    save_result_sets (path, {"results": results}, metadata)
+
+def memory_map_npz (path: str) -> Dict[str, np.ndarray]:
+    """
+    Map the arrays of an uncompressed .npz archive in memory, without reading them.
+
+    np.load ignores mmap_mode for .npz archives. The members of an uncompressed archive are .npy
+    files stored as is, so each array is mapped at the offset of its data in the archive.
+
+    Parameters:
+    path (str): The archive.
+
+    Returns:
+    Dict[str, np.ndarray]: The read-only arrays, by name.
+    """
+    arrays = {}
+    with zipfile.ZipFile (path) as archive, open (path, "rb") as archive_file:
+        for member in archive.infolist ():
+            name = member.filename [:-len (".npy")] if member.filename.endswith (".npy") else member.filename
+            if member.compress_type != zipfile.ZIP_STORED:
+                raise ValueError("The member {} of {} is compressed and cannot be mapped.".format (member.filename, path))
+
+            archive_file.seek (member.header_offset)
+            local_header = archive_file.read (ZIP_LOCAL_HEADER_SIZE)
+            name_length, extra_length = struct.unpack ("<HH", local_header [26:30])
+            archive_file.seek (member.header_offset + ZIP_LOCAL_HEADER_SIZE + name_length + extra_length)
+
+            version = np.lib.format.read_magic (archive_file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0 (archive_file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0 (archive_file)
+            if dtype.hasobject:
+                raise ValueError("The member {} of {} holds Python objects.".format (member.filename, path))
+
+            # Scalars and empty arrays have nothing worth mapping (and empty maps are not allowed)
+            if len (shape) == 0 or 0 in shape:
+                with archive.open (member) as member_file:
+                    arrays [name] = np.lib.format.read_array (member_file)
+                continue
+            arrays [name] = np.memmap (path, dtype=dtype, mode="r", offset=archive_file.tell (), shape=shape,
+                                       order="F" if fortran_order else "C")
+    return arrays
+
+class ResultsArchive:
+    """
+    Named results loaded from an .npz archive written by save_result_sets.
+
+    The columns are mapped in memory by default, so opening an archive reads none of the results:
+    the occupations, probabilities and countings of a set are views on the file, and analyses
+    working on these arrays never parse states. results rebuilds the StatesAndProbabilities of a set.
+    """
+
+    def __init__ (self, path: str, mmap: bool = True):
+        """
+        Open an archive.
+
+        Parameters:
+        path (str): The archive.
+        mmap (bool): Map the columns in memory instead of reading them.
+        """
+        if mmap:
+            self.columns = memory_map_npz (path)
+        else:
+            with np.load (path) as archive:
+                self.columns = {name: archive [name] for name in archive.files}
+
+        values = json.loads (str (self.columns ["metadata"]))
+        if values ["version"] > ARCHIVE_VERSION:
+            raise ValueError("The archive {} has version {}, expected at most {}.".format (path, values ["version"], ARCHIVE_VERSION))
+        self.metadata: Dict[str, Any] = values ["metadata"]
+        self.names: List[str] = [str (name) for name in self.columns ["names"]]
+        self.indexes = {name: index for index, name in enumerate (self.names)}
+
+    def __len__ (self) -> int:
+        return len (self.names)
+
+    def __iter__ (self) -> Iterator[str]:
+        return iter (self.names)
+
+    def __contains__ (self, name: str) -> bool:
+        return name in self.indexes
+
+    def rows (self, name: str) -> slice:
+        """
+        Get the rows of the states of a set.
+
+        Parameters:
+        name (str): The name of the set.
+
+        Returns:
+        slice: The rows.
+        """
+        if name not in self.indexes:
+            raise ValueError("No results named {} in the archive.".format (name))
+        index = self.indexes [name]
+        return slice (int (self.columns ["offsets"][index]), int (self.columns ["offsets"][index + 1]))
+
+    def occupations (self, name: str) -> np.ndarray:
+        """
+        Get the occupation matrix of the states of a set, without copy.
+
+        Parameters:
+        name (str): The name of the set.
+
+        Returns:
+        np.ndarray: A (number of states x number of modes) matrix of occupations.
+        """
+        return self.columns ["occupations"][self.rows (name), :int (self.columns ["modes"][self.indexes [name]])]
+
+    def probabilities (self, name: str) -> np.ndarray:
+        """
+        Get the probabilities of the states of a set, without copy. A missing probability is NaN.
+
+        Parameters:
+        name (str): The name of the set.
+
+        Returns:
+        np.ndarray: The probabilities.
+        """
+        return self.columns ["probabilities"][self.rows (name)]
+
+    def countings (self, name: str) -> np.ndarray:
+        """
+        Get the countings of the states of a set, without copy. A missing counting is -1.
+
+        Parameters:
+        name (str): The name of the set.
+
+        Returns:
+        np.ndarray: The countings.
+        """
+        return self.columns ["countings"][self.rows (name)]
+
+    def states (self, name: str) -> List[str]:
+        """
+        Get the states of a set, as strings (e.g., '|1,0,1>').
+
+        Parameters:
+        name (str): The name of the set.
+
+        Returns:
+        List[str]: The states.
+        """
+        return occupation_matrix_to_states (self.occupations (name))
+
+    def results (self, name: str) -> StatesAndProbabilities:
+        """
+        Rebuild the results of a set.
+
+        Parameters:
+        name (str): The name of the set.
+
+        Returns:
+        StatesAndProbabilities: The results.
+        """
+        results = StatesAndProbabilities ()
+        states = self.states (name)
+        probabilities = self.probabilities (name).tolist ()
+        countings = self.countings (name).tolist ()
+        results.states_and_probabilities = {state: probability for state, probability in zip (states, probabilities) if probability == probability}
+        results.states_and_countings = {state: counting for state, counting in zip (states, countings) if counting >= 0}
+        return results
+
+def load_results (path: str, mmap: bool = True) -> StatesAndProbabilities:
+    """
+    Load the results saved with save_results.
+
+    Parameters:
+    path (str): The archive.
+    mmap (bool): Map the columns in memory instead of reading them.
+
+    Returns:
+    StatesAndProbabilities: The results.
+    """
+    archive = ResultsArchive (path, mmap)
+    return archive.results (archive.names [0])
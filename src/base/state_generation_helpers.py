@@ -1,15 +1,17 @@
-import logging
-import perceval as pcvl
 import numpy as np
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Iterator
+from .logger import get_logger
 
-def create_dummy_state() -> pcvl.BasicState:
+logger = get_logger (__name__)
+
+def create_dummy_state() -> 'pcvl.BasicState':
     """
     Create a dummy quantum state.
     
     Returns:
     pcvl.BasicState: The created dummy state.
     """
+    import perceval as pcvl
     return pcvl.BasicState('|1, 0>')
 
 def polarize_state(state: str, polarizations: List[Tuple[float, float]]) -> str:
@@ -24,7 +26,7 @@ def polarize_state(state: str, polarizations: List[Tuple[float, float]]) -> str:
     str: The polarized state.
     """
     
-    print ("Entering polarizations: {}".format (polarizations))
+    logger.debug ("Entering polarizations: %s", polarizations)
 
     modes_filling = [int(occ) for occ in state [1:len(state)-1].split (",")]
     pos = 0
@@ -37,20 +39,20 @@ def polarize_state(state: str, polarizations: List[Tuple[float, float]]) -> str:
             polarization_s = "{P:("
             polarization_s += "{},{}".format(pol_angle_1,pol_angle_2)   
             polarization_s += ")}"
-            print ("Polarization: {}".format (polarization_s))
+            logger.debug ("Polarization: %s", polarization_s)
         else:
             polarization_s = "0"
 
         polarization_strings.append (polarization_s)
         
-    print ("Polarization strings {}".format (polarization_strings))
+    logger.debug ("Polarization strings %s", polarization_strings)
     new_state = "|"
     for pol in polarization_strings:
         new_state += pol
         new_state += ","
 
     new_state = new_state[0:len(new_state)-1] + ">"
-    print ("Resultant state: {}".format (new_state))
+    logger.debug ("Resultant state: %s", new_state)
     return new_state
 
 def generate_bunching_initial_state(number_of_modes: int) -> str:
@@ -90,7 +92,7 @@ def generate_states_on_indexes(indexes: List[int], number_of_modes: int) -> str:
     Returns:
     str: The generated state.
     """
-    logging.debug ("indexes: {}".format (str (indexes)))
+    logger.debug ("indexes: %s", indexes)
     numbers = np.zeros (number_of_modes, dtype=int)
     for index in indexes:
         numbers [index] = numbers [index] + 1
@@ -103,7 +105,7 @@ def generate_states_on_indexes(indexes: List[int], number_of_modes: int) -> str:
             state += ","
     
     state += '>'
-    logging.debug ("State: {}".format (state))
+    logger.debug ("State: %s", state)
     return state
         
 def valid(partition: List[int]) -> bool:
@@ -234,6 +236,61 @@ def generate_state_from_list(state_l: List[int]) -> str:
     state += '>'
     return state
 
+def state_to_list(state: str) -> List[int]:
+    """
+    Convert a state string back into its list of mode occupations.
+
+    Parameters:
+    state (str): The state string (e.g., '|1,0,2>').
+
+    Returns:
+    List[int]: The occupation of each mode.
+    """
+    state = str (state)
+    return [int (occ) for occ in state[1:len(state)-1].split (",")]
+
+def states_to_occupation_matrix(states: List[str]) -> np.ndarray:
+    """
+    Convert state strings with the same number of modes into a matrix of occupations, parsing them in one pass.
+
+    Parameters:
+    states (List[str]): The state strings (e.g., '|1,0,2>').
+
+    Returns:
+    np.ndarray: A (number of states x number of modes) matrix of occupations.
+    """
+    states = [str (state) for state in states]
+    if not states:
+        return np.zeros ((0, 0), dtype=int)
+    occupations = ",".join (state [1:len(state)-1] for state in states).split (",")
+    return np.array (occupations, dtype=int).reshape (len (states), -1)
+
+def occupation_matrix_to_states(occupations: np.ndarray) -> List[str]:
+    """
+    Convert a matrix of occupations into state strings, the inverse of states_to_occupation_matrix.
+
+    When every occupation is a single digit the states are written as ASCII bytes in one pass,
+    instead of formatting every occupation separately.
+
+    Parameters:
+    occupations (np.ndarray): A (number of states x number of modes) matrix of occupations.
+
+    Returns:
+    List[str]: The state strings (e.g., '|1,0,2>').
+    """
+    occupations = np.asarray (occupations)
+    number_of_states, number_of_modes = occupations.shape
+    if number_of_states == 0 or number_of_modes == 0 or occupations.min () < 0 or occupations.max () > 9:
+        return [generate_state_from_list (row) for row in occupations.tolist ()]
+
+    # One row of bytes per state: '|', the digits separated by commas, '>' and a newline
+    characters = np.full ((number_of_states, 2 * number_of_modes + 2), ord (","), dtype=np.uint8)
+    characters [:, 0] = ord ("|")
+    characters [:, 1:2 * number_of_modes:2] = occupations + ord ("0")
+    characters [:, 2 * number_of_modes] = ord (">")
+    characters [:, 2 * number_of_modes + 1] = ord ("\n")
+    return characters.tobytes ().decode ("ascii").splitlines ()
+
 def generate_initial_states(all_possible_partitions: List[List[int]], modes: int) -> Dict[str, Dict[str, int]]:
     """
     Generate initial states for all possible partitions.
@@ -281,6 +338,40 @@ def generate_partition_h (prefix, remain, n, partitions):
         generate_partition_h (prefix + remain [:1], remain [1:], len (remain [1:]), partitions)
         i+=1
 
+def iter_partitions(n: int) -> Iterator[List[int]]:
+    """
+    Lazily generate the partitions of a given number, each one only once, using the ascending composition algorithm.
+    
+    Parameters:
+    n (int): The number to partition.
+    
+    Returns:
+    Iterator[List[int]]: The partitions, with their parts in non-increasing order.
+    """
+    if n < 1:
+        return
+
+    parts = [0 for i in range (n + 1)]
+    k = 1
+    y = n - 1
+    while k != 0:
+        x = parts [k - 1] + 1
+        k -= 1
+        while 2 * x <= y:
+            parts [k] = x
+            y -= x
+            k += 1
+        l = k + 1
+        while x <= y:
+            parts [k] = x
+            parts [l] = y
+            yield parts [k + 1::-1]
+            x += 1
+            y -= 1
+        parts [k] = x + y
+        y = x + y - 1
+        yield parts [k::-1]
+
 def generate_partitions(n: int) -> List[List[int]]:
     """
     Generate partitions of a given number.
@@ -289,12 +380,54 @@ def generate_partitions(n: int) -> List[List[int]]:
     n (int): The number to partition.
     
     Returns:
-    List[List[int]]: The list of partitions.
+    List[List[int]]: The list of partitions, in lexicographic order.
+    """
+    return sorted (iter_partitions (n))
+
+def iter_multiset_permutations(nums: List[int]) -> Iterator[Tuple[int, ...]]:
+    """
+    Lazily generate the distinct permutations of a multiset, in cool-lex order.
+
+    Every permutation is obtained from the previous one by a single prefix shift on a linked
+    list, so the next permutation is found in constant time and only one is held at a time.
+    
+    Parameters:
+    nums (List[int]): The multiset.
+    
+    Returns:
+    Iterator[Tuple[int, ...]]: The distinct permutations.
     """
-    base_partition = [1 for i in range (0, n)]
-    partitions = [base_partition]
-    generate_partition_h ([], base_partition, n, partitions)
-    return partitions
+    values = sorted (nums, reverse=True)
+    n = len (values)
+    if n < 2:
+        yield tuple (values)
+        return
+
+    following = list (range (1, n)) + [None]
+    head, i, j = 0, n - 2, n - 1
+
+    def visit():
+        permutation = []
+        node = head
+        while node is not None:
+            permutation.append (values [node])
+            node = following [node]
+        return tuple (permutation)
+
+    yield visit ()
+    while following [j] is not None or values [j] < values [head]:
+        if following [j] is not None and values [i] >= values [following [j]]:
+            shifted = j
+        else:
+            shifted = i
+        moved = following [shifted]
+        following [shifted] = following [moved]
+        following [moved] = head
+        if values [moved] < values [head]:
+            i = moved
+        j = following [i]
+        head = moved
+        yield visit ()
 
 def unique_permutations(nums: List[int]) -> set:
     """
@@ -306,8 +439,7 @@ def unique_permutations(nums: List[int]) -> set:
     Returns:
     set: The set of unique permutations.
     """
-    nums.sort()  # sort the list to ensure similar numbers are adjacent
-    return set(itertools.permutations(nums))
+    return set(iter_multiset_permutations(nums))
 
 def generate_all_orders_for_partitions (partitions):
     """
@@ -356,29 +488,55 @@ def generate_states_from_orders(orders: Dict[str, set], modes: int) -> Dict[str,
     """
     states = {}
     for part in orders:
-        logging.debug ("[State generation] Partition {}".format (part))
+        logger.debug ("[State generation] Partition %s", part)
         set_of_orders = orders [part]
         
         states_for_part = []
         
         for order in set_of_orders:
-            logging.debug ("[State generation] Possible order for partition: {}".format (order))
-            states_for_order = []
-            
-            i = 0
-            for element in order:
-                blank_state = [0 for x in range(modes)]
-                number_of_photons = element
-                while number_of_photons > 0:
-                    blank_state [i] = 1
-                    i = i + 1
-                    number_of_photons = number_of_photons - 1
-                logging.debug ("[State generation] Bosonic state to consider. {}".format (blank_state))
-                states_for_order.append (blank_state)
-            states_for_part.append (states_for_order)
+            logger.debug ("[State generation] Possible order for partition: %s", order)
+            states_for_part.append (generate_states_from_order (order, modes))
         states [part] = states_for_part 
-        logging.debug ("[State generation] States for partition  {}".format (states_for_part))
+        logger.debug ("[State generation] States for partition  %s", states_for_part)
     return states
+
+def generate_states_from_order(order: Tuple[int, ...], modes: int) -> List[List[int]]:
+    """
+    Generate the states of one order of a partition, each part filling the next modes with one photon each.
+    
+    Parameters:
+    order (Tuple[int, ...]): The order of the parts.
+    modes (int): The number of modes.
+    
+    Returns:
+    List[List[int]]: The states, one per part.
+    """
+    states_for_order = []
+    
+    i = 0
+    for element in order:
+        blank_state = [0 for x in range(modes)]
+        blank_state [i:i + element] = [1] * element
+        i = i + element
+        states_for_order.append (blank_state)
+    return states_for_order
+
+def iter_state_combinations(number_of_modes: int, all_orders: bool = True) -> Iterator[Tuple[str, List[List[int]]]]:
+    """
+    Lazily generate the state combinations for a given number of modes, holding a single combination at a time.
+    
+    Parameters:
+    number_of_modes (int): The number of modes.
+    all_orders (bool): If True every distinct order of each partition is generated, otherwise only the non-increasing one.
+    
+    Returns:
+    Iterator[Tuple[str, List[List[int]]]]: The key of the partition and the states of one of its orders.
+    """
+    for partition in iter_partitions (number_of_modes):
+        key = ' '.join(map(str, partition))
+        orders = iter_multiset_permutations (partition) if all_orders else [tuple (partition)]
+        for order in orders:
+            yield (key, generate_states_from_order (order, number_of_modes))
     
 def generate_all_state_combinations(number_of_modes: int) -> Dict[str, List[List[int]]]:
     """
@@ -0,0 +1,340 @@
+import numpy as np
+
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Any, List, Optional
+
+from .abstract_circuit import AbstractCircuit
+from .logger import get_logger
+
+logger = get_logger (__name__)
+
+class UnitarityCheck(Enum):
+    STRICT = "strict"
+    WARN = "warn"
+    SKIP = "skip"
+
+class CircuitFactor(ABC):
+    """
+    One factor of the composition chain of a StructuredCircuit.
+
+    Factors know how to multiply a dense matrix on its right without building their own
+    dense matrix, which is where structured factors save work.
+    """
+
+    unitary_by_construction = False
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+
+    def to_matrix(self) -> np.ndarray:
+        """
+        Build the dense matrix of the factor.
+
+        Returns:
+        np.ndarray: The dense matrix.
+        """
+        return self.multiply_right (np.eye (self.dimension, dtype=complex))
+
+    @abstractmethod
+    def multiply_right(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Multiply a dense matrix by the factor.
+
+        Parameters:
+        matrix (np.ndarray): The matrix on the left.
+
+        Returns:
+        np.ndarray: The product matrix @ factor.
+        """
+        pass
+
+    def merge(self, factor: 'CircuitFactor') -> Optional['CircuitFactor']:
+        """
+        Merge the factor with the factor that follows it in the chain, when both have the same structure.
+
+        Parameters:
+        factor (CircuitFactor): The following factor.
+
+        Returns:
+        Optional[CircuitFactor]: The merged factor, or None if they cannot be merged.
+        """
+        return None
+
+class DenseFactor(CircuitFactor):
+
+    def __init__(self, matrix: Any, verified: bool = False):
+        """
+        Initialize a dense factor.
+
+        Parameters:
+        matrix (Any): The matrix of the factor.
+        verified (bool): True if the matrix is already known to be unitary.
+        """
+        self.matrix = np.asarray (matrix)
+        super().__init__(self.matrix.shape [0])
+        self.unitary_by_construction = verified
+
+    def to_matrix(self) -> np.ndarray:
+        return self.matrix
+
+    def multiply_right(self, matrix: np.ndarray) -> np.ndarray:
+        return matrix @ self.matrix
+
+class PermutationFactor(CircuitFactor):
+
+    unitary_by_construction = True
+
+    def __init__(self, permutation: List[int]):
+        """
+        Initialize a permutation factor, which sends mode j to mode permutation[j].
+
+        Parameters:
+        permutation (List[int]): The image of each mode.
+        """
+        self.permutation = np.asarray (permutation, dtype=int)
+        super().__init__(len (self.permutation))
+        if not np.array_equal (np.sort (self.permutation), np.arange (self.dimension)):
+            raise ValueError("The provided list is not a permutation.")
+
+    def multiply_right(self, matrix: np.ndarray) -> np.ndarray:
+        return matrix [:, self.permutation]
+
+    def merge(self, factor: CircuitFactor) -> Optional[CircuitFactor]:
+        if not isinstance (factor, PermutationFactor):
+            return None
+        return PermutationFactor (self.permutation [factor.permutation])
+
+class DiagonalPhaseFactor(CircuitFactor):
+
+    unitary_by_construction = True
+
+    def __init__(self, phases: List[float]):
+        """
+        Initialize a diagonal factor of phase shifts.
+
+        Parameters:
+        phases (List[float]): The phase applied on each mode, in radians.
+        """
+        self.phases = np.asarray (phases, dtype=float)
+        super().__init__(len (self.phases))
+
+    def multiply_right(self, matrix: np.ndarray) -> np.ndarray:
+        return matrix * np.exp (1j * self.phases) [np.newaxis, :]
+
+    def merge(self, factor: CircuitFactor) -> Optional[CircuitFactor]:
+        if not isinstance (factor, DiagonalPhaseFactor):
+            return None
+        return DiagonalPhaseFactor (self.phases + factor.phases)
+
+class BlockDiagonalFactor(CircuitFactor):
+
+    def __init__(self, blocks: List[Any]):
+        """
+        Initialize a block diagonal factor, the blocks acting on consecutive groups of modes.
+
+        Parameters:
+        blocks (List[Any]): The square matrix of each block.
+        """
+        self.blocks = [np.asarray (block) for block in blocks]
+        self.offsets = np.cumsum ([0] + [block.shape [0] for block in self.blocks])
+        super().__init__(int (self.offsets [-1]))
+
+    def multiply_right(self, matrix: np.ndarray) -> np.ndarray:
+        result = np.empty (matrix.shape, dtype=np.result_type (matrix, *self.blocks))
+        for block, start, end in zip (self.blocks, self.offsets [:-1], self.offsets [1:]):
+            result [:, start:end] = matrix [:, start:end] @ block
+        return result
+
+class FourierFactor(CircuitFactor):
+
+    unitary_by_construction = True
+
+    def multiply_right(self, matrix: np.ndarray) -> np.ndarray:
+        # F[j][k] = exp(2 pi i jk/m)/sqrt(m), so multiplying by F is an inverse FFT over the columns
+        return np.fft.ifft (matrix, axis=1) * np.sqrt (self.dimension)
+
+class StructuredCircuit(AbstractCircuit):
+    """
+    An AbstractCircuit that records its composition chain instead of multiplying eagerly.
+
+    The dense unitary is only computed when the matrix is requested, multiplying the
+    structured factors in O(m) or O(m^2) each, and its unitarity is validated once at that
+    point, and only if some factor is not unitary by construction.
+    """
+
+    def __init__(self, n: int, factors: Optional[List[CircuitFactor]] = None,
+                 unitarity_check: UnitarityCheck = UnitarityCheck.STRICT, tolerance: float = 1e-8):
+        """
+        Initialize the circuit with a composition chain.
+
+        Parameters:
+        n (int): The number of modes.
+        factors (Optional[List[CircuitFactor]]): The factors of the chain, applied by matrix multiplication from left to right. The identity if not provided.
+        unitarity_check (UnitarityCheck): What to do when the materialized matrix is not unitary.
+        tolerance (float): The absolute tolerance of the unitarity check.
+        """
+        self.n = n
+        self.unitarity_check = unitarity_check
+        self.tolerance = tolerance
+        self.factors = []
+        self._matrix = None
+        self._fingerprints = {}
+        for factor in factors or []:
+            self.append (factor)
+
+    def append(self, factor: CircuitFactor) -> None:
+        """
+        Append a factor to the composition chain, merging it with the last factor when they share the same structure.
+
+        Parameters:
+        factor (CircuitFactor): The factor to append.
+        """
+        if factor.dimension != self.n:
+            raise ValueError("The factor acts on {} modes, the circuit has {}.".format (factor.dimension, self.n))
+        if self.frozen:
+            raise ValueError("The circuit is frozen, compose a copy of it instead.")
+
+        if self._matrix is not None:
+            self.factors = [DenseFactor (self._matrix, verified=True)]
+            self._matrix = None
+
+        merged = self.factors [-1].merge (factor) if self.factors else None
+        if merged is not None:
+            self.factors [-1] = merged
+        else:
+            self.factors.append (factor)
+
+    def compose(self, abstract_circuit: AbstractCircuit) -> None:
+        """
+        Compose the current circuit with another AbstractCircuit, deferring the matrix multiplication.
+
+        Parameters:
+        abstract_circuit (AbstractCircuit): The circuit to compose with.
+        """
+        if not isinstance(abstract_circuit, AbstractCircuit):
+            raise TypeError("Expected an instance of AbstractCircuit.")
+
+        if isinstance (abstract_circuit, StructuredCircuit) and not abstract_circuit.is_materialized ():
+            for factor in abstract_circuit.factors:
+                self.append (factor)
+        else:
+            self.append (DenseFactor (abstract_circuit.m, verified=True))
+
+    def is_materialized(self) -> bool:
+        """
+        Check if the dense matrix of the circuit is already computed.
+
+        Returns:
+        bool: True if the matrix is cached, False otherwise.
+        """
+        return self._matrix is not None or not self.factors
+
+    def materialize(self) -> np.ndarray:
+        """
+        Compute the dense matrix of the composition chain and validate its unitarity.
+
+        Returns:
+        np.ndarray: The matrix of the circuit.
+        """
+        if self._matrix is not None:
+            return self._matrix
+        if not self.factors:
+            return np.eye (self.n)
+
+        matrix = self.factors [0].to_matrix ()
+        for factor in self.factors [1:]:
+            matrix = factor.multiply_right (matrix)
+        logger.debug ("[Structured circuit] Materialized a chain of %s factors", len (self.factors))
+
+        needs_check = not all (factor.unitary_by_construction for factor in self.factors)
+        if needs_check and self.unitarity_check != UnitarityCheck.SKIP and not self.is_unitary_matrix (matrix):
+            if self.unitarity_check == UnitarityCheck.STRICT:
+                raise ValueError("The resulting matrix after composition is not unitary.")
+            logger.warning ("[Structured circuit] The resulting matrix after composition is not unitary")
+
+        self._matrix = matrix
+        return matrix
+
+    @property
+    def m(self) -> np.ndarray:
+        return self.materialize ()
+
+    @m.setter
+    def m(self, matrix: Any) -> None:
+        self.factors = [DenseFactor (matrix)]
+        self._matrix = None
+
+    def is_unitary_matrix(self, matrix: np.ndarray) -> bool:
+        """
+        Check if a matrix is unitary, within the tolerance of the circuit.
+
+        Parameters:
+        matrix (np.ndarray): The matrix to check.
+
+        Returns:
+        bool: True if the matrix is unitary, False otherwise.
+        """
+        return np.allclose(np.eye(self.n), matrix @ matrix.conj().T, rtol=0, atol=self.tolerance)
+
+    def is_unitary(self) -> bool:
+        """
+        Check if the matrix is unitary, within the tolerance of the circuit.
+
+        Returns:
+        bool: True if the matrix is unitary, False otherwise.
+        """
+        return self.is_unitary_matrix (self.m)
+
+    def __repr__(self) -> str:
+        return "StructuredCircuit(factors=[{}])".format (", ".join (type (factor).__name__ for factor in self.factors))
+
+def permutation_circuit(permutation: List[int]) -> StructuredCircuit:
+    """
+    Create a circuit that sends mode j to mode permutation[j].
+
+    Parameters:
+    permutation (List[int]): The image of each mode.
+
+    Returns:
+    StructuredCircuit: The permutation circuit.
+    """
+    return StructuredCircuit (len (permutation), [PermutationFactor (permutation)])
+
+def phase_circuit(phases: List[float]) -> StructuredCircuit:
+    """
+    Create a circuit of phase shifts on every mode.
+
+    Parameters:
+    phases (List[float]): The phase applied on each mode, in radians.
+
+    Returns:
+    StructuredCircuit: The phase circuit.
+    """
+    return StructuredCircuit (len (phases), [DiagonalPhaseFactor (phases)])
+
+def block_diagonal_circuit(blocks: List[Any], unitarity_check: UnitarityCheck = UnitarityCheck.STRICT) -> StructuredCircuit:
+    """
+    Create a circuit whose blocks act on consecutive groups of modes.
+
+    Parameters:
+    blocks (List[Any]): The square matrix of each block.
+    unitarity_check (UnitarityCheck): What to do when the materialized matrix is not unitary.
+
+    Returns:
+    StructuredCircuit: The block diagonal circuit.
+    """
+    factor = BlockDiagonalFactor (blocks)
+    return StructuredCircuit (factor.dimension, [factor], unitarity_check)
+
+def fourier_circuit(dimension: int) -> StructuredCircuit:
+    """
+    Create a Fourier transform circuit.
+
+    Parameters:
+    dimension (int): The number of modes.
+
+    Returns:
+    StructuredCircuit: The Fourier circuit.
+    """
+    return StructuredCircuit (dimension, [FourierFactor (dimension)])
@@ -0,0 +1,10 @@
+# The submodules are only imported when one of their attributes is first read
+from base.lazy_imports import attach
+
+__getattr__, __dir__, __all__ = attach (__name__, {
+    "plan": ["CertificationMeasure", "CertificationTask", "CertificationPlan"],
+    "checkpoints": ["results_to_dict", "results_from_dict", "CheckpointStore", "CheckpointedDevice"],
+    "runner": ["TOKEN_VARIABLE", "create_device", "complex_matrix_to_lists", "MEASURE_PLANNERS", "MEASURE_RUNNERS", "run_batch",
+               "CertificationRunner"],
+    "cli": ["main"]
+})
@@ -0,0 +1,306 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from typing import Any, Dict, List, Optional
+
+from base.abstract_circuit import AbstractCircuit
+from base.devices import Device
+from base.fingerprints import fingerprint_circuit, fingerprint_state
+from base.logger import get_logger
+from base.results import StatesAndProbabilities
+from base.results_archive import save_result_sets
+
+logger = get_logger (__name__)
+
+def results_to_dict (results: StatesAndProbabilities) -> Dict[str, Any]:
+    """
+    Convert results to plain values.
+
+    Parameters:
+    results (StatesAndProbabilities): The results.
+
+    Returns:
+    Dict[str, Any]: The probabilities and countings, keyed by state.
+    """
+    return {"probabilities": {str (state): float (probability) for state, probability in results.states_and_probabilities.items ()},
+            "countings": {str (state): int (counting) for state, counting in results.states_and_countings.items ()}}
+
+def results_from_dict (values: Dict[str, Any]) -> StatesAndProbabilities:
+    """
+    Build results from plain values, as written by results_to_dict.
+
+    Parameters:
+    values (Dict[str, Any]): The probabilities and countings.
+
+    Returns:
+    StatesAndProbabilities: The results.
+    """
+    results = StatesAndProbabilities ()
+    results.set_probability_states (values ["probabilities"])
+    for state, counting in values.get ("countings", {}).items ():
+        results.set_counting (state, counting)
+    return results
+
+class CheckpointStore:
+    """
+    A directory of the completed experiments and tasks of a certification run.
+
+    Every experiment and task is a JSON file written atomically, so a run that dies leaves
+    only complete checkpoints behind, and concurrent workers never see a partial file.
+    """
+
+    def __init__ (self, directory: str):
+        """
+        Initialize the store, creating its directories if needed.
+
+        Parameters:
+        directory (str): The directory of the store.
+        """
+        self.directory = directory
+        self.experiments_directory = os.path.join (directory, "experiments")
+        self.tasks_directory = os.path.join (directory, "tasks")
+        os.makedirs (self.experiments_directory, exist_ok=True)
+        os.makedirs (self.tasks_directory, exist_ok=True)
+
+    @staticmethod
+    def experiment_key (label: str, input_state: str, circuit: Any, mode: Any, number_of_samples: Optional[int]) -> str:
+        """
+        Get the key of an experiment: physically identical experiments on the same device share it.
+
+        Parameters:
+        label (str): The name of the device (e.g., its backend).
+        input_state (str): The input state.
+        circuit (Any): The circuit.
+        mode (Any): The mode of the device.
+        number_of_samples (Optional[int]): The number of samples, None for exact probabilities.
+
+        Returns:
+        str: The key.
+        """
+        description = "|".join ([label, str (getattr (mode, "value", mode)), str (number_of_samples),
+                                 fingerprint_state (input_state), fingerprint_circuit (circuit)])
+        return hashlib.sha256 (description.encode ()).hexdigest ()
+
+    def write (self, path: str, values: Dict[str, Any]) -> None:
+        """
+        Write a JSON file atomically.
+
+        Parameters:
+        path (str): The file to write.
+        values (Dict[str, Any]): The content.
+        """
+        descriptor, temporary_path = tempfile.mkstemp (dir=os.path.dirname (path), suffix=".tmp")
+        try:
+            with os.fdopen (descriptor, "w") as temporary_file:
+                json.dump (values, temporary_file)
+            os.replace (temporary_path, path)
+        except BaseException:
+            if os.path.exists (temporary_path):
+                os.remove (temporary_path)
+            raise
+
+    def read (self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a JSON file.
+
+        Parameters:
+        path (str): The file to read.
+
+        Returns:
+        Optional[Dict[str, Any]]: The content, or None if the file does not exist.
+        """
+        if not os.path.exists (path):
+            return None
+        with open (path) as checkpoint_file:
+            return json.load (checkpoint_file)
+
+    def load_experiment (self, key: str) -> Optional[StatesAndProbabilities]:
+        """
+        Get the results of a completed experiment.
+
+        Parameters:
+        key (str): The key of the experiment.
+
+        Returns:
+        Optional[StatesAndProbabilities]: The results, or None if the experiment was not completed.
+        """
+        values = self.read (os.path.join (self.experiments_directory, key + ".json"))
+        return None if values is None else results_from_dict (values ["results"])
+
+    def save_experiment (self, key: str, results: StatesAndProbabilities, description: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Checkpoint a completed experiment.
+
+        Parameters:
+        key (str): The key of the experiment.
+        results (StatesAndProbabilities): The results.
+        description (Optional[Dict[str, Any]]): What the experiment was, kept for inspection.
+        """
+        self.write (os.path.join (self.experiments_directory, key + ".json"), {"experiment": description or {}, "results": results_to_dict (results)})
+
+    def load_task (self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the result of a completed task.
+
+        Parameters:
+        key (str): The key of the task.
+
+        Returns:
+        Optional[Dict[str, Any]]: The result, or None if the task was not completed.
+        """
+        return self.read (os.path.join (self.tasks_directory, key + ".json"))
+
+    def save_task (self, key: str, result: Dict[str, Any]) -> None:
+        """
+        Checkpoint a completed task.
+
+        Parameters:
+        key (str): The key of the task.
+        result (Dict[str, Any]): The result, made of plain values.
+        """
+        self.write (os.path.join (self.tasks_directory, key + ".json"), result)
+
+    def completed_tasks (self) -> List[str]:
+        """
+        Get the keys of the completed tasks.
+
+        Returns:
+        List[str]: The keys.
+        """
+        return sorted (file_name [:-len (".json")] for file_name in os.listdir (self.tasks_directory) if file_name.endswith (".json"))
+
+    def number_of_experiments (self) -> int:
+        """
+        Get the number of completed experiments.
+
+        Returns:
+        int: The number of experiments.
+        """
+        return sum (file_name.endswith (".json") for file_name in os.listdir (self.experiments_directory))
+
+    def archive_experiments (self, path: str) -> int:
+        """
+        Write every completed experiment to one .npz archive of columns, keyed by experiment key.
+
+        Parameters:
+        path (str): The archive to write, read back with base.results_archive.ResultsArchive.
+
+        Returns:
+        int: The number of experiments archived.
+        """
+        result_sets, descriptions = {}, {}
+        for file_name in sorted (os.listdir (self.experiments_directory)):
+            if file_name.endswith (".json"):
+                key = file_name [:-len (".json")]
+                values = self.read (os.path.join (self.experiments_directory, file_name))
+                result_sets [key] = results_from_dict (values ["results"])
+                descriptions [key] = values ["experiment"]
+        save_result_sets (path, result_sets, {"experiments": descriptions})
+        return len (result_sets)
+
+class CheckpointedDevice (Device):
+    """
+    A device that checkpoints every experiment it runs, and replays the checkpointed ones.
+
+    The measures keep calling execute_experiment as usual: an experiment already in the store
+    is answered from it, so rerunning an interrupted task only runs the missing experiments.
+    """
+
+    # The fields of the wrapper, any other attribute is a setting of the wrapped device
+    OWN_ATTRIBUTES = frozenset (["device", "store", "label", "input_state", "circuit", "replayed", "executed"])
+
+    def __init__ (self, device: Device, store: CheckpointStore, label: str):
+        """
+        Initialize the device.
+
+        Parameters:
+        device (Device): The device running the experiments.
+        store (CheckpointStore): The store of the experiments.
+        label (str): The name of the device in the keys of the experiments (e.g., its backend).
+        """
+        self.device = device
+        self.store = store
+        self.label = label
+        self.input_state = None
+        self.circuit = None
+        self.replayed = 0
+        self.executed = 0
+
+    def __getattr__ (self, name: str) -> Any:
+        # Settings such as mode and number_of_samples are the ones of the wrapped device
+        if name == "device":
+            raise AttributeError(name)
+        return getattr (self.device, name)
+
+    def __setattr__ (self, name: str, value: Any) -> None:
+        # Settings such as number_of_samples are written to the wrapped device, which runs the experiments
+        if name in CheckpointedDevice.OWN_ATTRIBUTES:
+            object.__setattr__ (self, name, value)
+        else:
+            setattr (self.device, name, value)
+
+    def set_initial_state (self, input_state: str) -> None:
+        """
+        Set the initial state of the next experiment.
+
+        Parameters:
+        input_state (str): The initial state (e.g., '|1,1>').
+        """
+        self.input_state = input_state
+
+    def set_circuit (self, circuit: AbstractCircuit) -> None:
+        """
+        Set the circuit of the next experiment.
+
+        Parameters:
+        circuit (AbstractCircuit): The circuit.
+        """
+        self.circuit = circuit
+
+    def experiment_key (self, input_state: str, circuit: AbstractCircuit) -> str:
+        """
+        Get the key of an experiment on this device.
+
+        Parameters:
+        input_state (str): The input state.
+        circuit (AbstractCircuit): The circuit.
+
+        Returns:
+        str: The key.
+        """
+        return CheckpointStore.experiment_key (self.label, input_state, circuit, getattr (self.device, "mode", None),
+                                               getattr (self.device, "number_of_samples", None))
+
+    def execute_experiment_ (self) -> StatesAndProbabilities:
+        """
+        Execute the experiment set with set_initial_state and set_circuit.
+
+        Returns:
+        StatesAndProbabilities: The results of the experiment.
+        """
+        return self.execute_experiment (self.input_state, self.circuit)
+
+    def execute_experiment (self, initial_state: str, circuit: AbstractCircuit) -> StatesAndProbabilities:
+        """
+        Execute an experiment, or replay it from the store if it was completed before.
+
+        Parameters:
+        initial_state (str): The initial state (e.g., '|1,1>').
+        circuit (AbstractCircuit): The circuit.
+
+        Returns:
+        StatesAndProbabilities: The results of the experiment.
+        """
+        key = self.experiment_key (initial_state, circuit)
+        results = self.store.load_experiment (key)
+        if results is not None:
+            logger.debug ("[Checkpointed device] Replaying %s on %s", initial_state, key [:12])
+            self.replayed += 1
+            return results
+
+        results = self.device.execute_experiment (initial_state, circuit)
+        self.store.save_experiment (key, results, {"label": self.label, "input_state": str (initial_state)})
+        self.executed += 1
+        return results
@@ -0,0 +1,92 @@
+# Command line of the certification runs:
+#
+#   quindcert init PLAN [--backend SLOS] [--modes 2 3 ...] [--measures variance ...] [--shots N] [--workers N]
+#   quindcert plan PLAN --store DIRECTORY
+#   quindcert run PLAN --store DIRECTORY [--workers N] [--output FILE]
+#   quindcert archive ARCHIVE --store DIRECTORY
+#
+# It is also available as python -m certification when the package is not installed.
+#
+import argparse
+import json
+import sys
+
+from base.devices import DeviceMode
+from .checkpoints import CheckpointStore
+from .plan import CertificationMeasure, CertificationPlan
+
+def init (arguments) -> int:
+    measures = None if not arguments.measures else [CertificationMeasure (measure) for measure in arguments.measures]
+    plan = CertificationPlan (arguments.backend, DeviceMode (arguments.device_mode), arguments.modes or None, measures,
+                              arguments.preparations, arguments.shots, arguments.seed, arguments.workers)
+    plan.save (arguments.plan)
+    print ("Wrote {} tasks to {}.".format (len (plan.tasks ()), arguments.plan))
+    return 0
+
+def show_plan (arguments) -> int:
+    plan = CertificationPlan.load (arguments.plan)
+    store = CheckpointStore (arguments.store)
+    completed = set (store.completed_tasks ())
+    for task in plan.tasks ():
+        print ("{:<20} {}".format (task.key, "done" if task.key in completed else "pending"))
+    print ("{} experiments checkpointed in {}.".format (store.number_of_experiments (), arguments.store))
+    return 0
+
+def print_batch (batch, outcome):
+    print ("{:<30} done, {} experiments requested, {} executed and {} replayed".format (", ".join (task.key for task in batch), outcome ["requested"],
+                                                                                      outcome ["executed"], outcome ["replayed"]))
+
+def run (arguments) -> int:
+    from .runner import CertificationRunner
+
+    runner = CertificationRunner (CertificationPlan.load (arguments.plan), CheckpointStore (arguments.store))
+    results = runner.run (arguments.workers, report=print_batch)
+    if arguments.output:
+        with open (arguments.output, "w") as output_file:
+            json.dump (results, output_file, indent=1)
+        print ("Wrote the results to {}.".format (arguments.output))
+    return 0
+
+def archive (arguments) -> int:
+    number_of_experiments = CheckpointStore (arguments.store).archive_experiments (arguments.archive)
+    print ("Archived {} experiments to {}.".format (number_of_experiments, arguments.archive))
+    return 0
+
+def main (argv=None) -> int:
+    parser = argparse.ArgumentParser (prog="quindcert", description="Checkpointed certification runs of photonic devices.")
+    commands = parser.add_subparsers (dest="command", required=True)
+
+    init_parser = commands.add_parser ("init", help="Write a plan.")
+    init_parser.add_argument ("plan", help="The JSON file of the plan.")
+    init_parser.add_argument ("--backend", default="SLOS", help="The local backend (e.g., SLOS, auto) or remote platform (e.g., sim:ascella).")
+    init_parser.add_argument ("--device-mode", default=DeviceMode.SAMPLER.value, choices=[mode.value for mode in DeviceMode], help="The mode of the device.")
+    init_parser.add_argument ("--modes", nargs="*", type=int, help="The numbers of modes. Defaults to 3.")
+    init_parser.add_argument ("--measures", nargs="*", choices=[measure.value for measure in CertificationMeasure], help="The measures. Defaults to every measure.")
+    init_parser.add_argument ("--preparations", type=int, help="The number of preparations of the overlaps estimation.")
+    init_parser.add_argument ("--shots", type=int, default=1000, help="The number of samples of every experiment.")
+    init_parser.add_argument ("--seed", type=int, default=0, help="The seed of the random preparations.")
+    init_parser.add_argument ("--workers", type=int, default=1, help="The number of tasks run in parallel.")
+    init_parser.set_defaults (function=init)
+
+    plan_parser = commands.add_parser ("plan", help="Show the completed and pending tasks of a plan.")
+    plan_parser.add_argument ("plan", help="The JSON file of the plan.")
+    plan_parser.add_argument ("--store", required=True, help="The checkpoint directory of the run.")
+    plan_parser.set_defaults (function=show_plan)
+
+    run_parser = commands.add_parser ("run", help="Run the pending tasks of a plan, resuming from the checkpoints.")
+    run_parser.add_argument ("plan", help="The JSON file of the plan.")
+    run_parser.add_argument ("--store", required=True, help="The checkpoint directory of the run.")
+    run_parser.add_argument ("--workers", type=int, help="The number of tasks run in parallel. Defaults to the workers of the plan.")
+    run_parser.add_argument ("--output", help="The JSON file of the results.")
+    run_parser.set_defaults (function=run)
+
+    archive_parser = commands.add_parser ("archive", help="Write the checkpointed experiments to one .npz archive of columns.")
+    archive_parser.add_argument ("archive", help="The .npz file to write.")
+    archive_parser.add_argument ("--store", required=True, help="The checkpoint directory of the run.")
+    archive_parser.set_defaults (function=archive)
+
+    arguments = parser.parse_args (argv)
+    return arguments.function (arguments)
+
+if __name__ == "__main__":
+    sys.exit (main ())
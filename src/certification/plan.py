@@ -0,0 +1,141 @@
+import json
+
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from base.devices import DeviceMode
+
+class CertificationMeasure (Enum):
+    BUNCHING = "bunching"
+    VARIANCE = "variance"
+    TOMOGRAPHY = "tomography"
+    OVERLAPS = "overlaps"
+
+class CertificationTask:
+    """
+    One measure on one number of modes, the unit of work of a certification run.
+
+    Tasks do not depend on each other, so they can run in parallel and be checkpointed separately.
+    """
+
+    def __init__ (self, measure: CertificationMeasure, number_of_modes: int):
+        """
+        Initialize the task.
+
+        Parameters:
+        measure (CertificationMeasure): The measure to run.
+        number_of_modes (int): The number of modes.
+        """
+        self.measure = measure
+        self.number_of_modes = number_of_modes
+
+    @property
+    def key (self) -> str:
+        """
+        Get the name of the task in the checkpoint store.
+
+        Returns:
+        str: The key of the task (e.g., 'variance-m3').
+        """
+        return "{}-m{}".format (self.measure.value, self.number_of_modes)
+
+    def __repr__ (self) -> str:
+        return "CertificationTask({})".format (self.key)
+
+class CertificationPlan:
+    """
+    A declared certification run: the device to use and the measures to run on it.
+
+    Plans are stored as JSON. The token of a remote backend is not part of the plan, it is read
+    from the QUINDCERT_TOKEN environment variable when the device is created.
+    """
+
+    def __init__ (self, backend: str = "SLOS", device_mode: DeviceMode = DeviceMode.SAMPLER, modes: Optional[List[int]] = None,
+                  measures: Optional[List[CertificationMeasure]] = None, number_of_preparations: Optional[int] = None,
+                  shots: int = 1000, seed: int = 0, workers: int = 1):
+        """
+        Initialize the plan.
+
+        Parameters:
+        backend (str): The local backend (e.g., 'SLOS', 'auto') or remote platform (e.g., 'sim:ascella').
+        device_mode (DeviceMode): The mode of the device.
+        modes (Optional[List[int]]): The numbers of modes to certify. Defaults to [3].
+        measures (Optional[List[CertificationMeasure]]): The measures to run. Defaults to every measure.
+        number_of_preparations (Optional[int]): The number of preparations of the overlaps estimation. Defaults to n(n-1)/2.
+        shots (int): The number of samples of every experiment.
+        seed (int): The seed of the random preparations.
+        workers (int): The number of tasks run in parallel.
+        """
+        if shots < 1 or workers < 1:
+            raise ValueError("Expected a positive number of shots and of workers.")
+
+        self.backend = backend
+        self.device_mode = device_mode
+        self.modes = [3] if modes is None else list (modes)
+        self.measures = list (CertificationMeasure) if measures is None else list (measures)
+        self.number_of_preparations = number_of_preparations
+        self.shots = shots
+        self.seed = seed
+        self.workers = workers
+
+    def tasks (self) -> List[CertificationTask]:
+        """
+        Get the tasks of the plan, measure by measure.
+
+        Returns:
+        List[CertificationTask]: The tasks.
+        """
+        return [CertificationTask (measure, number_of_modes) for measure in self.measures for number_of_modes in self.modes]
+
+    def to_dict (self) -> Dict[str, Any]:
+        """
+        Convert the plan to plain values.
+
+        Returns:
+        Dict[str, Any]: The plan.
+        """
+        return {"backend": self.backend, "device_mode": self.device_mode.value, "modes": self.modes,
+                "measures": [measure.value for measure in self.measures], "number_of_preparations": self.number_of_preparations,
+                "shots": self.shots, "seed": self.seed, "workers": self.workers}
+
+    @classmethod
+    def from_dict (cls, values: Dict[str, Any]) -> 'CertificationPlan':
+        """
+        Build a plan from plain values, as written by to_dict. Missing entries take their default.
+
+        Parameters:
+        values (Dict[str, Any]): The plan.
+
+        Returns:
+        CertificationPlan: The plan.
+        """
+        values = dict (values)
+        if "device_mode" in values:
+            values ["device_mode"] = DeviceMode (values ["device_mode"])
+        if values.get ("measures") is not None:
+            values ["measures"] = [CertificationMeasure (measure) for measure in values ["measures"]]
+        return cls (**values)
+
+    def save (self, path: str) -> None:
+        """
+        Save the plan as JSON.
+
+        Parameters:
+        path (str): The file to write.
+        """
+        with open (path, "w") as plan_file:
+            json.dump (self.to_dict (), plan_file, indent=1)
+
+    @classmethod
+    def load (cls, path: str) -> 'CertificationPlan':
+        """
+        Load a plan saved as JSON.
+
+        Parameters:
+        path (str): The file to read.
+
+        Returns:
+        CertificationPlan: The plan.
+        """
+        with open (path) as plan_file:
+            return cls.from_dict (json.load (plan_file))
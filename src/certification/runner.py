@@ -0,0 +1,228 @@
+import concurrent.futures
+import os
+import numpy as np
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from base.devices import Device
+from base.experiment_plan import ExperimentPlan
+from base.logger import get_logger
+from .checkpoints import CheckpointedDevice, CheckpointStore
+from .plan import CertificationMeasure, CertificationPlan, CertificationTask
+
+logger = get_logger (__name__)
+
+TOKEN_VARIABLE = "QUINDCERT_TOKEN"
+
+def create_device (plan: CertificationPlan) -> Device:
+    """
+    Create the device of a plan, remote if its backend is a remote platform.
+
+    Parameters:
+    plan (CertificationPlan): The plan.
+
+    Returns:
+    Device: The device, with the number of samples of the plan.
+    """
+    from quandela.quandela_devices import QuandelaDeviceFactory, QuandelaRemoteDevices
+
+    factory = QuandelaDeviceFactory ()
+    if plan.backend in [device.value for device in QuandelaRemoteDevices]:
+        token = os.environ.get (TOKEN_VARIABLE)
+        if not token:
+            raise ValueError("The remote backend {} needs a token in {}.".format (plan.backend, TOKEN_VARIABLE))
+        device = factory.create_remote_device (plan.backend, plan.device_mode, token)
+    else:
+        device = factory.create_local_device (plan.backend, plan.device_mode)
+    device.number_of_samples = plan.shots
+    return device
+
+def complex_matrix_to_lists (matrix: Any) -> List[List[List[float]]]:
+    """
+    Convert a complex matrix to nested lists of [real, imaginary] pairs, for JSON.
+
+    Parameters:
+    matrix (Any): The matrix.
+
+    Returns:
+    List[List[List[float]]]: The matrix.
+    """
+    matrix = np.asarray (matrix, dtype=complex)
+    return np.stack ((matrix.real, matrix.imag), axis=-1).tolist ()
+
+def plan_bunching (plan: CertificationPlan, task: CertificationTask, device: Device, experiments: ExperimentPlan) -> Callable[[], Dict[str, Any]]:
+    from photonic_indistinguishability_measures.bunching import BunchingCalculator
+
+    calculator = BunchingCalculator (device, task.number_of_modes)
+    indistinguishable = calculator.request_full_bunching_indistinguishable_case (experiments)
+    distinguishable = calculator.request_full_bunching_distinguishable_case (experiments)
+    return lambda: {"indistinguishable": float (indistinguishable ()), "distinguishable": float (distinguishable ())}
+
+def plan_variance (plan: CertificationPlan, task: CertificationTask, device: Device, experiments: ExperimentPlan) -> Callable[[], Dict[str, Any]]:
+    from photonic_indistinguishability_measures.variance import Variance
+
+    variance = Variance (device, task.number_of_modes)
+    indistinguishable = variance.request_variance_indistinguishable_scenario (experiments, task.number_of_modes)
+    distinguishable = variance.request_variance_distinguishable_scenario (experiments, task.number_of_modes)
+    return lambda: {"indistinguishable": float (indistinguishable ()), "distinguishable": float (distinguishable ())}
+
+def create_characterizer (task: CertificationTask, device: Device) -> Any:
+    from quandela.quandela_tomography import QuandelaProcessTomographyProber
+    from tomography.process_tomography_methods import SuperStableMethod
+    from tomography.process_tomography_quandela import DeviceCharacterizer
+
+    return DeviceCharacterizer (task.number_of_modes, QuandelaProcessTomographyProber (task.number_of_modes, device),
+                                SuperStableMethod (task.number_of_modes))
+
+def run_tomography (plan: CertificationPlan, task: CertificationTask, device: Device) -> Dict[str, Any]:
+    original, rebuilt, distance = create_characterizer (task, device).characterize_device ()
+    return {"original": complex_matrix_to_lists (original), "rebuilt": complex_matrix_to_lists (rebuilt), "distance": float (np.real (distance))}
+
+def run_overlaps (plan: CertificationPlan, task: CertificationTask, device: Device) -> Dict[str, Any]:
+    from photonic_indistinguishability_measures.variance import Variance
+    from tomography.estimating_overlaps import GramMatrixFromVariance
+
+    estimator = GramMatrixFromVariance (Variance (device, task.number_of_modes), create_characterizer (task, device))
+    # The preparations only depend on the seed and the size, so a resumed task designs the same ones
+    rng = np.random.default_rng ([plan.seed, task.number_of_modes])
+    overlaps, covariance = estimator.do_experiments_to_estimate_the_gram_matrix (task.number_of_modes, plan.number_of_preparations, rng=rng)
+    return {"overlaps": np.asarray (overlaps, dtype=float).tolist (), "covariance": np.asarray (covariance, dtype=float).tolist ()}
+
+# Measures declaring their experiments in a shared plan: on one size, their identical experiments run once
+MEASURE_PLANNERS: Dict[CertificationMeasure, Callable[[CertificationPlan, CertificationTask, Device, ExperimentPlan], Callable[[], Dict[str, Any]]]] = {
+    CertificationMeasure.BUNCHING: plan_bunching,
+    CertificationMeasure.VARIANCE: plan_variance,
+}
+
+# Measures running their own experiments
+MEASURE_RUNNERS: Dict[CertificationMeasure, Callable[[CertificationPlan, CertificationTask, Device], Dict[str, Any]]] = {
+    CertificationMeasure.TOMOGRAPHY: run_tomography,
+    CertificationMeasure.OVERLAPS: run_overlaps,
+}
+
+def run_batch (plan_values: Dict[str, Any], tasks: List[Tuple[str, int]], directory: str) -> Dict[str, Any]:
+    """
+    Run tasks on a fresh device whose experiments are checkpointed. It runs in the worker processes.
+
+    The experiments of the planned measures are merged in one plan, so the experiments shared by
+    several tasks of the batch are executed once.
+
+    Parameters:
+    plan_values (Dict[str, Any]): The plan, as plain values.
+    tasks (List[Tuple[str, int]]): The measure and number of modes of each task.
+    directory (str): The directory of the checkpoint store.
+
+    Returns:
+    Dict[str, Any]: The result of each task, keyed by task key, and the numbers of requested, executed and replayed experiments.
+    """
+    plan = CertificationPlan.from_dict (plan_values)
+    tasks = [CertificationTask (CertificationMeasure (measure), number_of_modes) for measure, number_of_modes in tasks]
+    device = CheckpointedDevice (create_device (plan), CheckpointStore (directory), plan.backend)
+
+    experiments = ExperimentPlan ()
+    finishers = {task.key: MEASURE_PLANNERS [task.measure] (plan, task, device, experiments) for task in tasks if task.measure in MEASURE_PLANNERS}
+    experiments.execute (device)
+
+    results = {}
+    for task in tasks:
+        if task.key in finishers:
+            results [task.key] = finishers [task.key] ()
+        else:
+            results [task.key] = MEASURE_RUNNERS [task.measure] (plan, task, device)
+
+    # Each distinct planned experiment went through the device once, the other experiments are requests of their own
+    requested = experiments.number_of_requests + device.executed + device.replayed - experiments.number_of_experiments
+    return {"results": results, "requested": requested, "executed": device.executed, "replayed": device.replayed}
+
+class CertificationRunner:
+    """
+    Runs the tasks of a plan in parallel, checkpointing every experiment and task.
+
+    A run resumes from the store: completed tasks are loaded instead of run, and the completed
+    experiments of an interrupted task are replayed instead of executed again. The planned tasks
+    of one size run together, so the experiments they share are executed once.
+    """
+
+    def __init__ (self, plan: CertificationPlan, store: CheckpointStore):
+        """
+        Initialize the runner.
+
+        Parameters:
+        plan (CertificationPlan): The plan.
+        store (CheckpointStore): The store of the run.
+        """
+        self.plan = plan
+        self.store = store
+
+    def pending_tasks (self) -> List[CertificationTask]:
+        """
+        Get the tasks of the plan that are not completed.
+
+        Returns:
+        List[CertificationTask]: The tasks.
+        """
+        completed = set (self.store.completed_tasks ())
+        return [task for task in self.plan.tasks () if task.key not in completed]
+
+    def pending_batches (self) -> List[List[CertificationTask]]:
+        """
+        Group the pending tasks in the batches run by one worker: the planned tasks of one size, and every other task alone.
+
+        Returns:
+        List[List[CertificationTask]]: The batches.
+        """
+        batches = []
+        planned = {}
+        for task in self.pending_tasks ():
+            if task.measure not in MEASURE_PLANNERS:
+                batches.append ([task])
+            elif task.number_of_modes in planned:
+                planned [task.number_of_modes].append (task)
+            else:
+                planned [task.number_of_modes] = [task]
+                batches.append (planned [task.number_of_modes])
+        return batches
+
+    def run (self, workers: Optional[int] = None, report: Optional[Callable[[List[CertificationTask], Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Run the pending tasks and collect the result of every task of the plan.
+
+        Parameters:
+        workers (Optional[int]): The number of batches run in parallel. Defaults to the workers of the plan, 1 runs in this process.
+        report (Optional[Callable[[List[CertificationTask], Dict[str, Any]], None]]): Called with the tasks of each batch as it completes.
+
+        Returns:
+        Dict[str, Any]: The result of each task, keyed by task key.
+        """
+        workers = self.plan.workers if workers is None else workers
+        batches = self.pending_batches ()
+        logger.info ("[Certification] %s tasks pending out of %s, in %s batches", sum (len (batch) for batch in batches),
+                     len (self.plan.tasks ()), len (batches))
+
+        arguments = [(self.plan.to_dict (), [(task.measure.value, task.number_of_modes) for task in batch], self.store.directory) for batch in batches]
+        if workers <= 1:
+            for batch, batch_arguments in zip (batches, arguments):
+                self.complete (batch, run_batch (*batch_arguments), report)
+        else:
+            with concurrent.futures.ProcessPoolExecutor (max_workers=workers) as executor:
+                futures = {executor.submit (run_batch, *batch_arguments): batch for batch, batch_arguments in zip (batches, arguments)}
+                for future in concurrent.futures.as_completed (futures):
+                    self.complete (futures [future], future.result (), report)
+
+        return {task.key: self.store.load_task (task.key) for task in self.plan.tasks ()}
+
+    def complete (self, batch: List[CertificationTask], outcome: Dict[str, Any], report: Optional[Callable[[List[CertificationTask], Dict[str, Any]], None]]) -> None:
+        """
+        Checkpoint the tasks of a completed batch.
+
+        Parameters:
+        batch (List[CertificationTask]): The tasks.
+        outcome (Dict[str, Any]): What run_batch returned.
+        report (Optional[Callable[[List[CertificationTask], Dict[str, Any]], None]]): Called with the tasks and their outcome.
+        """
+        for task in batch:
+            self.store.save_task (task.key, outcome ["results"][task.key])
+        logger.info ("[Certification] %s completed, %s experiments requested, %s executed and %s replayed", ", ".join (task.key for task in batch),
+                     outcome ["requested"], outcome ["executed"], outcome ["replayed"])
+        if report is not None:
+            report (batch, outcome)
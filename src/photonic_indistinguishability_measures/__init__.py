@@ -1,2 +1,11 @@
-from .bunching import *
-from .variance import *
\ No newline at end of file
+# The submodules are only imported when one of their attributes is first read
+from base.lazy_imports import attach
+
+__getattr__, __dir__, __all__ = attach (__name__, {
+    "bunching": ["BunchingMode", "BunchingCalculator"],
+    "variance": ["Variance"],
+    "distinguishable": ["DistinguishablePhotons"],
+    "sweeps": ["GramFamily", "SweepMetric", "FAMILY_AXES", "expected_variances", "eigenvalue_bounds",
+               "fourier_full_bunching_probabilities", "variance_of_expected_variance", "VECTORIZED_METRICS", "OVERLAP_METRICS",
+               "SCALAR_METRICS", "evaluate_scalar_metric", "ParameterGrid", "SweepResults", "SweepRunner"]
+})
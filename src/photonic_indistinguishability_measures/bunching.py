@@ -1,25 +1,93 @@
 import logging
-from typing import Optional
+import math
+import numpy as np
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from perceval import *
 from base.abstract_circuit import AbstractCircuit
 from base.results import StatesAndProbabilities
-from base.state_generation_helpers import generate_state_from_list
-from base.circuit_helpers import generate_fourier_transform_circuit
+from base.state_generation_helpers import generate_state_from_list, states_to_occupation_matrix
+from base.circuit_helpers import cached_fourier_transform_circuit
 from base.devices import Device
+from base.experiment_plan import ExperimentPlan
+from base.instrumentation import PROFILER
+from base.permanents import permanent, permanents
+from .distinguishable import DistinguishablePhotons
+
+class BunchingMode (Enum):
+    EXPERIMENTAL = "Experimental"
+    ANALYTIC = "Analytic"
 
 class BunchingCalculator:
     
-    def __init__(self, device: Device, number_of_modes: int = 2):
+    def __init__(self, device: Device, number_of_modes: int = 2, mode: BunchingMode = BunchingMode.EXPERIMENTAL):
         """
         Initialize the BunchingCalculator with a device and number of modes.
         
         Parameters:
         device (Device): The device to use for experiments.
         number_of_modes (int): The number of modes in the experiment.
+        mode (BunchingMode): EXPERIMENTAL runs the experiments on the device, ANALYTIC computes the probabilities from the unitary of the circuit.
         """
         self.device = device
         self.number_of_modes = number_of_modes
+        self.mode = mode
+
+    @staticmethod
+    def calculate_subset_bunching_probabilities_analytically(unitary: Any, subsets: List[List[int]], input_modes: Optional[List[int]] = None,
+                                                            gram_matrix: Optional[Any] = None) -> np.ndarray:
+        """
+        Calculate the probability of finding every photon inside each subset of output modes, as perm(H_K o Gram^T).
+
+        H_K[a][b] = sum_{l in K} conj(U[l][a]) U[l][b] over the occupied input modes a, b. H_K is the
+        sum of one rank-one term per output mode, so those terms are computed once and every
+        subset is obtained from them with a single matrix product.
+
+        Parameters:
+        unitary (Any): The unitary of the interferometer, indexed by [output][input].
+        subsets (List[List[int]]): The subsets of output modes.
+        input_modes (Optional[List[int]]): The input modes holding one photon each. Defaults to every mode.
+        gram_matrix (Optional[Any]): The overlaps <phi_a|phi_b> of the internal states of the photons (not their squared moduli). Defaults to indistinguishable photons.
+
+        Returns:
+        np.ndarray: The bunching probability of each subset.
+        """
+        unitary = np.asarray (unitary)
+        if input_modes is None:
+            input_modes = list (range (unitary.shape [1]))
+        columns = unitary [:, input_modes]
+        n = len (input_modes)
+        gram_matrix = np.ones ((n, n)) if gram_matrix is None else np.asarray (gram_matrix)
+
+        rank_one_terms = np.einsum ('la,lb->lab', np.conj (columns), columns) * gram_matrix.T
+        membership = np.zeros ((len (subsets), unitary.shape [0]))
+        for row, subset in enumerate (subsets):
+            membership [row, subset] = 1
+
+        return np.real (permanents (np.tensordot (membership, rank_one_terms, axes=1)))
+
+    @staticmethod
+    def calculate_full_bunching_probability_analytically(unitary: Any, input_modes: Optional[List[int]] = None, gram_matrix: Optional[Any] = None) -> float:
+        """
+        Calculate the probability that every photon ends in the same output mode.
+
+        For a single mode l, H_l o Gram^T is Gram^T scaled by the moduli of row l, so the
+        probability is perm(Gram) sum_l prod_a |U[l][a]|^2 and one permanent is enough.
+
+        Parameters:
+        unitary (Any): The unitary of the interferometer, indexed by [output][input].
+        input_modes (Optional[List[int]]): The input modes holding one photon each. Defaults to every mode.
+        gram_matrix (Optional[Any]): The overlaps <phi_a|phi_b> of the internal states of the photons. Defaults to indistinguishable photons.
+
+        Returns:
+        float: The full bunching probability.
+        """
+        unitary = np.asarray (unitary)
+        if input_modes is None:
+            input_modes = list (range (unitary.shape [1]))
+        gram_permanent = math.factorial (len (input_modes)) if gram_matrix is None else np.real (permanent (gram_matrix))
+
+        return float (gram_permanent * np.sum (np.prod (np.abs (unitary [:, input_modes]) ** 2, axis=1)))
     
 
     def make_bunching_experiment(self, state: Optional[str] = None, circuit: Optional[AbstractCircuit] = None) -> StatesAndProbabilities:
@@ -37,11 +105,82 @@ class BunchingCalculator:
             state = generate_state_from_list ([1 for _ in range (self.number_of_modes)])
 
         if circuit == None:
-            circuit = generate_fourier_transform_circuit (self.number_of_modes)
+            circuit = cached_fourier_transform_circuit (self.number_of_modes)
             
         self.results = self.device.execute_experiment (state, circuit)
         return self.results    
 
+    @staticmethod
+    def occupations_and_probabilities(probability_results: StatesAndProbabilities) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the occupation matrix of the output patterns and their probabilities.
+        
+        Parameters:
+        probability_results (StatesAndProbabilities): The results of the experiment.
+        
+        Returns:
+        Tuple[np.ndarray, np.ndarray]: The (patterns x modes) occupation matrix and the probability of each pattern.
+        """
+        probabilities = probability_results.get_probabilities ()
+        occupations = states_to_occupation_matrix (list (probabilities.keys ()))
+        return occupations, np.fromiter (probabilities.values (), dtype=float, count=len (probabilities))
+
+    def calculate_bunching_statistics(self, probability_results: StatesAndProbabilities, subsets: Optional[List[List[int]]] = None) -> Dict[str, Any]:
+        """
+        Calculate every bunching probability from a single pass over the occupation matrix.
+        
+        Parameters:
+        probability_results (StatesAndProbabilities): The results of the experiment.
+        subsets (Optional[List[List[int]]]): Subsets of modes for which the probability of finding every photon inside is computed.
+        
+        Returns:
+        Dict[str, Any]: The bunching curve under "curve", where curve[k] is the probability that some mode holds at least k photons,
+                        the full bunching probability under "full_bunching" and, if subsets are given, the probability of each subset under "subsets".
+        """
+        with PROFILER.span ("state parsing"):
+            occupations, probabilities = self.occupations_and_probabilities (probability_results)
+        subsets = [] if subsets is None else subsets
+
+        if len (probabilities) == 0:
+            return {"curve": np.zeros (1), "full_bunching": 0.0, "subsets": np.zeros (len (subsets))}
+
+        with PROFILER.span ("aggregation", measure="bunching"):
+            totals = occupations.sum (axis=1)
+            histogram = np.bincount (occupations.max (axis=1), weights=probabilities, minlength=int (totals.max ()) + 1)
+            curve = np.cumsum (histogram [::-1]) [::-1]
+
+            membership = np.zeros ((len (subsets), occupations.shape [1]), dtype=int)
+            for row, subset in enumerate (subsets):
+                membership [row, subset] = 1
+            inside = (occupations @ membership.T) == totals [:, np.newaxis]
+
+        return {"curve": curve, "full_bunching": float (histogram [-1]), "subsets": probabilities @ inside}
+
+    def calculate_bunching_curve(self, probability_results: StatesAndProbabilities) -> np.ndarray:
+        """
+        Calculate the probability that some mode holds at least k photons, for every k.
+        
+        Parameters:
+        probability_results (StatesAndProbabilities): The results of the experiment.
+        
+        Returns:
+        np.ndarray: The bunching probability for each minimum number of photons k, from 0 to the number of photons.
+        """
+        return self.calculate_bunching_statistics (probability_results) ["curve"]
+
+    def calculate_subset_bunching_probabilities(self, probability_results: StatesAndProbabilities, subsets: List[List[int]]) -> np.ndarray:
+        """
+        Calculate the probability of finding every photon inside each subset of modes.
+        
+        Parameters:
+        probability_results (StatesAndProbabilities): The results of the experiment.
+        subsets (List[List[int]]): The subsets of modes.
+        
+        Returns:
+        np.ndarray: The bunching probability of each subset.
+        """
+        return self.calculate_bunching_statistics (probability_results, subsets) ["subsets"]
+
     def calculate_bunching_probability(self, probability_results: StatesAndProbabilities, min_number_of_photons: int) -> float:
         """
         Calculate the bunching probability from the experiment results.
@@ -53,17 +192,10 @@ class BunchingCalculator:
         Returns:
         float: The calculated bunching probability.
         """
-        probability = 0
-        for state in probability_results.get_probability_states():
-            converted_state = "{}".format(state)
-    
-            for occ in converted_state[1:len(converted_state)-1].split (","):
-                if int(occ) >= min_number_of_photons: 
-                    #print ('Bunch event, considering to the calculation')
-                    probability += probability_results.get_probability (state) 
-                    break
-        
-        return probability
+        curve = self.calculate_bunching_curve (probability_results)
+        if min_number_of_photons >= len (curve):
+            return 0
+        return float (curve [max (min_number_of_photons, 0)])
 
     def calculate_full_bunching_probability(self, probability_results: StatesAndProbabilities, number_of_modes: Optional [int] = None) -> float:
         """
@@ -87,8 +219,32 @@ class BunchingCalculator:
         Returns:
         float: The full bunching probability.
         """
-        self.results = self.make_bunching_experiment ()
-        return self.calculate_full_bunching_probability (self.results)
+        with PROFILER.span ("bunching experiment", scenario="indistinguishable", mode=self.mode.value):
+            plan = ExperimentPlan ()
+            probability = self.request_full_bunching_indistinguishable_case (plan)
+            plan.execute (self.device, self.make_bunching_experiment)
+            return probability ()
+
+    def request_full_bunching_indistinguishable_case(self, plan: ExperimentPlan) -> Callable[[], float]:
+        """
+        Declare the experiment of the full bunching indistinguishable case in a plan shared with other measures.
+
+        Parameters:
+        plan (ExperimentPlan): The plan the experiment is requested in.
+
+        Returns:
+        Callable[[], float]: Calculates the full bunching probability once the plan is executed.
+        """
+        circuit = cached_fourier_transform_circuit (self.number_of_modes)
+        if self.mode == BunchingMode.ANALYTIC:
+            return lambda: self.calculate_full_bunching_probability_analytically (circuit.m)
+
+        key = plan.request (generate_state_from_list ([1 for _ in range (self.number_of_modes)]), circuit)
+
+        def probability () -> float:
+            self.results = plan.get (key)
+            return self.calculate_full_bunching_probability (self.results)
+        return probability
 
     def do_the_experiments_for_full_bunching_distinguishable_case(self) -> float:
         """
@@ -97,23 +253,36 @@ class BunchingCalculator:
         Returns:
         float: The bunching probability for distinguishable case.
         """
-        results_distinguishable_total = StatesAndProbabilities ()
+        with PROFILER.span ("bunching experiment", scenario="distinguishable", mode=self.mode.value):
+            plan = ExperimentPlan ()
+            probability = self.request_full_bunching_distinguishable_case (plan)
+            plan.execute (self.device, self.make_bunching_experiment)
+            return probability ()
 
-        #print ("Entering distinguishable case")
-        for i in range (self.number_of_modes):
-            l = [1 if j == i else 0 for j in range (self.number_of_modes)]
-            results_distinguishable = self.make_bunching_experiment (generate_state_from_list (l), generate_fourier_transform_circuit (self.number_of_modes))
-            #print ("Input state: ", l, ", Results: ", results_distinguishable.get_probabilities ())
-            
-            results_distinguishable_total.aggregate (results_distinguishable.get_probabilities ())
-        
-        #print ("Out of distinguishability case")
+    def request_full_bunching_distinguishable_case(self, plan: ExperimentPlan) -> Callable[[], float]:
+        """
+        Declare the single photon experiments of the full bunching distinguishable case in a plan shared with other measures.
 
-        #print ("Combined results: ")
-        #for i in results_distinguishable_total.get_probability_states():
-            #print ("key: ", i, " ;", results_distinguishable_total.get_probability (i))
-        
-        return self.calculate_bunching_probability (results_distinguishable_total, self.number_of_modes)
+        Parameters:
+        plan (ExperimentPlan): The plan the experiments are requested in.
+
+        Returns:
+        Callable[[], float]: Calculates the bunching probability for distinguishable case once the plan is executed.
+        """
+        circuit = cached_fourier_transform_circuit (self.number_of_modes)
+        if self.mode == BunchingMode.ANALYTIC:
+            return lambda: DistinguishablePhotons.from_unitary (circuit.m).full_bunching_probability ()
+
+        # The photons do not interfere, so their single photon results are enough
+        keys = [plan.request (generate_state_from_list ([1 if j == i else 0 for j in range (self.number_of_modes)]), circuit)
+                for i in range (self.number_of_modes)]
+
+        def probability () -> float:
+            results = [plan.get (key) for key in keys]
+            self.results = results [-1]
+            with PROFILER.span ("aggregation", measure="bunching"):
+                return DistinguishablePhotons.from_results (results, self.number_of_modes).full_bunching_probability ()
+        return probability
     
     
     
\ No newline at end of file
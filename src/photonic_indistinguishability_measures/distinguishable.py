@@ -0,0 +1,284 @@
+import math
+import numpy as np
+
+from typing import Any, List, Optional, Tuple
+
+from base.fock_space import FockSpaceIndex
+from base.results import StatesAndProbabilities
+from base.state_generation_helpers import state_to_list
+from base.logger import get_logger
+
+logger = get_logger (__name__)
+
+class DistinguishablePhotons:
+    """
+    The output statistics of fully distinguishable photons, computed from their single photon transmissions.
+
+    Distinguishable photons do not interfere, so photon a lands in output mode j independently
+    of the others, with the probability T[a][j] of its transmission row. The occupation of a mode
+    is then a sum of independent Bernoulli variables and the statistics used by the variance and
+    bunching measures follow without building the joint distribution of the m photons, which is
+    only materialized on request.
+    """
+
+    # The general case of probability_of_max_occupation_at_most holds the 3^n pairs of sets of
+    # photons in memory, about 2 GB for 16 photons, so it is refused above this number of photons
+    MAXIMUM_PHOTONS_OF_THE_GENERAL_CASE = 14
+
+    def __init__(self, transmissions: Any):
+        """
+        Initialize the calculator with the transmission rows of the photons.
+
+        Parameters:
+        transmissions (Any): A (photons x modes) matrix whose row a is the output distribution of photon a alone. Every row is normalized.
+        """
+        transmissions = np.array (transmissions, dtype=float)
+        if transmissions.ndim != 2 or transmissions.shape [0] == 0:
+            raise ValueError("Expected a (photons x modes) matrix of transmissions, got shape {}.".format (transmissions.shape))
+        if np.any (transmissions < 0):
+            raise ValueError("Transmissions must be non-negative.")
+
+        totals = transmissions.sum (axis=1, keepdims=True)
+        if np.any (totals == 0):
+            raise ValueError("Every photon must be transmitted to some mode.")
+
+        self.transmissions = transmissions / totals
+        self.number_of_photons, self.number_of_modes = transmissions.shape
+
+    @classmethod
+    def from_unitary(cls, unitary: Any, input_modes: Optional[List[int]] = None) -> 'DistinguishablePhotons':
+        """
+        Build the calculator from the unitary of the circuit, with transmissions |U[l][a]|^2.
+
+        Parameters:
+        unitary (Any): The unitary of the circuit.
+        input_modes (Optional[List[int]]): The input mode of each photon. Defaults to one photon per mode.
+
+        Returns:
+        DistinguishablePhotons: The calculator.
+        """
+        unitary = np.asarray (unitary)
+        if input_modes is None:
+            input_modes = list (range (unitary.shape [1]))
+        return cls (np.abs (unitary [:, input_modes].T) ** 2)
+
+    @classmethod
+    def from_results(cls, results: List[StatesAndProbabilities], number_of_modes: int) -> 'DistinguishablePhotons':
+        """
+        Build the calculator from the measured output distributions of single photon experiments.
+
+        Parameters:
+        results (List[StatesAndProbabilities]): The results of the experiment of each photon alone.
+        number_of_modes (int): The number of modes.
+
+        Returns:
+        DistinguishablePhotons: The calculator.
+        """
+        transmissions = np.zeros ((len (results), number_of_modes))
+        for row, results_ in enumerate (results):
+            for state in results_.get_probability_states ():
+                transmissions [row] += np.array (state_to_list (state)) * results_.get_probability (state)
+        return cls (transmissions)
+
+    def mean_occupations(self) -> np.ndarray:
+        """
+        Get the expected occupation of every output mode.
+
+        Returns:
+        np.ndarray: E[n_j] = sum_a T[a][j].
+        """
+        return self.transmissions.sum (axis=0)
+
+    def occupation_variances(self) -> np.ndarray:
+        """
+        Get the variance of the occupation of every output mode.
+
+        Returns:
+        np.ndarray: Var[n_j] = sum_a T[a][j] (1 - T[a][j]).
+        """
+        return np.sum (self.transmissions * (1 - self.transmissions), axis=0)
+
+    def expected_variance(self) -> float:
+        """
+        Get the variance of the occupations averaged over the modes, as Variance.calculate_expected_variance does on the joint distribution.
+
+        Returns:
+        float: The expected variance.
+        """
+        expected_variance = float (np.mean (self.occupation_variances ()))
+        logger.debug ("[Distinguishable photons] Expected variance %s", expected_variance)
+        return expected_variance
+
+    def full_bunching_probability(self) -> float:
+        """
+        Get the probability that every photon lands in the same mode.
+
+        Returns:
+        float: sum_j prod_a T[a][j].
+        """
+        return float (np.sum (np.prod (self.transmissions, axis=0)))
+
+    def subset_bunching_probabilities(self, subsets: List[List[int]]) -> np.ndarray:
+        """
+        Get the probability that every photon lands inside each subset of modes.
+
+        Parameters:
+        subsets (List[List[int]]): The subsets of modes.
+
+        Returns:
+        np.ndarray: prod_a sum_{j in K} T[a][j] for every subset K.
+        """
+        return np.array ([np.prod (self.transmissions [:, list (subset)].sum (axis=1)) for subset in subsets])
+
+    def probability_of_max_occupation_at_most(self, capacity: int) -> float:
+        """
+        Get the probability that no mode receives more than a given number of photons, by dynamic programming over the modes.
+
+        When every photon has the same transmission row the photons are exchangeable and the
+        state of the recursion is the number of photons placed so far, giving O(m n^2) work.
+        Otherwise the state is the set of photons placed so far, and mode j takes any subset of
+        at most capacity photons among the remaining ones, giving O(m 3^n) time and O(3^n) memory.
+        That case raises a ValueError above MAXIMUM_PHOTONS_OF_THE_GENERAL_CASE photons.
+
+        Parameters:
+        capacity (int): The largest allowed occupation.
+
+        Returns:
+        float: P(max_j n_j <= capacity).
+        """
+        return float (self.probabilities_of_max_occupation_at_most ([capacity]) [0])
+
+    def probabilities_of_max_occupation_at_most(self, capacities: List[int]) -> np.ndarray:
+        """
+        Get the probability that no mode receives more than each of several numbers of photons.
+
+        The recursions of probability_of_max_occupation_at_most for the different capacities share
+        the pairs of sets of photons of the general case, which are built once.
+
+        Parameters:
+        capacities (List[int]): The largest allowed occupations.
+
+        Returns:
+        np.ndarray: P(max_j n_j <= capacity) for each capacity.
+        """
+        n = self.number_of_photons
+        probabilities = np.array ([1.0 if capacity >= n else 0.0 for capacity in capacities])
+        recursions = [index for index, capacity in enumerate (capacities) if 0 <= capacity < n]
+        if not recursions:
+            return probabilities
+
+        if np.allclose (self.transmissions, self.transmissions [0]):
+            counts = np.arange (n + 1)
+            log_factorials = np.array ([math.lgamma (t + 1) for t in counts])
+            for index in recursions:
+                # f[t] sums prod_j p_j^s_j/s_j! over the placements of t photons in the modes seen so far
+                f = np.zeros (n + 1)
+                f [0] = 1.0
+                for probability in self.transmissions [0]:
+                    g = np.zeros (n + 1)
+                    for s in range (capacities [index] + 1):
+                        # Multinomial weight p^s/s! for s photons in this mode
+                        g [s:] += f [:n + 1 - s] * probability ** s * math.exp (-log_factorials [s])
+                    f = g
+                probabilities [index] = f [n] * math.exp (log_factorials [n])
+            return probabilities
+
+        if n > self.MAXIMUM_PHOTONS_OF_THE_GENERAL_CASE:
+            raise ValueError("Photons with different transmissions take O(3^n) memory, which is limited to {} photons, got {}."
+                             .format (self.MAXIMUM_PHOTONS_OF_THE_GENERAL_CASE, n))
+
+        # Sorted by the size of the subset, the pairs allowed by a capacity are a prefix of the pairs
+        sets, subsets, sizes = self.photon_subset_pairs ()
+        order = np.argsort (sizes [subsets], kind="stable")
+        sets, subsets = sets [order], subsets [order]
+        ends = np.searchsorted (sizes [subsets], np.arange (n + 1), side="right")
+        remaining = sets ^ subsets
+        weights = self.subset_weights ()
+
+        for index in recursions:
+            end = ends [capacities [index]]
+            f = np.zeros (1 << n)
+            f [0] = 1.0
+            for mode in range (self.number_of_modes):
+                f = np.bincount (sets [:end], weights=f [remaining [:end]] * weights [subsets [:end], mode], minlength=1 << n)
+            probabilities [index] = f [-1]
+        return probabilities
+
+    def photon_subset_pairs(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Enumerate every pair (S, K) of sets of photons with K included in S, as bit masks.
+
+        Each photon is either outside S, in S but not in K, or in K, so there are 3^n pairs.
+
+        Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: The masks of S and K, and the size of every mask.
+        """
+        sets = np.zeros (1, dtype=np.int64)
+        subsets = np.zeros (1, dtype=np.int64)
+        for a in range (self.number_of_photons):
+            bit = 1 << a
+            sets = np.concatenate ((sets, sets | bit, sets | bit))
+            subsets = np.concatenate ((subsets, subsets, subsets | bit))
+
+        sizes = np.zeros (1 << self.number_of_photons, dtype=np.int64)
+        for a in range (self.number_of_photons):
+            sizes += (np.arange (len (sizes)) >> a) & 1
+        return sets, subsets, sizes
+
+    def subset_weights(self) -> np.ndarray:
+        """
+        Get the probability that a given set of photons lands in each mode.
+
+        Returns:
+        np.ndarray: A (2^n x modes) matrix with prod_{a in K} T[a][j] for every set K and mode j.
+        """
+        n = self.number_of_photons
+        weights = np.ones ((1 << n, self.number_of_modes))
+        for a in range (n):
+            size = 1 << a
+            # The sets containing photon a are the ones with bit a set
+            weights [size:2 * size] = weights [:size] * self.transmissions [a]
+        return weights
+
+    def bunching_curve(self) -> np.ndarray:
+        """
+        Get the probability that some mode receives at least k photons, for k = 0, ..., n.
+
+        Returns:
+        np.ndarray: P(max_j n_j >= k), indexed by k.
+        """
+        curve = np.ones (self.number_of_photons + 1)
+        curve [1:] = 1 - self.probabilities_of_max_occupation_at_most (list (range (self.number_of_photons)))
+        return curve
+
+    def bunching_probability(self, min_number_of_photons: int) -> float:
+        """
+        Get the probability that some mode receives at least a given number of photons.
+
+        Parameters:
+        min_number_of_photons (int): The minimum number of photons in a mode.
+
+        Returns:
+        float: P(max_j n_j >= min_number_of_photons).
+        """
+        return 1 - self.probability_of_max_occupation_at_most (min_number_of_photons - 1)
+
+    def joint_distribution(self) -> StatesAndProbabilities:
+        """
+        Materialize the joint distribution of the occupation patterns, adding one photon at a time.
+
+        Returns:
+        StatesAndProbabilities: The probability of every output state.
+        """
+        m = self.number_of_modes
+        dense = np.ones (1)
+        index = FockSpaceIndex (0, m)
+        for row in self.transmissions:
+            next_index = FockSpaceIndex (index.number_of_photons + 1, m)
+            patterns = index.unrank (np.arange (index.size)) [:, np.newaxis, :] + np.eye (m, dtype=np.int64)
+            ranks = next_index.rank (patterns.reshape (-1, m))
+            dense = np.bincount (ranks, weights=np.outer (dense, row).ravel (), minlength=next_index.size)
+            index = next_index
+
+        logger.debug ("[Distinguishable photons] Materialized %s states", index.size)
+        return index.from_dense (dense)
@@ -0,0 +1,373 @@
+import collections
+import concurrent.futures
+import json
+import os
+import numpy as np
+
+from enum import Enum
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from base.circuit_helpers import constant_gram_matrices, generate_matrices_from_parameters, generate_overlap_matrices_from_parameters, random_gram_matrices
+from base.permanents import permanents
+from .variance import Variance
+from base.logger import get_logger
+
+logger = get_logger (__name__)
+
+class GramFamily (Enum):
+    PARAMETERS = "Parameters"
+    CONSTANT = "Constant"
+    RANDOM = "Random"
+
+class SweepMetric (Enum):
+    EXPECTED_VARIANCE = "expected_variance"
+    VARIANCE_OF_EXPECTED_VARIANCE = "variance_of_expected_variance"
+    BUNCHING_PROBABILITY = "bunching_probability"
+    EIGENVALUE_BOUND = "eigenvalue_bound"
+
+FAMILY_AXES = {
+    GramFamily.PARAMETERS: ("gamma", "beta", "alpha", "phi"),
+    GramFamily.CONSTANT: ("v",),
+    GramFamily.RANDOM: ("sample",),
+}
+
+def expected_variances(gram_matrices: np.ndarray) -> np.ndarray:
+    """
+    The expected value of the expected variance of every Gram matrix.
+    """
+    return Variance.calculate_expected_values_of_the_expected_variance (gram_matrices)
+
+def eigenvalue_bounds(gram_matrices: np.ndarray) -> np.ndarray:
+    """
+    The bound on the biggest eigenvalue of every Gram matrix, from its expected variance and the one of distinguishable photons.
+    """
+    n = gram_matrices.shape [-1]
+    distinguishable = Variance.calculate_expected_value_of_the_expected_variance (np.eye (n), n)
+    return Variance.calculate_biggest_evalue_bound (expected_variances (gram_matrices), distinguishable, n)
+
+def fourier_full_bunching_probabilities(overlap_matrices: np.ndarray) -> np.ndarray:
+    """
+    The full bunching probability of n photons in the n mode Fourier transform circuit for every matrix of complex overlaps.
+
+    Every column of the Fourier matrix has entries of modulus n^-1/2, so the probability is
+    perm(S) n^(1-n), with S the overlaps of the photons. The squared overlaps of the Gram matrices
+    lose their phases, which change the permanent, so the metric takes the overlaps themselves.
+    """
+    n = overlap_matrices.shape [-1]
+    return np.real (permanents (overlap_matrices)) * float (n) ** (1 - n)
+
+def variance_of_expected_variance(gram_matrix: np.ndarray) -> float:
+    """
+    The variance of the expected variance of one Gram matrix.
+    """
+    return Variance.calculate_variance_value_of_the_expected_variance (gram_matrix, len (gram_matrix))
+
+# Each metric has a function over a stack of Gram matrices when a vectorized closed form exists,
+# otherwise a function over a single Gram matrix that is run in the process pool
+VECTORIZED_METRICS = {
+    SweepMetric.EXPECTED_VARIANCE: expected_variances,
+    SweepMetric.EIGENVALUE_BOUND: eigenvalue_bounds,
+}
+
+# Metrics over a stack of complex overlap matrices, which only the families defining the overlaps have
+OVERLAP_METRICS = {
+    SweepMetric.BUNCHING_PROBABILITY: fourier_full_bunching_probabilities,
+}
+
+SCALAR_METRICS = {
+    SweepMetric.VARIANCE_OF_EXPECTED_VARIANCE: variance_of_expected_variance,
+}
+
+def evaluate_scalar_metric(metric: Callable[[np.ndarray], float], gram_matrices: np.ndarray) -> np.ndarray:
+    """
+    Evaluate a metric over a single Gram matrix on every matrix of a stack. Runs in the worker processes.
+
+    Parameters:
+    metric (Callable[[np.ndarray], float]): The metric.
+    gram_matrices (np.ndarray): A (k x n x n) array of Gram matrices.
+
+    Returns:
+    np.ndarray: The value of the metric for each matrix.
+    """
+    return np.array ([metric (gram_matrix) for gram_matrix in gram_matrices], dtype=float)
+
+class ParameterGrid:
+    """
+    The cartesian product of the values of the parameters of a family of Gram matrices.
+
+    Points are addressed by their flat index in C order, so any range of the grid can be built
+    without building the rest of it.
+    """
+
+    def __init__(self, family: GramFamily, axes: Dict[str, Sequence[float]], number_of_modes: int = 3, seed: Optional[int] = None):
+        """
+        Initialize the grid.
+
+        Parameters:
+        family (GramFamily): The family of Gram matrices. PARAMETERS takes the axes gamma, beta, alpha and phi of generate_matrix_from_parameters (3 modes), CONSTANT the axis v of constant_matrix_gram_matrix and RANDOM the axis sample of random_matrix.
+        axes (Dict[str, Sequence[float]]): The values of each parameter.
+        number_of_modes (int): The dimension of the Gram matrices, ignored for PARAMETERS.
+        seed (Optional[int]): The seed of the RANDOM family.
+        """
+        if set (axes) != set (FAMILY_AXES [family]):
+            raise ValueError("The {} family takes the axes {}, got {}.".format (family.value, list (FAMILY_AXES [family]), list (axes)))
+
+        self.family = family
+        self.names = list (FAMILY_AXES [family])
+        self.axes = [np.asarray (axes [name], dtype=float).reshape (-1) for name in self.names]
+        self.shape = tuple (len (axis) for axis in self.axes)
+        self.size = int (np.prod (self.shape))
+        self.number_of_modes = 3 if family == GramFamily.PARAMETERS else number_of_modes
+        self.seed = seed
+
+    def parameters(self, start: int, stop: int) -> Dict[str, np.ndarray]:
+        """
+        Get the parameters of a range of points of the grid.
+
+        Parameters:
+        start (int): The first flat index.
+        stop (int): The flat index after the last one.
+
+        Returns:
+        Dict[str, np.ndarray]: The value of each parameter at each point.
+        """
+        indexes = np.unravel_index (np.arange (start, stop), self.shape)
+        return {name: axis [index] for name, axis, index in zip (self.names, self.axes, indexes)}
+
+    def gram_matrices(self, start: int, stop: int) -> np.ndarray:
+        """
+        Build the Gram matrices of a range of points of the grid.
+
+        Parameters:
+        start (int): The first flat index.
+        stop (int): The flat index after the last one.
+
+        Returns:
+        np.ndarray: A (stop - start x n x n) array of Gram matrices.
+        """
+        parameters = self.parameters (start, stop)
+        if self.family == GramFamily.PARAMETERS:
+            return generate_matrices_from_parameters (parameters ["gamma"], parameters ["beta"], parameters ["alpha"], parameters ["phi"])
+        if self.family == GramFamily.CONSTANT:
+            return constant_gram_matrices (self.number_of_modes, parameters ["v"])
+
+        # Seeded by the start of the range, so a chunk is the same whichever process builds it
+        rng = np.random.default_rng (None if self.seed is None else [self.seed, start])
+        return random_gram_matrices (stop - start, self.number_of_modes, rng)
+
+    def overlap_matrices(self, start: int, stop: int) -> np.ndarray:
+        """
+        Build the complex overlap matrices of a range of points of the grid, whose squared moduli are the Gram matrices.
+
+        The overlaps of the PARAMETERS family follow from its angles and phase, and the ones of the
+        CONSTANT family are the real non-negative square roots of v. The RANDOM family only defines
+        squared overlaps, whose phases are lost, so it has no overlap matrices.
+
+        Parameters:
+        start (int): The first flat index.
+        stop (int): The flat index after the last one.
+
+        Returns:
+        np.ndarray: A (stop - start x n x n) complex array of overlap matrices.
+        """
+        if self.family == GramFamily.PARAMETERS:
+            parameters = self.parameters (start, stop)
+            return generate_overlap_matrices_from_parameters (parameters ["gamma"], parameters ["beta"], parameters ["alpha"], parameters ["phi"])
+        if self.family == GramFamily.CONSTANT:
+            return np.sqrt (self.gram_matrices (start, stop)).astype (complex)
+        raise ValueError("The {} family only defines squared overlaps, not the overlaps themselves.".format (self.family.value))
+
+    def chunks(self, chunk_size: int) -> Iterator[Tuple[int, int]]:
+        """
+        Split the grid in ranges of consecutive points.
+
+        Parameters:
+        chunk_size (int): The number of points per range.
+
+        Yields:
+        Tuple[int, int]: The start and stop flat indexes of each range.
+        """
+        for start in range (0, self.size, chunk_size):
+            yield start, min (start + chunk_size, self.size)
+
+class SweepResults:
+    """
+    The results of a sweep, stored column by column on disk.
+
+    Each column is a .npy file that is filled in place as the chunks are evaluated, next to a
+    metadata.json file describing the sweep, so the columns can be memory mapped back without
+    reading the whole sweep in memory.
+    """
+
+    METADATA_FILE = "metadata.json"
+
+    def __init__(self, directory: str, columns: Dict[str, np.ndarray], metadata: Dict):
+        self.directory = directory
+        self.columns = columns
+        self.metadata = metadata
+
+    @classmethod
+    def create(cls, directory: str, size: int, column_names: List[str], metadata: Optional[Dict] = None) -> 'SweepResults':
+        """
+        Create the column files of a new sweep.
+
+        Parameters:
+        directory (str): The directory of the sweep.
+        size (int): The number of points of the sweep.
+        column_names (List[str]): The name of each column.
+        metadata (Optional[Dict]): Additional information stored with the sweep.
+
+        Returns:
+        SweepResults: The writable results.
+        """
+        os.makedirs (directory, exist_ok=True)
+        metadata = dict (metadata or {}, size=size, columns=column_names, completed=0)
+        columns = {name: np.lib.format.open_memmap (os.path.join (directory, name + ".npy"), mode="w+", dtype=float, shape=(size,))
+                   for name in column_names}
+        results = cls (directory, columns, metadata)
+        results.write_metadata ()
+        return results
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> 'SweepResults':
+        """
+        Load the results of a sweep.
+
+        Parameters:
+        directory (str): The directory of the sweep.
+        mmap (bool): If True the columns are memory mapped read only instead of read in memory.
+
+        Returns:
+        SweepResults: The results.
+        """
+        with open (os.path.join (directory, cls.METADATA_FILE)) as metadata_file:
+            metadata = json.load (metadata_file)
+        columns = {name: np.load (os.path.join (directory, name + ".npy"), mmap_mode="r" if mmap else None) for name in metadata ["columns"]}
+        return cls (directory, columns, metadata)
+
+    def write_metadata(self) -> None:
+        with open (os.path.join (self.directory, self.METADATA_FILE), "w") as metadata_file:
+            json.dump (self.metadata, metadata_file, indent=1)
+
+    def write(self, start: int, values: Dict[str, np.ndarray]) -> None:
+        """
+        Write a chunk of every column and flush it to disk.
+
+        Parameters:
+        start (int): The flat index of the first point of the chunk.
+        values (Dict[str, np.ndarray]): The values of each column for the chunk.
+        """
+        for name, column_values in values.items ():
+            column = self.columns [name]
+            column [start:start + len (column_values)] = column_values
+            column.flush ()
+        self.metadata ["completed"] += len (next (iter (values.values ())))
+
+    def close(self) -> None:
+        """
+        Record the number of completed points and release the column files.
+        """
+        self.write_metadata ()
+        self.columns = {name: np.load (os.path.join (self.directory, name + ".npy"), mmap_mode="r") for name in self.metadata ["columns"]}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns [name]
+
+    def __len__(self) -> int:
+        return self.metadata ["size"]
+
+class SweepRunner:
+    """
+    Evaluates a metric over every Gram matrix of a parameter grid, one chunk of the grid at a time.
+
+    Metrics with a vectorized closed form are evaluated in the current process on the whole
+    chunk. The others are sent chunk by chunk to a process pool, keeping only a bounded number
+    of chunks in flight. Every chunk is written to the columnar results as soon as it is done.
+    """
+
+    def __init__(self, chunk_size: int = 4096, max_workers: Optional[int] = None):
+        """
+        Initialize the runner.
+
+        Parameters:
+        chunk_size (int): The number of grid points per chunk.
+        max_workers (Optional[int]): The number of worker processes for the metrics without closed form. 0 evaluates them in the current process. Defaults to the number of processors.
+        """
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+
+    def run(self, grid: ParameterGrid, metric: Union[SweepMetric, Callable[[np.ndarray], float]], directory: str, name: Optional[str] = None) -> SweepResults:
+        """
+        Run a sweep.
+
+        Parameters:
+        grid (ParameterGrid): The grid of parameters.
+        metric (Union[SweepMetric, Callable[[np.ndarray], float]]): The metric, or a picklable function of a single Gram matrix.
+        directory (str): The directory where the results are written.
+        name (Optional[str]): The name of the metric column. Defaults to the value of the metric, or the name of the function.
+
+        Returns:
+        SweepResults: The results, with a column per parameter and one for the metric.
+        """
+        if name is None:
+            name = metric.value if isinstance (metric, SweepMetric) else metric.__name__
+
+        if metric in OVERLAP_METRICS and grid.family == GramFamily.RANDOM:
+            raise ValueError("The {} metric needs the complex overlaps, which the {} family does not define.".format (name, grid.family.value))
+
+        results = SweepResults.create (directory, grid.size, grid.names + [name],
+                                       {"family": grid.family.value, "metric": name, "number_of_modes": grid.number_of_modes})
+        chunks = grid.chunks (self.chunk_size)
+
+        if metric in OVERLAP_METRICS:
+            logger.debug ("[Sweep] Evaluating %s over %s points with its closed form on the overlaps", name, grid.size)
+            for start, stop in chunks:
+                self.write_chunk (results, grid, start, stop, name, OVERLAP_METRICS [metric] (grid.overlap_matrices (start, stop)))
+        elif metric in VECTORIZED_METRICS:
+            logger.debug ("[Sweep] Evaluating %s over %s points with its closed form", name, grid.size)
+            for start, stop in chunks:
+                self.write_chunk (results, grid, start, stop, name, VECTORIZED_METRICS [metric] (grid.gram_matrices (start, stop)))
+        else:
+            scalar_metric = SCALAR_METRICS.get (metric, metric)
+            logger.debug ("[Sweep] Evaluating %s over %s points in chunks of %s", name, grid.size, self.chunk_size)
+            for start, stop, values in self.evaluate_in_pool (grid, chunks, scalar_metric):
+                self.write_chunk (results, grid, start, stop, name, values)
+
+        results.close ()
+        return results
+
+    def write_chunk(self, results: SweepResults, grid: ParameterGrid, start: int, stop: int, name: str, values: np.ndarray) -> None:
+        columns = grid.parameters (start, stop)
+        columns [name] = values
+        results.write (start, columns)
+
+    def evaluate_in_pool(self, grid: ParameterGrid, chunks: Iterator[Tuple[int, int]],
+                         metric: Callable[[np.ndarray], float]) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """
+        Evaluate a metric over single Gram matrices chunk by chunk, in a process pool.
+
+        Parameters:
+        grid (ParameterGrid): The grid of parameters.
+        chunks (Iterator[Tuple[int, int]]): The ranges of the grid to evaluate.
+        metric (Callable[[np.ndarray], float]): The metric.
+
+        Yields:
+        Tuple[int, int, np.ndarray]: The range of each chunk and its values, in grid order.
+        """
+        if self.max_workers == 0:
+            for start, stop in chunks:
+                yield start, stop, evaluate_scalar_metric (metric, grid.gram_matrices (start, stop))
+            return
+
+        max_in_flight = 2 * (self.max_workers or os.cpu_count () or 1)
+        with concurrent.futures.ProcessPoolExecutor (max_workers=self.max_workers) as executor:
+            pending = collections.deque ()
+            for start, stop in chunks:
+                pending.append ((start, stop, executor.submit (evaluate_scalar_metric, metric, grid.gram_matrices (start, stop))))
+                if len (pending) >= max_in_flight:
+                    start_, stop_, future = pending.popleft ()
+                    yield start_, stop_, future.result ()
+
+            while pending:
+                start_, stop_, future = pending.popleft ()
+                yield start_, stop_, future.result ()
@@ -1,15 +1,22 @@
-import logging
 import numpy as np
 import math
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 import itertools, functools
 from fractions import Fraction
 
 from base.abstract_circuit import AbstractCircuit
 from base.results import StatesAndProbabilities
-from base.state_generation_helpers import generate_state_from_list
-from base.circuit_helpers import generate_fourier_transform_circuit
+from base.state_generation_helpers import generate_state_from_list, state_to_list
+from base.circuit_helpers import cached_fourier_transform_circuit
+from base.circuit_stack import AbstractCircuitStack
+from base.devices import DeviceMode
 from base.devices import Device
+from base.experiment_plan import ExperimentPlan
+from base.instrumentation import PROFILER
+from .distinguishable import DistinguishablePhotons
+from base.logger import get_logger
+
+logger = get_logger (__name__)
 
 class Variance:
     @staticmethod
@@ -90,6 +97,22 @@ class Variance:
                     sum_overlaps_ab += gram_matrix [a][b]
         return 1 + (1/(n*(n + 1)))*sum_overlaps_ab - (2/(n+1))
 
+    @staticmethod
+    def calculate_expected_values_of_the_expected_variance(gram_matrices: np.ndarray) -> np.ndarray:
+        """
+        Calculates the expected value of the expected variance for a stack of Gram matrices at once.
+
+        Parameters:
+        gram_matrices (np.ndarray): A (k x n x n) array of Gram matrices.
+
+        Returns:
+        np.ndarray: The expected value of the expected variance for each Gram matrix.
+        """
+        gram_matrices = np.asarray (gram_matrices, dtype=float)
+        n = gram_matrices.shape [-1]
+        sum_overlaps_ab = np.sum (gram_matrices, axis=(1, 2)) - np.trace (gram_matrices, axis1=1, axis2=2)
+        return 1 + (1/(n*(n + 1)))*sum_overlaps_ab - (2/(n+1))
+
     @staticmethod
     def calculate_expected_variance_from_gram_matrix_and_interferometer (gram_matrix: List[List[float]], interferometer: List[List[complex]], n: int) -> float:
         n = len (gram_matrix)
@@ -106,6 +129,27 @@ class Variance:
 
         return 1 + (1/n) * sum - (1/n) * sum_4
     
+    @staticmethod
+    def calculate_expected_variances_from_gram_matrix_and_interferometers (gram_matrix: List[List[float]], interferometers: AbstractCircuitStack) -> np.ndarray:
+        """
+        Calculates the expected variance for every interferometer of a stack at once.
+
+        Parameters:
+        gram_matrix (List[List[float]]): The Gram matrix representing overlaps between the modes.
+        interferometers (AbstractCircuitStack): The interferometers, or any (k x n x n) array of matrices.
+
+        Returns:
+        np.ndarray: The expected variance for each interferometer.
+        """
+        gram_matrix = np.asarray (gram_matrix, dtype=float)
+        n = len (gram_matrix)
+        squared = np.abs (np.asarray (interferometers) [:, :n, :n]) ** 2
+        products = np.einsum ('kia,kib->kab', squared, squared)
+        off_diagonal = ~np.eye (n, dtype=bool)
+        sums = np.sum (gram_matrix [off_diagonal] * products [:, off_diagonal], axis=1)
+
+        return 1 + (1/n) * sums - (1/n) * np.sum (squared ** 2, axis=(1, 2))
+
     @staticmethod
     def calculate_variance_value_of_the_expected_variance (gram_matrix: List[List[float]], n: int) -> float:
         first_coefficient_case = lambda n: (2 + 4*n + n**2) / (6*n + 11 * n** 2 + 6*n**3 + n**4)
@@ -198,7 +242,7 @@ class Variance:
                 
                 mode_ = mode_ + 1
 
-        logging.debug ("[Loss Function] Expected value {}".format (expected_value))
+        logger.debug ("[Loss Function] Expected value %s", expected_value)
         return expected_value
 
     def calculate_variance(self, results: StatesAndProbabilities, mode: int) -> float:
@@ -224,7 +268,7 @@ class Variance:
                 
                 mode_ = mode_ + 1
             
-        logging.debug ("[Loss Function] Variance {}".format (variance))
+        logger.debug ("[Loss Function] Variance %s", variance)
         return variance
     
     def calculate_expected_variance(self, results: StatesAndProbabilities, number_of_modes: int) -> float:
@@ -239,13 +283,70 @@ class Variance:
         float: The expected variance averaged over all modes.
         """
         variance = 0
-        for i in range(number_of_modes):
-            variance = variance + self.calculate_variance (results, i)
+        with PROFILER.span ("aggregation", measure="variance"):
+            for i in range(number_of_modes):
+                variance = variance + self.calculate_variance (results, i)
 
-        logging.debug ("[Loss Function] Expected variance {}".format (variance/number_of_modes))   
+        logger.debug ("[Loss Function] Expected variance %s", variance/number_of_modes)   
         return variance/number_of_modes
     
     
+    def calculate_variance_of_expected_variance_estimate(self, results: StatesAndProbabilities, number_of_modes: int, number_of_samples: Optional[int] = None) -> float:
+        """
+        Estimates the sampling variance of the expected variance measured from a finite number of samples,
+        using the delta method on the per-sample occupations.
+
+        Parameters:
+        results (StatesAndProbabilities): The results from an experiment.
+        number_of_modes (int): The total number of modes.
+        number_of_samples (Optional[int]): The number of samples behind the results. Defaults to the total counting.
+
+        Returns:
+        float: The variance of the expected variance estimate. It is zero for exact probabilities: results of a device
+               in ANALYZER mode, or results without countings when no number of samples is given.
+        """
+        if getattr (self.device, "mode", None) == DeviceMode.ANALYZER:
+            return 0.0
+        if number_of_samples is None:
+            if not results.has_countings ():
+                return 0.0
+            number_of_samples = sum (results.states_and_countings.values ())
+
+        states = list (results.get_probability_states ())
+        if not number_of_samples or not states:
+            return 0.0
+
+        occupations = np.array ([state_to_list (state) [:number_of_modes] for state in states], dtype=float)
+        probabilities = np.array ([results.get_probability (state) for state in states], dtype=float)
+
+        # Influence of each sample on (1/m) sum_j (E[n_j^2] - E[n_j]^2)
+        means = probabilities @ occupations
+        influence = np.sum (occupations ** 2 - 2 * means * occupations, axis=1) / number_of_modes
+        variance_of_influence = probabilities @ influence ** 2 - (probabilities @ influence) ** 2
+
+        return float (max (variance_of_influence, 0) / number_of_samples)
+
+    def execute_experiment_variance_with_uncertainty(self, circuit: Optional[AbstractCircuit] = None, state: Optional[str] = None) -> Tuple[float, float]:
+        """
+        Executes an experiment to calculate variance, together with the sampling variance of the estimate.
+
+        Parameters:
+        circuit (Optional[AbstractCircuit]): The circuit for the experiment. Defaults to a Fourier transform circuit.
+        state (Optional[str]): The initial state for the experiment. Defaults to a uniform state.
+
+        Returns:
+        Tuple[float, float]: The expected variance and the variance of that estimate.
+        """
+        if state == None:
+            state = generate_state_from_list ([1 for i in range (self.number_of_modes)])
+
+        if circuit == None:
+            circuit = cached_fourier_transform_circuit (self.number_of_modes)
+
+        results = self.device.execute_experiment (state, circuit)
+        return (self.calculate_expected_variance (results, self.number_of_modes),
+                self.calculate_variance_of_expected_variance_estimate (results, self.number_of_modes))
+
     def execute_experiment_variance(self, circuit: Optional[AbstractCircuit] = None, state: Optional[str] = None) -> float:
         """
         Executes an experiment to calculate variance using the specified state and circuit.
@@ -261,29 +362,68 @@ class Variance:
             state = generate_state_from_list ([1 for i in range (self.number_of_modes)])
 
         if circuit == None:
-            circuit = generate_fourier_transform_circuit (self.number_of_modes)
-        logging.debug ("Executing Variance experiemnt with " + str (state) + " and " + str (circuit))
-        results = self.device.execute_experiment (state, circuit)    
-        return self.calculate_expected_variance (results, self.number_of_modes)
+            circuit = cached_fourier_transform_circuit (self.number_of_modes)
+        logger.debug ("Executing Variance experiemnt with %s and %s", state, circuit)
+        with PROFILER.span ("variance experiment"):
+            results = self.device.execute_experiment (state, circuit)    
+            return self.calculate_expected_variance (results, self.number_of_modes)
     
-    def execute_experiment_variance_distinguishable_scenario(self, number_of_modes: int) -> float:
+    def execute_experiments_variance(self, circuits: AbstractCircuitStack, state: Optional[str] = None) -> np.ndarray:
+        """
+        Executes the variance experiment for every circuit of a stack.
+
+        Parameters:
+        circuits (AbstractCircuitStack): The circuits for the experiments.
+        state (Optional[str]): The initial state for the experiments. Defaults to a uniform state.
+
+        Returns:
+        np.ndarray: The calculated expected variance for each circuit.
+        """
+        return np.array ([self.execute_experiment_variance (circuit, state) for circuit in circuits])
+
+    def execute_experiment_variance_distinguishable_scenario(self, number_of_modes: int, transmissions: Optional[np.ndarray] = None) -> float:
         """
-        Executes experiments for a distinguishable scenario across multiple modes and calculates the expected variance.
+        Calculates the expected variance for a distinguishable scenario across multiple modes.
+
+        The photons do not interfere, so only the output distribution of each photon alone is
+        needed: the variance follows from these transmission rows, without aggregating the
+        single photon results into the joint distribution.
 
         Parameters:
         number_of_modes (int): The number of modes.
+        transmissions (Optional[np.ndarray]): The (photons x modes) transmission rows, e.g. |U|^2 or a previous measurement. If None they are measured with one single photon experiment per mode.
 
         Returns:
         float: The calculated expected variance for a distinguishable scenario.
         """
-        results_agrregated = StatesAndProbabilities ()
+        if transmissions is not None:
+            return DistinguishablePhotons (transmissions).expected_variance ()
+
+        with PROFILER.span ("variance experiment", scenario="distinguishable"):
+            plan = ExperimentPlan ()
+            variance = self.request_variance_distinguishable_scenario (plan, number_of_modes)
+            plan.execute (self.device)
+            return variance ()
 
-        for i in range (number_of_modes):
-            l = [1 if j == i else 0 for j in range (number_of_modes)]
-            results_distinguishable = self.device.execute_experiment (generate_state_from_list (l), generate_fourier_transform_circuit (self.number_of_modes))
-            results_agrregated.aggregate (results_distinguishable.get_probabilities ())
+    def request_variance_distinguishable_scenario(self, plan: ExperimentPlan, number_of_modes: int) -> Callable[[], float]:
+        """
+        Declares the single photon experiments of the distinguishable scenario in a plan shared with other measures.
+
+        Parameters:
+        plan (ExperimentPlan): The plan the experiments are requested in.
+        number_of_modes (int): The number of modes.
+
+        Returns:
+        Callable[[], float]: Calculates the expected variance once the plan is executed.
+        """
+        circuit = cached_fourier_transform_circuit (self.number_of_modes)
+        keys = [plan.request (generate_state_from_list ([1 if j == i else 0 for j in range (number_of_modes)]), circuit)
+                for i in range (number_of_modes)]
 
-        return self.calculate_expected_variance (results_agrregated, number_of_modes)
+        def variance () -> float:
+            with PROFILER.span ("aggregation", measure="variance"):
+                return DistinguishablePhotons.from_results ([plan.get (key) for key in keys], number_of_modes).expected_variance ()
+        return variance
 
     def execute_experiment_variance_indistinguishable_scenario(self, number_of_modes: int) -> float:
         """
@@ -295,6 +435,23 @@ class Variance:
         Returns:
         float: The calculated expected variance for an indistinguishable scenario.
         """
-        results =  self.device.execute_experiment (generate_state_from_list ([1 for i in range (number_of_modes)]), generate_fourier_transform_circuit (number_of_modes))
-        return self.calculate_expected_variance (results, number_of_modes)
+        with PROFILER.span ("variance experiment", scenario="indistinguishable"):
+            plan = ExperimentPlan ()
+            variance = self.request_variance_indistinguishable_scenario (plan, number_of_modes)
+            plan.execute (self.device)
+            return variance ()
+
+    def request_variance_indistinguishable_scenario(self, plan: ExperimentPlan, number_of_modes: int) -> Callable[[], float]:
+        """
+        Declares the experiment of the indistinguishable scenario in a plan shared with other measures.
+
+        Parameters:
+        plan (ExperimentPlan): The plan the experiment is requested in.
+        number_of_modes (int): The number of modes.
+
+        Returns:
+        Callable[[], float]: Calculates the expected variance once the plan is executed.
+        """
+        key = plan.request (generate_state_from_list ([1 for i in range (number_of_modes)]), cached_fourier_transform_circuit (number_of_modes))
+        return lambda: self.calculate_expected_variance (plan.get (key), number_of_modes)
     
\ No newline at end of file
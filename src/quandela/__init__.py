@@ -1,4 +1,21 @@
-from .enchancedanalyzer import *
-from .circuit_helpers import *
-from .quandela_devices import *
-from .quandela_tomography import *
\ No newline at end of file
+# The submodules are only imported when one of their attributes is first read
+from base.lazy_imports import attach
+
+__getattr__, __dir__, __all__ = attach (__name__, {
+    "enchancedanalyzer": ["EnhancedAnalyzer"],
+    "circuit_helpers": ["configurable_tensor_product", "circuit_tensor_product", "circuit_tensor_product_with_extra",
+                        "create_custom_MZ", "approximate_with_BSplusPS", "approximate_with_MZ", "fingerprint_perceval_circuit",
+                        "generate_permutations", "generate_identity", "generate_random_permutation",
+                        "generate_several_random_permutations", "generate_dagger_circuit", "generate_bunching_circuit",
+                        "generate_fourier_butterfly_circuit", "cached_fourier_transform_circuit",
+                        "generate_fourier_transform_circuit", "cut_unused_parameters", "create_generic_circuit",
+                        "create_generic_circuit_with_circuit_cutting", "generate_random_circuit",
+                        "generate_random_circuit_cut_unused_parameters", "mzi_mesh_modes", "sample_mzi_phases",
+                        "create_mzi_mesh_circuit", "generate_haar_random_mzi_circuit", "extract_parameters_from_random_circuit",
+                        "generate_parameters_from_random_circuit", "randomize_parameters_from_perceval_circuit"],
+    "quandela_devices": ["QuandelaLocalDevices", "QuandelaRemoteDevices", "QuandelaDeviceFactory", "QuandelaDevice",
+                         "AutoQuandelaDevice"],
+    "quandela_tomography": ["QuandelaProcessTomographyProber"],
+    "backend_selection": ["BackendRecommendations", "BACKEND_TIMINGS", "CLIFFORD_SHOT_OVERHEAD", "estimate_backend_costs",
+                          "BackendSelector"]
+})
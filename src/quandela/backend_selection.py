@@ -0,0 +1,193 @@
+import json
+import math
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from base.devices import DeviceMode
+from base.logger import get_logger
+
+logger = get_logger (__name__)
+
+class BackendRecommendations:
+    """
+    A table of the fastest accurate local backend for each workload size, as measured by the backend benchmark.
+
+    Workloads are described by their number of photons, number of modes and device mode. A
+    workload that was not measured gets the recommendation of the smallest measured workload
+    that covers it, or of the largest measured one when none does.
+    """
+
+    def __init__(self, entries: Optional[List[Dict[str, Any]]] = None):
+        """
+        Initialize the table.
+
+        Parameters:
+        entries (Optional[List[Dict[str, Any]]]): The rows of the table, with the keys photons, modes, mode, backend and time.
+        """
+        self.entries = {}
+        for entry in entries or []:
+            self.add (entry ["photons"], entry ["modes"], DeviceMode (entry ["mode"]), entry ["backend"], entry.get ("time"))
+
+    def add(self, photons: int, modes: int, mode: DeviceMode, backend: str, time: Optional[float] = None) -> None:
+        """
+        Record the recommended backend of a workload.
+
+        Parameters:
+        photons (int): The number of photons.
+        modes (int): The number of modes.
+        mode (DeviceMode): The device mode.
+        backend (str): The name of the recommended local backend.
+        time (Optional[float]): The time to result of the backend, in seconds.
+        """
+        self.entries [(photons, modes, mode)] = {"photons": photons, "modes": modes, "mode": mode.value, "backend": backend, "time": time}
+
+    def recommend(self, photons: int, modes: int, mode: DeviceMode, extrapolate: bool = True) -> Optional[str]:
+        """
+        Get the recommended backend of a workload.
+
+        Parameters:
+        photons (int): The number of photons.
+        modes (int): The number of modes.
+        mode (DeviceMode): The device mode.
+        extrapolate (bool): If False a workload bigger than every measured one gets no recommendation.
+
+        Returns:
+        Optional[str]: The name of the backend, or None if no workload of this device mode was measured.
+        """
+        sizes = [(p, m) for (p, m, mode_) in self.entries if mode_ == mode]
+        covering = [size for size in sizes if size [0] >= photons and size [1] >= modes]
+        if not covering and (not sizes or not extrapolate):
+            return None
+
+        size = min (covering) if covering else max (sizes)
+        backend = self.entries [size + (mode,)]["backend"]
+        logger.debug ("[Backend recommendations] %s photons in %s modes (%s): %s measured on %s", photons, modes, mode.value, backend, size)
+        return backend
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        """
+        Get the rows of the table, sorted by device mode and size.
+
+        Returns:
+        List[Dict[str, Any]]: The rows.
+        """
+        return [self.entries [key] for key in sorted (self.entries, key=lambda key: (key [2].value, key [0], key [1]))]
+
+    def save(self, path: str) -> None:
+        """
+        Save the table as JSON.
+
+        Parameters:
+        path (str): The file to write.
+        """
+        with open (path, "w") as table_file:
+            json.dump (self.to_rows (), table_file, indent=1)
+
+    @classmethod
+    def load(cls, path: str) -> 'BackendRecommendations':
+        """
+        Load a table saved as JSON.
+
+        Parameters:
+        path (str): The file to read.
+
+        Returns:
+        BackendRecommendations: The table.
+        """
+        with open (path) as table_file:
+            return cls (json.load (table_file))
+
+# Rough time model of each backend, in seconds: a fixed overhead per experiment and a time per
+# elementary operation, calibrated on the backend benchmark. Clifford & Clifford also pays an
+# interpretation overhead per shot.
+BACKEND_TIMINGS = {
+    "SLOS": (5e-3, 1e-8),
+    "Naive": (0.3, 1e-8),
+    "Stepper": (5e-2, 1e-7),
+    "CliffordClifford2017": (0.0, 1e-8),
+}
+CLIFFORD_SHOT_OVERHEAD = 2e-3
+
+def estimate_backend_costs(number_of_photons: int, number_of_modes: int, mode: DeviceMode, number_of_samples: int) -> Dict[str, float]:
+    """
+    Estimate the time of one experiment on each exact local backend.
+
+    SLOS builds the whole output distribution, about n C(n+m-1, n) operations. Naive computes
+    one permanent of cost n 2^n per output state and the stepper applies each of the m^2
+    components of the mesh to every state. Clifford & Clifford only samples, n 2^n + n m
+    operations per shot, so it is not an option for the analyzer. MPS is approximate and is
+    only chosen through a measured recommendation.
+
+    Parameters:
+    number_of_photons (int): The number of photons.
+    number_of_modes (int): The number of modes.
+    mode (DeviceMode): The device mode.
+    number_of_samples (int): The number of shots of the sampler.
+
+    Returns:
+    Dict[str, float]: The estimated time of each backend, in seconds.
+    """
+    n, m = number_of_photons, number_of_modes
+    states = math.comb (n + m - 1, n)
+    operations = {
+        "SLOS": max (n, 1) * states,
+        "Naive": max (n, 1) * 2 ** n * states,
+        "Stepper": m * m * states,
+    }
+    if mode == DeviceMode.SAMPLER:
+        operations ["CliffordClifford2017"] = number_of_samples * (max (n, 1) * 2 ** n + n * m)
+
+    costs = {backend: BACKEND_TIMINGS [backend][0] + BACKEND_TIMINGS [backend][1] * count for backend, count in operations.items ()}
+    if mode == DeviceMode.SAMPLER:
+        costs ["CliffordClifford2017"] += number_of_samples * CLIFFORD_SHOT_OVERHEAD
+    return costs
+
+class BackendSelector:
+    """
+    Chooses the local backend of each experiment from the size of its workload.
+
+    A measured recommendation is used when the table covers the workload, otherwise the
+    available backend of lowest estimated cost is chosen.
+    """
+
+    def __init__(self, recommendations: Optional[BackendRecommendations] = None, available: Optional[Iterable[str]] = None):
+        """
+        Initialize the selector.
+
+        Parameters:
+        recommendations (Optional[BackendRecommendations]): The table written by the backend benchmark.
+        available (Optional[Iterable[str]]): The backends installed. Defaults to every backend of the cost model.
+        """
+        self.recommendations = recommendations
+        self.available = None if available is None else set (available)
+
+    def select(self, number_of_photons: int, number_of_modes: int, mode: DeviceMode, number_of_samples: int) -> Tuple[str, str]:
+        """
+        Choose the backend of an experiment.
+
+        Parameters:
+        number_of_photons (int): The number of photons.
+        number_of_modes (int): The number of modes.
+        mode (DeviceMode): The device mode.
+        number_of_samples (int): The number of shots of the sampler.
+
+        Returns:
+        Tuple[str, str]: The name of the backend and the reasoning behind the choice.
+        """
+        workload = "{} photons in {} modes ({}{})".format (number_of_photons, number_of_modes, mode.value,
+                                                         ", {} shots".format (number_of_samples) if mode == DeviceMode.SAMPLER else "")
+
+        if self.recommendations is not None:
+            backend = self.recommendations.recommend (number_of_photons, number_of_modes, mode, extrapolate=False)
+            if backend is not None and (self.available is None or backend in self.available):
+                return backend, "{}: {} is the fastest accurate backend measured for this size".format (workload, backend)
+
+        costs = estimate_backend_costs (number_of_photons, number_of_modes, mode, number_of_samples)
+        if self.available is not None:
+            costs = {backend: cost for backend, cost in costs.items () if backend in self.available}
+        if not costs:
+            raise ValueError("No local backend available for {}.".format (workload))
+
+        ranking = sorted (costs, key=costs.get)
+        reasoning = "{}: estimated times {}".format (workload, ", ".join ("{} {:.3g} s".format (backend, costs [backend]) for backend in ranking))
+        return ranking [0], reasoning
@@ -1,13 +1,16 @@
-import logging
+import functools
 import perceval as pcvl
 import perceval.components as comp
 import numpy as np
 import random
 import cmath
-import re
 
-from base.circuit_helpers import fourier_matrix
-from typing import List, Tuple
+from base.circuit_helpers import cached_fourier_matrix, fourier_matrix, random_unitaries
+from base.fingerprints import fingerprint_matrix
+from base.logger import get_logger, lazy
+from typing import List, Optional, Tuple
+
+logger = get_logger (__name__)
 
 def configurable_tensor_product(circuit_1: pcvl.Circuit, circuit_2: pcvl.Circuit, dimensions: List[int] = [2, 2]) -> pcvl.Circuit:
     """
@@ -22,13 +25,13 @@ def configurable_tensor_product(circuit_1: pcvl.Circuit, circuit_2: pcvl.Circuit
     pcvl.Circuit: The resulting tensor product circuit.
     """
     
-    print ("Dimensions: ", sum (dimensions))
+    logger.debug ("Dimensions: %s", sum (dimensions))
     c = pcvl.Circuit(sum (dimensions))
     index = 0
-    print ("Indexes: ", index, ", f:", dimensions [0] - 1)
+    logger.debug ("Indexes: %s, f: %s", index, dimensions [0] - 1)
     c.add ((index, index + dimensions [0]-1), circuit_1)
     index = dimensions [0]
-    print ("Indexes: ", index, ", f:", dimensions [0] - 1)
+    logger.debug ("Indexes: %s, f: %s", index, dimensions [0] - 1)
     c.add ((index, index + dimensions [1]-1), circuit_2)
     return c
 
@@ -95,11 +98,11 @@ def approximate_with_BSplusPS(some_matrix) -> pcvl.Circuit:
     pcvl.Circuit: The resulting circuit.
     """
     M = pcvl.Matrix(some_matrix)
-    print ("Some matrix", M)
+    logger.debug ("Some matrix %s", M)
     # Create a generalized beam splitter/phase shifter - Mach Zender interferometer
     ub = pcvl.Circuit(2, name="ub") // comp.BS() // (0, comp.PS(phi=pcvl.Parameter("φ_a")))
     dec = pcvl.Circuit.decomposition(M, ub)
-    print ("Result: ", dec.describe ())
+    logger.debug ("Result: %s", lazy (dec.describe))
     return dec
     
 def approximate_with_MZ(some_matrix) -> pcvl.Circuit:
@@ -120,6 +123,19 @@ def approximate_with_MZ(some_matrix) -> pcvl.Circuit:
     
     return c2
 
+def fingerprint_perceval_circuit (circuit: pcvl.Circuit, decimals: int = 8) -> str:
+    """
+    Compute the fingerprint of a Perceval circuit, matching the one of an AbstractCircuit with the same unitary.
+
+    Parameters:
+    circuit (pcvl.Circuit): The circuit to fingerprint. Every parameter must be defined.
+    decimals (int): The number of decimals the unitary is rounded to.
+
+    Returns:
+    str: The fingerprint of the unitary of the circuit.
+    """
+    return fingerprint_matrix (np.array (circuit.compute_unitary ()), decimals)
+
 # First do the necessary permutations
 def generate_permutations(n: int) -> pcvl.Circuit:
     """
@@ -142,7 +158,7 @@ def generate_permutations(n: int) -> pcvl.Circuit:
         perm [half + i - 1] = temp
         i+=2
 
-    print (perm)
+    logger.debug ("Permutation %s", perm)
     circuit_perm //= comp.PERM (perm)
 
     j = 0
@@ -189,7 +205,7 @@ def generate_random_permutation(n: int) -> pcvl.Circuit:
     perm [n1] = perm [n2]
     perm [n2] = temp
 
-    print ("Generated permutation {}".format (perm))
+    logger.debug ("Generated permutation %s", perm)
     circuit_perm //= comp.PERM (perm)    
     return circuit_perm
 
@@ -206,14 +222,14 @@ def generate_several_random_permutations(number_of_photons: int, number_of_permu
     """
     i = 0
     random_permutations = []
-    print ("Numebr of modes {}".format (number_of_photons))
-    print ("Number of permutations to generate: {}".format (number_of_permutations))
+    logger.debug ("Number of modes %s", number_of_photons)
+    logger.debug ("Number of permutations to generate: %s", number_of_permutations)
     while i < number_of_permutations:
         circuit = generate_random_permutation (number_of_photons)
         random_permutations.append (circuit)
         i = i + 1
     
-    print ("Generated permutations: {}".format (random_permutations))
+    logger.debug ("Generated permutations: %s", random_permutations)
     return random_permutations
 
 def generate_dagger_circuit (circuit):
@@ -244,7 +260,7 @@ def generate_bunching_circuit(n: int) -> pcvl.Circuit:
 
     total_circuit = pcvl.Circuit(n, name="bunch")
 
-    circuit_m = approximate_with_MZ (fourier_matrix (d))
+    circuit_m = generate_fourier_transform_circuit (d)
     #print ("Fourier transform {}".format (circuit_m.describe ()))
     #pcvl.pdisplay(circuit_fm)
 
@@ -253,22 +269,76 @@ def generate_bunching_circuit(n: int) -> pcvl.Circuit:
     #pcvl.pdisplay(generate_permutations (n))
     #bunching_circuit = Circuit(n, name="bunch") // circuit_fm
 
-    print ("Total circuit {}".format (total_circuit.describe ()))
+    logger.debug ("Total circuit %s", lazy (total_circuit.describe))
     #pcvl.pdisplay(generate_permutations (n))
     return total_circuit
 
+def generate_fourier_butterfly_circuit(dimension: int) -> pcvl.Circuit:
+    """
+    Build the Fourier transform circuit analytically from the radix-2 FFT butterfly structure.
+
+    The modes are sorted into even and odd halves, each half goes through the Fourier
+    transform of half the dimension, the odd half gets the twiddle phases and every mode k
+    is mixed with mode k + dimension/2 by a balanced beam splitter.
+
+    Parameters:
+    dimension (int): The dimension of the circuit, a power of two.
+
+    Returns:
+    pcvl.Circuit: The resulting Fourier transform circuit.
+    """
+    if dimension < 1 or dimension & (dimension - 1) != 0:
+        raise ValueError("The butterfly circuit needs a power of two dimension, got {}.".format (dimension))
+
+    circuit = pcvl.Circuit (dimension, name="F{}".format (dimension))
+    if dimension == 1:
+        return circuit
+
+    half = dimension // 2
+    if dimension > 2:
+        circuit.add (0, comp.PERM ([i // 2 if i % 2 == 0 else half + i // 2 for i in range (dimension)]))
+        half_circuit = generate_fourier_butterfly_circuit (half)
+        circuit.add (0, half_circuit, merge=True).add (half, half_circuit, merge=True)
+    for k in range (1, half):
+        circuit.add (half + k, comp.PS (2 * np.pi * k / dimension))
+
+    # Bring every pair (k, k + half) next to each other, mix them and put them back
+    interleave = [2 * i if i < half else 2 * (i - half) + 1 for i in range (dimension)]
+    if dimension > 2:
+        circuit.add (0, comp.PERM (interleave))
+    for k in range (half):
+        circuit.add (2 * k, comp.BS.H ())
+    if dimension > 2:
+        circuit.add (0, comp.PERM ([interleave.index (i) for i in range (dimension)]))
+    return circuit
+
+@functools.lru_cache (maxsize=None)
+def cached_fourier_transform_circuit(dimension: int) -> pcvl.Circuit:
+    """
+    Get the Fourier transform circuit for the given dimension, built once and shared.
+
+    Parameters:
+    dimension (int): The dimension of the circuit.
+
+    Returns:
+    pcvl.Circuit: The shared Fourier transform circuit. It must not be modified.
+    """
+    if dimension & (dimension - 1) == 0:
+        return generate_fourier_butterfly_circuit (dimension)
+    return approximate_with_MZ (cached_fourier_matrix (dimension))
+
 def generate_fourier_transform_circuit(dimension: int) -> pcvl.Circuit:
     """
-    Generate a Fourier transform circuit for the given dimension.
+    Generate a Fourier transform circuit for the given dimension. Powers of two use the butterfly
+    mesh, other dimensions are decomposed numerically, and either is only built once.
 
     Parameters:
     dimension (int): The dimension of the circuit.
 
     Returns:
-    pcvl.Circuit: The resulting Fourier transform circuit.
+    pcvl.Circuit: The resulting Fourier transform circuit, a copy that the caller may modify.
     """
-    total_circuit = approximate_with_MZ (fourier_matrix (dimension))
-    return total_circuit
+    return cached_fourier_transform_circuit (dimension).copy ()
 
 
 def cut_unused_parameters(circuit: pcvl.Circuit) -> pcvl.Circuit:
@@ -288,14 +358,14 @@ def cut_unused_parameters(circuit: pcvl.Circuit) -> pcvl.Circuit:
     last_items = []
 
     for d in depths:
-       print (circuit.getitem ((mode, d-1), False)) 
        last_item = circuit.getitem ((mode, d-1), False)
+       logger.debug ("Last item of mode %s: %s", mode, last_item)
        if isinstance (last_item, comp.unitary_components.PS) == True:
-            print ("Got one object to delete {}".format (last_item))
+            logger.debug ("Got one object to delete %s", last_item)
             last_items.append (last_item)
        mode = mode + 1
     
-    print ("Last items: {}".format(last_items))
+    logger.debug ("Last items: %s", last_items)
     
     parameters_to_delete = []
     for to_delete in last_items:    
@@ -343,17 +413,18 @@ def create_generic_circuit_with_circuit_cutting (number_of_modes: int) -> pcvl.C
     return cut_unused_parameters (circ)
 
 
-def generate_random_circuit (number_of_modes: int) -> pcvl.Circuit:
+def generate_random_circuit (number_of_modes: int, rng: Optional[np.random.Generator] = None) -> pcvl.Circuit:
     """
     Generate a random circuit.
 
     Parameters:
     number_of_modes (int): The number of modes.
+    rng (Optional[np.random.Generator]): The random generator to use. Defaults to a freshly seeded one.
 
     Returns:
     pcvl.Circuit: The resulting random circuit.
     """
-    unitary = pcvl.Matrix.random_unitary(number_of_modes) #creates a random unitary of dimension number_of_modes
+    unitary = pcvl.Matrix(random_unitaries(1, number_of_modes, rng)[0]) #creates a random unitary of dimension number_of_modes
     mzi = (pcvl.BS() // (0, pcvl.PS(phi=pcvl.Parameter("φ_a")))
        // pcvl.BS() // (1, pcvl.PS(phi=pcvl.Parameter("φ_b"))))
     circuit = pcvl.Circuit.decomposition(unitary, mzi,
@@ -372,21 +443,21 @@ def generate_random_circuit_cut_unused_parameters (number_of_modes: int) -> pcvl
     pcvl.Circuit: The resulting random circuit with unused parameters removed.
     """
     circuit = generate_random_circuit (number_of_modes)
-    print ("Random circuit: ", circuit.describe ())
+    logger.debug ("Random circuit: %s", lazy (circuit.describe))
     depths = circuit.depths()
     mode = 0
 
     last_items = []
 
     for d in depths:
-       print (circuit.getitem ((mode, d-1), False)) 
        last_item = circuit.getitem ((mode, d-1), False)
+       logger.debug ("Last item of mode %s: %s", mode, last_item)
        if isinstance (last_item, comp.unitary_components.PS) == True:
-            print ("Got one object to delete {}".format (last_item))
+            logger.debug ("Got one object to delete %s", last_item)
             last_items.append (last_item)
        mode = mode + 1
     
-    print ("Last items: {}".format(last_items))
+    logger.debug ("Last items: %s", last_items)
     
     for to_delete in last_items:    
         for component_tuple in circuit._components:
@@ -395,42 +466,116 @@ def generate_random_circuit_cut_unused_parameters (number_of_modes: int) -> pcvl
         
     return circuit
 
-def extract_parameters_from_random_circuit(circuit: pcvl.Circuit) -> List[float]:
+def mzi_mesh_modes (number_of_modes: int) -> List[int]:
     """
-    Extract parameters from a random circuit.
+    Get the upper mode of every MZI of the triangular mesh, in the order Perceval decomposes a unitary into.
 
     Parameters:
-    circuit (pcvl.Circuit): The circuit to process.
+    number_of_modes (int): The number of modes.
 
     Returns:
-    List[float]: The extracted parameters.
+    List[int]: The upper mode of each MZI, the MZI acting on that mode and the next one.
     """
-    s = circuit.describe ()
-    
-    #logging.info ("Circuit to be dealt with:", s)
-    pattern = r'phi=([+-]?\d+\.\d+)'
-    matches = re.findall (pattern ,s)
+    return [mode for diagonal in range (1, number_of_modes) for mode in range (diagonal - 1, -1, -1)]
+
+def sample_mzi_phases (number_of_modes: int, rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sample the phases of a triangular MZI mesh from the distribution induced by the Haar measure.
+
+    The MZI acting on modes (k, k+1) has a reflectivity sin^2(theta/2) distributed as 1 - xi^(1/(k+1)),
+    with xi uniform in [0, 1], while every external phase is uniform in [0, 2 pi).
+
+    Parameters:
+    number_of_modes (int): The number of modes.
+    rng (Optional[np.random.Generator]): The random generator to use. Defaults to a freshly seeded one.
+
+    Returns:
+    Tuple[np.ndarray, np.ndarray]: The internal and the external phase of each MZI, in mesh order.
+    """
+    if rng is None:
+        rng = np.random.default_rng ()
+
+    modes = np.array (mzi_mesh_modes (number_of_modes), dtype=float)
+    reflectivities = 1 - rng.random (len (modes)) ** (1 / (modes + 1))
+    internal = 2 * np.arcsin (np.sqrt (reflectivities))
+    external = rng.uniform (0, 2 * np.pi, len (modes))
+    return internal, external
+
+def create_mzi_mesh_circuit (number_of_modes: int, internal: List[float], external: List[float], cut_unused_parameters: bool = True) -> pcvl.Circuit:
+    """
+    Create a triangular MZI mesh with the given phases.
+
+    Parameters:
+    number_of_modes (int): The number of modes.
+    internal (List[float]): The internal phase of each MZI, in mesh order.
+    external (List[float]): The external phase of each MZI, in mesh order.
+    cut_unused_parameters (bool): If True the external phases of the last diagonal, which only act on the output, are left out.
 
-    return [float (match) for match in matches]
+    Returns:
+    pcvl.Circuit: The resulting circuit.
+    """
+    modes = mzi_mesh_modes (number_of_modes)
+    last_diagonal = len (modes) - (number_of_modes - 1)
 
-def generate_parameters_from_random_circuit (number_of_modes: int) -> List[float]:
+    circuit = pcvl.Circuit (number_of_modes)
+    for i, mode in enumerate (modes):
+        circuit.add ((mode, mode + 1), pcvl.BS ()).add (mode, pcvl.PS (float (internal [i]))).add ((mode, mode + 1), pcvl.BS ())
+        if not cut_unused_parameters or i < last_diagonal:
+            circuit.add (mode + 1, pcvl.PS (float (external [i])))
+    return circuit
+
+def generate_haar_random_mzi_circuit (number_of_modes: int, rng: Optional[np.random.Generator] = None) -> pcvl.Circuit:
     """
-    Generate parameters from a random circuit.
+    Generate a triangular MZI mesh whose unitary is Haar random up to input and output phases, without decomposing a unitary.
 
     Parameters:
     number_of_modes (int): The number of modes.
+    rng (Optional[np.random.Generator]): The random generator to use. Defaults to a freshly seeded one.
+
+    Returns:
+    pcvl.Circuit: The resulting random circuit.
+    """
+    internal, external = sample_mzi_phases (number_of_modes, rng)
+    return create_mzi_mesh_circuit (number_of_modes, internal, external)
+
+def extract_parameters_from_random_circuit(circuit: pcvl.Circuit) -> List[float]:
+    """
+    Extract the phases of the phase shifters of a circuit.
+
+    Parameters:
+    circuit (pcvl.Circuit): The circuit to process.
 
     Returns:
-    List[float]: The generated parameters.
+    List[float]: The extracted parameters, in circuit order. Phases that are unset variables are skipped.
     """
     parameters = []
+    for _, component in circuit:
+        if isinstance (component, comp.unitary_components.PS):
+            phase = component.param ("phi")
+            if phase.defined:
+                parameters.append (float (phase))
+    return parameters
 
-    while len (parameters)!=9:
-        circuit = generate_random_circuit_cut_unused_parameters (number_of_modes)
-        print ("The circuit: ", circuit.describe ())
-        parameters = extract_parameters_from_random_circuit (circuit)
-    
-    return parameters 
+def generate_parameters_from_random_circuit (number_of_modes: int, rng: Optional[np.random.Generator] = None) -> List[float]:
+    """
+    Generate the (number_of_modes - 1)^2 phases of a Haar random triangular MZI mesh with its output phases cut.
+
+    Parameters:
+    number_of_modes (int): The number of modes.
+    rng (Optional[np.random.Generator]): The random generator to use. Defaults to a freshly seeded one.
+
+    Returns:
+    List[float]: The generated parameters, in circuit order.
+    """
+    internal, external = sample_mzi_phases (number_of_modes, rng)
+    last_diagonal = len (internal) - (number_of_modes - 1)
+
+    parameters = []
+    for i in range (len (internal)):
+        parameters.append (float (internal [i]))
+        if i < last_diagonal:
+            parameters.append (float (external [i]))
+    return parameters
 
 def randomize_parameters_from_perceval_circuit(circuit: pcvl.Circuit, max_round: int = -1) -> List[float]:
     """
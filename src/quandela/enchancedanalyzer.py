@@ -1,7 +1,11 @@
 import perceval as pcvl
 from perceval.algorithm.analyzer import Analyzer
 import numpy as np
-import logging
+
+from base.instrumentation import PROFILER
+from base.logger import get_logger
+
+logger = get_logger (__name__)
 
 # An extension of the analyzer by quandela, 
 # because it doesn't do what I need it to do.
@@ -9,22 +13,35 @@ class EnhancedAnalyzer(Analyzer):
 	
     # Reimplementation of the method compute
     def compute(self, normalize=False, expected=None, progress_callback=None):
-        logging.debug ("[Enhanced analyzer -> compute ()] Calculating distributions for input states using permanents")
+        logger.debug ("[Enhanced analyzer -> compute ()] Calculating distributions for input states using permanents")
+        probs_res, logical_perf = self.compute_probabilities (progress_callback)
+        with PROFILER.span ("distribution assembly"):
+            return self.assemble_distribution (probs_res, logical_perf, normalize, expected)
+
+    def compute_probabilities(self, progress_callback=None):
+        """
+        Compute the output distribution of every input state.
+
+        Parameters:
+        progress_callback (Optional[Callable[[float], None]]): Called with the fraction of the input states done.
+
+        Returns:
+        Tuple[Dict[Any, Dict[Any, float]], List[float]]: The probability of each output state of each input state, and the logical performance of each input state.
+        """
         probs_res = {}
         logical_perf = []
-        if expected is not None:
-            normalize = True
-            self.error_rate = 0
 
         # Compute probabilities for all input states
         for idx, i_state in enumerate(self.input_states_list):
-            logging.debug ("[Enhanced analyzer -> compute ()] For input state: {}".format (i_state))
+            logger.debug ("[Enhanced analyzer -> compute ()] For input state: %s", i_state)
             self._processor.with_input(i_state)
             job = self._sampler.probs
             job.name = f'{self.default_job_name} {idx+1}/{len(self.input_states_list)}'
-            probs_output = job.execute_sync()
+            with PROFILER.span ("probabilities", input_state=str (i_state)):
+                probs_output = job.execute_sync()
+            PROFILER.count ("input states")
             probs = probs_output['results']
-            logging.debug ("[Enhanced analyzer -> compute ()] ,the output distribution is {}".format (probs))
+            logger.debug ("[Enhanced analyzer -> compute ()] ,the output distribution is %s", probs)
             probs_res[i_state] = probs
             if 'logical_perf' in probs_output:
                 logical_perf.append(probs_output['logical_perf'])
@@ -32,38 +49,92 @@ class EnhancedAnalyzer(Analyzer):
                 logical_perf.append(1)
             if progress_callback is not None:
                 progress_callback((idx+1)/len(self.input_states_list))
+        return probs_res, logical_perf
+
+    def expected_output(self, i_state, expected):
+        """
+        Find the output state expected for an input state, through the mapping if the expectation is a label.
+
+        Parameters:
+        i_state (pcvl.BasicState): The input state.
+        expected (Dict[Any, Any]): The expected output, or its label, of each input state or of its label.
+
+        Returns:
+        pcvl.BasicState: The expected output state.
+        """
+        expected_o = None
+        if i_state in expected:
+            expected_o = expected[i_state]
+        elif i_state in self._mapping and self._mapping[i_state] in expected:
+            expected_o = expected[self._mapping[i_state]]
+        if not isinstance(expected_o, pcvl.BasicState):
+            for k, v in self._mapping.items():
+                if v == expected_o:
+                    expected_o = k
+                    break
+        if expected_o is None:
+            raise ValueError("No expected output state for the input state {}.".format (i_state))
+        return expected_o
 
-        # Create a distribution matrix and compute performance / error rate if needed
-        probs_ = list(probs_res.values ())[0]
-        self._distribution = np.zeros((len(self.input_states_list), len(probs_)))
+    def assemble_distribution(self, probs_res, logical_perf, normalize=False, expected=None):
+        """
+        Build the distribution matrix of the input states over the output states, and its performance and error rate.
+
+        The columns are the output states of every input state, in the order they first appear, so
+        inputs with different output supports stay aligned: each output state has one column, and
+        an output state an input does not produce has probability 0 in its row. The probabilities of
+        each input are scattered into the matrix at once, and the normalization and the error rate
+        are computed on the whole matrix.
+
+        Parameters:
+        probs_res (Dict[Any, Dict[Any, float]]): The probability of each output state of each input state.
+        logical_perf (List[float]): The logical performance of each input state.
+        normalize (bool): Normalize the distribution of each input state. Always done when expected is given.
+        expected (Optional[Dict[Any, Any]]): The expected output of each input state, to compute the error rate and the fidelity.
+
+        Returns:
+        Dict[str, Any]: The distribution ('results'), the input and output states, the performance and, with expected, the error rate and fidelity.
+        """
+        # One column per output state, shared by all the input states
+        output_index = {}
+        rows, columns, values = [], [], []
         for iidx, i_state in enumerate(self.input_states_list):
-            sum_p = 0
-            for oidx, o_state in enumerate(probs_):
-                self._distribution[iidx, oidx] = probs_res[i_state][o_state]
-                sum_p += probs_res[i_state][o_state]
-            
-            if expected is not None:
-                if i_state in expected:
-                    expected_o = expected[i_state]
-                elif i_state in self._mapping and self._mapping[i_state] in expected:
-                    expected_o = expected[self._mapping[i_state]]
-                if not isinstance(expected_o, pcvl.BasicState):
-                    for k, v in self._mapping.items():
-                        if v == expected_o:
-                            expected_o = k
-                            break
-                if sum_p > 0:
-                    self.error_rate += 1 - self._distribution[iidx, self.output_states_list.index(expected_o)]/sum_p
-            if normalize and sum_p != 0:
-                self._distribution[iidx, :] /= sum_p
-                
+            probs = probs_res[i_state]
+            for o_state in probs:
+                if o_state not in output_index:
+                    output_index[o_state] = len (output_index)
+            columns.append (np.fromiter ((output_index[o_state] for o_state in probs), dtype=np.intp, count=len (probs)))
+            values.append (np.fromiter (probs.values (), dtype=float, count=len (probs)))
+            rows.append (np.full (len (probs), iidx, dtype=np.intp))
+
+        self._distribution = np.zeros((len(self.input_states_list), len(output_index)))
+        if rows:
+            self._distribution[np.concatenate (rows), np.concatenate (columns)] = np.concatenate (values)
+        output_states = list (output_index)
+        self.output_states_list = output_states
+        sums = self._distribution.sum (axis=1)
+        produced = sums > 0
+
+        if expected is not None:
+            normalize = True
+            expected_columns = np.array ([output_index.get (self.expected_output (i_state, expected), -1) for i_state in self.input_states_list],
+                                         dtype=np.intp)
+            # An expected output never produced has probability 0
+            expected_probs = np.where (expected_columns >= 0,
+                                       self._distribution[np.arange (len (expected_columns)), np.maximum (expected_columns, 0)], 0)
+            errors = np.zeros (len (sums))
+            errors[produced] = 1 - expected_probs[produced] / sums[produced]
+            self.error_rate = float (errors.sum ()) / len(self.input_states_list)
+
+        if normalize:
+            self._distribution[produced] /= sums[produced, np.newaxis]
+
         self.performance = min(logical_perf)
         output = {'results': self._distribution, 'input_states': self.input_states_list,
-                  'output_states': list (probs_.keys()), 'performance': self.performance}
+                  'output_states': output_states, 'performance': self.performance}
         if expected is not None:
-            self.error_rate /= len(self.input_states_list)
             output['error_rate'] = self.error_rate
             self.fidelity = 1 - self.error_rate
             output['fidelity'] = self.fidelity
-        
+
         return output
\ No newline at end of file
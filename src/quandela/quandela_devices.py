@@ -1,14 +1,21 @@
+from collections import OrderedDict
 from enum import Enum
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import perceval as pcvl
 
 from base import AbstractCircuit
 
 from base.devices import Device, DeviceFactory, DeviceMode
+from base.instrumentation import PROFILER
 from base.results import StatesAndProbabilities
+from base.state_generation_helpers import state_to_list
 from quandela.enchancedanalyzer import EnhancedAnalyzer
 from quandela.circuit_helpers import approximate_with_MZ
+from quandela.backend_selection import BackendRecommendations, BackendSelector
+from base.logger import get_logger
+
+logger = get_logger (__name__)
 
 class QuandelaLocalDevices (Enum):
     NAIVE = "Naive"
@@ -16,6 +23,7 @@ class QuandelaLocalDevices (Enum):
     STEP = "Stepper"
     MPS = "MPS"
     CLIFFORD = "CliffordClifford2017"
+    AUTO = "auto"
 
 class QuandelaRemoteDevices (Enum):
     QPU_ASCELLA = "qpu:ascella"
@@ -26,6 +34,31 @@ class QuandelaDeviceFactory (DeviceFactory):
     """
     Factory class for creating Quandela devices and processors.
     """
+    def __init__ (self, recommendations: Optional[BackendRecommendations] = None):
+        """
+        Initialize the factory.
+
+        Parameters:
+        recommendations (Optional[BackendRecommendations]): The table of the fastest accurate local backend per workload, as written by the backend benchmark.
+        """
+        self.recommendations = recommendations
+
+    def recommend_local_backend (self, number_of_photons: int, number_of_modes: int, mode: DeviceMode) -> Optional[str]:
+        """
+        Look up the recommended local backend of a workload in the recommendation table.
+
+        Parameters:
+        number_of_photons (int): The number of photons.
+        number_of_modes (int): The number of modes.
+        mode (DeviceMode): The mode of the device.
+
+        Returns:
+        Optional[str]: The name of the local processor, or None if there is no table or no recommendation for the device mode.
+        """
+        if self.recommendations is None:
+            return None
+        return self.recommendations.recommend (number_of_photons, number_of_modes, mode)
+
     def create_local_processor (self, name: str) -> pcvl.Processor:
         """
         Create a local processor with the given name.
@@ -71,25 +104,49 @@ class QuandelaDeviceFactory (DeviceFactory):
         """
         return QuandelaDevice (self.create_remote_processor (name, token), str (mode))
 
+    def create_backend_selector (self) -> BackendSelector:
+        """
+        Create the selector used by the "auto" local backend, restricted to the backends Perceval provides.
+
+        Returns:
+        BackendSelector: The selector.
+        """
+        from perceval.backends import BACKEND_LIST
+        return BackendSelector (self.recommendations, BACKEND_LIST.keys ())
+
     def create_local_device (self, name: str, mode: DeviceMode) -> Device:
         """
         Create a local device with the given name and mode.
 
         Parameters:
-        name (str): The name of the local processor.
+        name (str): The name of the local processor, or "auto" to choose the backend of each experiment from its size.
         mode (str): The mode of the device.
 
         Returns:
         QuandelaDevice: The created local device.
         """   
+        if name == QuandelaLocalDevices.AUTO.value:
+            return AutoQuandelaDevice (self.create_backend_selector (), mode)
         return QuandelaDevice (self.create_local_processor (name), mode)
 
 class QuandelaDevice (Device):
 
+    # Decompositions of abstract circuits into MZI meshes, keyed by circuit fingerprint and shared by the devices of the process.
+    # At most maximum_decompositions are kept, the least recently used one being evicted first.
+    decompositions: 'OrderedDict[str, pcvl.Circuit]' = OrderedDict ()
+    maximum_decompositions = 256
+
+    @classmethod
+    def clear_decompositions (cls) -> None:
+        """
+        Forget the cached decompositions of the circuits.
+        """
+        cls.decompositions.clear ()
+
     @staticmethod
     def abstract_circuit_to_quandela_circuit (circuit: AbstractCircuit) -> pcvl.Circuit:
         """
-        Convert an AbstractCircuit to a Quandela Circuit.
+        Convert an AbstractCircuit to a Quandela Circuit, reusing the decomposition of a circuit with the same fingerprint.
 
         Parameters:
         circuit (AbstractCircuit): The abstract circuit to convert.
@@ -97,7 +154,20 @@ class QuandelaDevice (Device):
         Returns:
         pcvl.Circuit: The corresponding Quandela circuit.
         """
-        return approximate_with_MZ (circuit.m)
+        if not isinstance (circuit, AbstractCircuit):
+            return approximate_with_MZ (circuit.m)
+
+        decompositions = QuandelaDevice.decompositions
+        fingerprint = circuit.fingerprint ()
+        if fingerprint not in decompositions:
+            PROFILER.count ("decompositions")
+            decompositions [fingerprint] = approximate_with_MZ (circuit.m)
+            while len (decompositions) > QuandelaDevice.maximum_decompositions:
+                decompositions.popitem (last=False)
+        else:
+            PROFILER.count ("decomposition cache hits")
+            decompositions.move_to_end (fingerprint)
+        return decompositions [fingerprint].copy ()
     
     @staticmethod
     def quandela_circuit_to_abstract_circuit (circuit: pcvl.Circuit) -> AbstractCircuit:
@@ -133,7 +203,9 @@ class QuandelaDevice (Device):
         Parameters:
         input_state (str): The initial state to set (e.g., '|1,1>').
         """
-        self.processor.with_input(pcvl.BasicState(input_state))
+        with PROFILER.span ("state parsing"):
+            state = pcvl.BasicState (input_state)
+        self.processor.with_input(state)
         
     def set_circuit(self, circuit: AbstractCircuit) -> None:
         """
@@ -142,7 +214,9 @@ class QuandelaDevice (Device):
         Parameters:
         circuit (AbstractCircuit): The abstract circuit to set.
         """
-        self.processor.set_circuit (QuandelaDevice.abstract_circuit_to_quandela_circuit (circuit))
+        with PROFILER.span ("decomposition"):
+            quandela_circuit = QuandelaDevice.abstract_circuit_to_quandela_circuit (circuit)
+        self.processor.set_circuit (quandela_circuit)
     
     def fill_results (self, job_results: Dict[str, Any]) -> StatesAndProbabilities:
         """
@@ -170,6 +244,7 @@ class QuandelaDevice (Device):
             for index, i in enumerate (job_results ['output_states']):
                  return_results.set_probability (str (i), job_results ['results'][0][index])   
 
+        PROFILER.count ("output states", len (return_results.get_probability_states ()))
         return return_results
      
     def execute_experiment_(self) -> StatesAndProbabilities:
@@ -180,14 +255,18 @@ class QuandelaDevice (Device):
         StatesAndProbabilities: The results of the experiment.
         """
         if self.mode == DeviceMode.SAMPLER:
-            # First it is necessary to create a sampler using the processor
-            sampler = pcvl.algorithm.Sampler(self.processor)
-            # Sampler exposes 'sample_count' returning a dictionary {state: count}
-            job = sampler.sample_count(self.number_of_samples)
-            return self.fill_results (job ['results'])
+            with PROFILER.span ("simulation", mode=self.mode.value, samples=self.number_of_samples):
+                # First it is necessary to create a sampler using the processor
+                sampler = pcvl.algorithm.Sampler(self.processor)
+                # Sampler exposes 'sample_count' returning a dictionary {state: count}
+                job_results = sampler.sample_count(self.number_of_samples) ['results']
         else:
-            analyzer = EnhancedAnalyzer (self.processor, [pcvl.BasicState (self.processor.input_state)])
-            return self.fill_results (analyzer.compute ())    
+            with PROFILER.span ("simulation", mode=self.mode.value):
+                analyzer = EnhancedAnalyzer (self.processor, [pcvl.BasicState (self.processor.input_state)])
+                job_results = analyzer.compute ()
+
+        with PROFILER.span ("fill_results"):
+            return self.fill_results (job_results)
     
     def execute_experiment(self, initial_state: str, circuit: AbstractCircuit) -> StatesAndProbabilities:
         """
@@ -200,8 +279,76 @@ class QuandelaDevice (Device):
         Returns:
         StatesAndProbabilities: The results of the experiment.
         """
-        self.set_circuit (circuit)
-        self.set_initial_state (initial_state)
-        return self.execute_experiment_ ()
+        PROFILER.count ("experiments")
+        with PROFILER.span ("experiment", input_state=str (initial_state)):
+            self.set_circuit (circuit)
+            self.set_initial_state (initial_state)
+            return self.execute_experiment_ ()
     
 
+class AutoQuandelaDevice (QuandelaDevice):
+    """
+    A local device that picks the backend of each experiment from its workload.
+
+    The photon count and mode count of the input state, the device mode and the number of
+    samples are handed to a BackendSelector whenever the input state changes, and the
+    processor is rebuilt on the chosen backend when the choice changes.
+    """
+
+    def __init__ (self, selector: BackendSelector, mode: DeviceMode, number_of_samples: int = 1000):
+        """
+        Initialize the device.
+
+        Parameters:
+        selector (BackendSelector): The selector of the backends.
+        mode (DeviceMode): The mode of the device (SAMPLER or ANALYZER).
+        number_of_samples (int): The number of samples to use for the experiment. Default is 1000.
+        """
+        super().__init__ (None, mode, number_of_samples)
+        self.selector = selector
+        self.backend = None
+        self.quandela_circuit = None
+        self.workload = None
+
+    def set_circuit(self, circuit: AbstractCircuit) -> None:
+        """
+        Set the circuit for the device.
+
+        Parameters:
+        circuit (AbstractCircuit): The abstract circuit to set.
+        """
+        with PROFILER.span ("decomposition"):
+            self.quandela_circuit = QuandelaDevice.abstract_circuit_to_quandela_circuit (circuit)
+        if self.processor is not None:
+            self.processor.set_circuit (self.quandela_circuit)
+
+    def select_backend (self, input_state: str) -> None:
+        """
+        Choose the backend for an input state, rebuilding the processor if the choice changed.
+
+        Parameters:
+        input_state (str): The input state (e.g., '|1,1>').
+        """
+        occupations = state_to_list (input_state)
+        workload = (sum (occupations), len (occupations), self.mode, self.number_of_samples)
+        if workload == self.workload:
+            return
+        self.workload = workload
+
+        backend, reasoning = self.selector.select (*workload)
+        logger.info ("[Auto backend] %s -> %s", reasoning, backend)
+        if backend != self.backend:
+            self.backend = backend
+            self.processor = pcvl.Processor (backend)
+            if self.quandela_circuit is not None:
+                self.processor.set_circuit (self.quandela_circuit)
+
+    def set_initial_state(self, input_state: str) -> None:
+        """
+        Set the initial state of the device, choosing the backend for it first.
+
+        Parameters:
+        input_state (str): The initial state to set (e.g., '|1,1>').
+        """
+        self.select_backend (input_state)
+        super().set_initial_state (input_state)
@@ -1,13 +1,16 @@
 from typing import Any, Dict, List
 from base.abstract_circuit import AbstractCircuit
 from base.devices import Device
+from base.instrumentation import PROFILER
 from base.state_generation_helpers import generate_states_on_indexes
 from quandela.circuit_helpers import generate_identity
 from base.results import StatesAndProbabilities
 from tomography.tomography_probers import DeviceProcessTomographyProber
 
 from numpy import sort
-import logging
+from base.logger import get_logger, lazy
+
+logger = get_logger (__name__)
 
 class QuandelaProcessTomographyProber (DeviceProcessTomographyProber):
     """
@@ -107,7 +110,7 @@ class QuandelaProcessTomographyProber (DeviceProcessTomographyProber):
                 states [key] = (generate_states_on_indexes ([i, j], self.number_of_modes))
                 j = j + 1
             i = i + 1
-        logging.debug ("[Process Tomography prober] Double photon states {}".format (states))
+        logger.debug ("[Process Tomography prober] Double photon states %s", states)
         return states
 
     def define_single_photon_experiments(self) -> Dict[str, Any]:
@@ -122,7 +125,7 @@ class QuandelaProcessTomographyProber (DeviceProcessTomographyProber):
         while i < self.number_of_modes:
             states [str ([i])] = generate_states_on_indexes ([i], self.number_of_modes)
             i = i + 1
-        logging.debug ("[Process Tomography prober] Single photon states {}".format (states))
+        logger.debug ("[Process Tomography prober] Single photon states %s", states)
         return states
 
     def convert_states (self, states: StatesAndProbabilities):
@@ -145,9 +148,10 @@ class QuandelaProcessTomographyProber (DeviceProcessTomographyProber):
         """
         experiments_results = {}
         for state_index in states.keys ():
-            logging.debug ("[Process Tomography prober] Doing experiment for {}".format (state_index))
+            logger.debug ("[Process Tomography prober] Doing experiment for %s", state_index)
+            PROFILER.count ("tomography experiments")
             results = self.device.execute_experiment (states [state_index], self.some_circuit)
-            logging.debug ("[Process Tomography prober] Results {}".format (self.convert_states (results)))
+            logger.debug ("[Process Tomography prober] Results %s", lazy (self.convert_states, results))
             experiments_results [state_index] = self.convert_states (results)
         return experiments_results
 
@@ -187,11 +191,12 @@ class QuandelaProcessTomographyProber (DeviceProcessTomographyProber):
         Dict[str, Any]: The converted states.
         """
         new_states = {}
-        for key in states:
-            converted_results = {}
-            for output in states [key]:
-                converted_results [self.string_to_indexes (str (output))] = states [key][output]
-            new_states [key] = converted_results
+        with PROFILER.span ("state parsing"):
+            for key in states:
+                converted_results = {}
+                for output in states [key]:
+                    converted_results [self.string_to_indexes (str (output))] = states [key][output]
+                new_states [key] = converted_results
         return new_states
 
     def perform_single_photon_experiments(self) -> Dict[str, Any]:
@@ -228,5 +233,7 @@ class QuandelaProcessTomographyProber (DeviceProcessTomographyProber):
         """
         Perform the full set of experiments and fill the results.
         """
-        self.fill_results (self.perform_single_photon_experiments (), self.single_photon_experiments_results)
-        self.fill_results (self.perform_double_photon_experiments (), self.double_photon_experiments_results)
\ No newline at end of file
+        with PROFILER.span ("tomography experiments", photons=1):
+            self.fill_results (self.perform_single_photon_experiments (), self.single_photon_experiments_results)
+        with PROFILER.span ("tomography experiments", photons=2):
+            self.fill_results (self.perform_double_photon_experiments (), self.double_photon_experiments_results)
\ No newline at end of file
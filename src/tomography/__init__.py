@@ -1,4 +1,12 @@
-from .process_tomography_methods import *
-from .process_tomography_quandela import *
-from .tomography_probers import *
-from .estimating_overlaps import *
\ No newline at end of file
+# The submodules are only imported when one of their attributes is first read
+from base.lazy_imports import attach
+
+__getattr__, __dir__, __all__ = attach (__name__, {
+    "process_tomography_methods": ["ProcessTomographyMethod", "SuperStableMethod"],
+    "process_tomography_quandela": ["DeviceCharacterizer"],
+    "tomography_probers": ["DeviceProcessTomographyProber"],
+    "estimating_overlaps": ["GramMatrixFromVariance"],
+    "characterization_cache": ["CharacterizationRecord", "CharacterizationCache", "DriftProbe"],
+    "tomography_archive": ["SINGLE_PHOTON_PREFIX", "DOUBLE_PHOTON_PREFIX", "indexes_to_state", "tomography_results_to_sets",
+                           "save_tomography_results", "load_tomography_results"]
+})
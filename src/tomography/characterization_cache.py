@@ -0,0 +1,278 @@
+# Some licensing message
+#
+# This piece of code keeps reconstructed matrices around between characterizations, so that a
+# slowly drifting device is only fully characterized again when a cheap probe says so.
+#
+import os
+import time
+import numpy as np
+
+from typing import Dict, List, Optional
+
+from base.abstract_circuit import AbstractCircuit
+from base.devices import Device
+from base.state_generation_helpers import generate_states_on_indexes, state_to_list
+from base.logger import get_logger
+
+logger = get_logger (__name__)
+
+
+class CharacterizationRecord:
+
+    def __init__ (self, fingerprint: str, timestamp: float, original: np.ndarray, rebuilt: np.ndarray, distance: complex, taus: Optional[np.ndarray] = None):
+        """
+        Initialize a record of one full characterization of a circuit.
+
+        Parameters:
+        fingerprint (str): The fingerprint of the characterized circuit.
+        timestamp (float): The time (seconds since the epoch) at which the characterization finished.
+        original (np.ndarray): The unitary of the circuit that was characterized.
+        rebuilt (np.ndarray): The reconstructed matrix.
+        distance (complex): The distance between the original and the reconstructed matrices.
+        taus (Optional[np.ndarray]): The transmission amplitudes obtained from the single photon experiments.
+        """
+        self.fingerprint = fingerprint
+        self.timestamp = timestamp
+        self.original = original
+        self.rebuilt = rebuilt
+        self.distance = distance
+        self.taus = taus
+
+    def age (self, now: Optional[float] = None) -> float:
+        """
+        Get the age of the record.
+
+        Parameters:
+        now (Optional[float]): The reference time. Defaults to the current time.
+
+        Returns:
+        float: The age of the record in seconds.
+        """
+        if now is None:
+            now = time.time ()
+        return now - self.timestamp
+
+    def to_tuple (self):
+        """
+        Convert the record to the tuple returned by DeviceCharacterizer.characterize_device.
+
+        Returns:
+        Tuple[np.ndarray, np.ndarray, complex]: The original unitary, the reconstructed matrix and the distance.
+        """
+        return (self.original, self.rebuilt, self.distance)
+
+
+class CharacterizationCache:
+    """
+    A store of reconstructed matrices keyed by circuit fingerprint and timestamp.
+
+    When a directory is given every record is persisted there as an .npz file, so that
+    characterizations survive between certification runs.
+    """
+
+    @staticmethod
+    def fingerprint (circuit: AbstractCircuit, decimals: int = 8) -> str:
+        """
+        Compute the fingerprint used to key a circuit in the cache.
+
+        Parameters:
+        circuit (AbstractCircuit): The circuit to fingerprint.
+        decimals (int): The number of decimals the unitary is rounded to.
+
+        Returns:
+        str: The fingerprint of the circuit.
+        """
+        return circuit.fingerprint (decimals)
+
+    def __init__ (self, directory: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Parameters:
+        directory (Optional[str]): The directory where records are persisted. If None the cache only lives in memory.
+        """
+        self.directory = directory
+        self.records: Dict[str, List[CharacterizationRecord]] = {}
+
+        if directory is not None:
+            os.makedirs (directory, exist_ok=True)
+            self.load_records ()
+
+    def record_path (self, record: CharacterizationRecord) -> str:
+        """
+        Get the file where a record is persisted.
+
+        Parameters:
+        record (CharacterizationRecord): The record.
+
+        Returns:
+        str: The path of the record file.
+        """
+        return os.path.join (self.directory, "{}_{}.npz".format (record.fingerprint, int (record.timestamp * 1e6)))
+
+    def load_records (self) -> None:
+        """
+        Load every record persisted in the cache directory.
+        """
+        for file_name in sorted (os.listdir (self.directory)):
+            if not file_name.endswith (".npz"):
+                continue
+
+            with np.load (os.path.join (self.directory, file_name)) as data:
+                taus = data ["taus"] if "taus" in data else None
+                record = CharacterizationRecord (str (data ["fingerprint"]), float (data ["timestamp"]), data ["original"],
+                                                 data ["rebuilt"], complex (data ["distance"]), taus)
+            self.add_record (record)
+        logger.debug ("[Characterization cache] Loaded records for %s circuits", len (self.records))
+
+    def add_record (self, record: CharacterizationRecord) -> None:
+        """
+        Add a record to the in-memory index, keeping the records of each circuit ordered by timestamp.
+
+        Parameters:
+        record (CharacterizationRecord): The record to add.
+        """
+        records = self.records.setdefault (record.fingerprint, [])
+        records.append (record)
+        records.sort (key=lambda r: r.timestamp)
+
+    def store (self, circuit: AbstractCircuit, original: np.ndarray, rebuilt: np.ndarray, distance: complex,
+               taus: Optional[np.ndarray] = None, timestamp: Optional[float] = None) -> CharacterizationRecord:
+        """
+        Store the result of a full characterization.
+
+        Parameters:
+        circuit (AbstractCircuit): The characterized circuit.
+        original (np.ndarray): The unitary of the characterized circuit.
+        rebuilt (np.ndarray): The reconstructed matrix.
+        distance (complex): The distance between the original and the reconstructed matrices.
+        taus (Optional[np.ndarray]): The transmission amplitudes obtained from the single photon experiments.
+        timestamp (Optional[float]): The time of the characterization. Defaults to the current time.
+
+        Returns:
+        CharacterizationRecord: The stored record.
+        """
+        if timestamp is None:
+            timestamp = time.time ()
+
+        record = CharacterizationRecord (self.fingerprint (circuit), timestamp, np.array (original), np.array (rebuilt),
+                                         distance, None if taus is None or np.size (taus) == 0 else np.array (taus))
+        self.add_record (record)
+
+        if self.directory is not None:
+            arrays = {"fingerprint": record.fingerprint, "timestamp": record.timestamp, "original": record.original,
+                      "rebuilt": record.rebuilt, "distance": record.distance}
+            if record.taus is not None:
+                arrays ["taus"] = record.taus
+            np.savez (self.record_path (record), **arrays)
+
+        return record
+
+    def lookup (self, circuit: AbstractCircuit, max_age: Optional[float] = None) -> Optional[CharacterizationRecord]:
+        """
+        Get the most recent record for a circuit.
+
+        Parameters:
+        circuit (AbstractCircuit): The circuit to look up.
+        max_age (Optional[float]): The maximum age in seconds of an acceptable record. If None any age is accepted.
+
+        Returns:
+        Optional[CharacterizationRecord]: The most recent record, or None if there is no acceptable record.
+        """
+        records = self.records.get (self.fingerprint (circuit))
+        if not records:
+            return None
+
+        latest = records [-1]
+        if max_age is not None and latest.age () > max_age:
+            return None
+        return latest
+
+    def invalidate (self, circuit: AbstractCircuit) -> None:
+        """
+        Drop every record of a circuit, from memory and from disk.
+
+        Parameters:
+        circuit (AbstractCircuit): The circuit whose records are dropped.
+        """
+        for record in self.records.pop (self.fingerprint (circuit), []):
+            if self.directory is not None and os.path.exists (self.record_path (record)):
+                os.remove (self.record_path (record))
+
+
+class DriftProbe:
+    """
+    A cheap check of whether a cached characterization still describes the device.
+
+    A handful of single photon transmission experiments are compared against the squared
+    taus of the cached characterization, using the total variation distance between the
+    measured and the expected output distributions.
+    """
+
+    def __init__ (self, device: Device, number_of_modes: int, number_of_probes: int = 3, threshold: float = 0.1):
+        """
+        Initialize the probe.
+
+        Parameters:
+        device (Device): The device used to run the transmission experiments.
+        number_of_modes (int): The number of modes of the device.
+        number_of_probes (int): The number of input modes that are probed.
+        threshold (float): The largest total variation distance that is still considered as no drift.
+        """
+        self.device = device
+        self.number_of_modes = number_of_modes
+        self.probed_modes = list (range (min (number_of_probes, number_of_modes)))
+        self.threshold = threshold
+        self.last_distance = None
+
+    def measure_transmissions (self, circuit: AbstractCircuit) -> np.ndarray:
+        """
+        Measure the output distribution of a single photon injected in each probed mode.
+
+        Parameters:
+        circuit (AbstractCircuit): The circuit to probe.
+
+        Returns:
+        np.ndarray: A (probes x modes) matrix whose rows are the measured output distributions.
+        """
+        transmissions = np.zeros ((len (self.probed_modes), self.number_of_modes))
+        for row, mode in enumerate (self.probed_modes):
+            results = self.device.execute_experiment (generate_states_on_indexes ([mode], self.number_of_modes), circuit)
+            for state in results.get_probability_states ():
+                transmissions [row] += np.array (state_to_list (state)) * results.get_probability (state)
+        return transmissions
+
+    def calculate_drift (self, circuit: AbstractCircuit, taus: np.ndarray) -> float:
+        """
+        Calculate the drift of the device with respect to a cached characterization.
+
+        Parameters:
+        circuit (AbstractCircuit): The circuit to probe.
+        taus (np.ndarray): The cached transmission amplitudes, indexed by [input][output].
+
+        Returns:
+        float: The largest total variation distance over the probed modes.
+        """
+        expected = np.abs (np.asarray (taus) [self.probed_modes]) ** 2
+        expected /= np.sum (expected, axis=1, keepdims=True)
+        measured = self.measure_transmissions (circuit)
+        measured /= np.maximum (np.sum (measured, axis=1, keepdims=True), np.finfo (float).tiny)
+
+        self.last_distance = float (np.max (0.5 * np.sum (np.abs (measured - expected), axis=1)))
+        logger.debug ("[Drift probe] Total variation distance %s", self.last_distance)
+        return self.last_distance
+
+    def has_drifted (self, circuit: AbstractCircuit, taus: Optional[np.ndarray]) -> bool:
+        """
+        Check whether the device drifted away from a cached characterization.
+
+        Parameters:
+        circuit (AbstractCircuit): The circuit to probe.
+        taus (Optional[np.ndarray]): The cached transmission amplitudes. If None the drift cannot be assessed.
+
+        Returns:
+        bool: True if a full characterization is needed, False if the cached one can be reused.
+        """
+        if taus is None:
+            return True
+        return self.calculate_drift (circuit, taus) > self.threshold
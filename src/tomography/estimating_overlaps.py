@@ -1,21 +1,89 @@
-import itertools
 import functools
 import numpy as np
-import perceval as pcvl
 
-from typing import List, Dict, Tuple
+from typing import Any, List, Dict, Optional, Tuple
 
-from base.abstract_circuit import AbstractCircuit
+from base.circuit_helpers import generate_random_abstract_circuit_stack, random_unitaries
+from base.circuit_stack import AbstractCircuitStack
 from photonic_indistinguishability_measures.variance import Variance
-from quandela.circuit_helpers import generate_random_circuit
 from tomography.process_tomography_quandela import DeviceCharacterizer
+from base.logger import get_logger, lazy
+
+logger = get_logger (__name__)
 
 class GramMatrixFromVariance:
 
-    def __init__ (self, variance_calculator: Variance, device_characterizer: DeviceCharacterizer):
+    def __init__ (self, variance_calculator: Optional[Variance] = None, device_characterizer: Optional[DeviceCharacterizer] = None):
         self.variance_calculator = variance_calculator
         self.device_characterizer = device_characterizer
     
+    @staticmethod
+    @functools.lru_cache (maxsize=None)
+    def upper_triangle_indices(n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the row and column indexes of the strict upper triangle of a n x n matrix.
+        The k-th pair is the pair (a, b), a < b, whose overlap is the k-th unknown of the system.
+
+        Parameters:
+        n (int): The dimension of the matrix.
+
+        Returns:
+        Tuple[np.ndarray, np.ndarray]: The row indexes and the column indexes.
+        """
+        rows, columns = np.triu_indices (n, k=1)
+        rows.setflags (write=False)
+        columns.setflags (write=False)
+        return rows, columns
+
+    @staticmethod
+    def squared_moduli(matrices: Any, n: int) -> np.ndarray:
+        """
+        Get |U|^2 for a stack of matrices.
+
+        Parameters:
+        matrices (Any): A matrix or a sequence of matrices, at least n x n.
+        n (int): The dimension of the matrices.
+
+        Returns:
+        np.ndarray: A (k x n x n) array with the squared moduli of the entries of each matrix.
+        """
+        matrices = np.asarray (matrices)
+        if matrices.ndim == 2:
+            matrices = matrices [np.newaxis]
+        return np.abs (matrices [:, :n, :n]) ** 2
+
+    def calculate_coefficient_rows(self, matrices: Any, n: int) -> np.ndarray:
+        """
+        Calculate the coefficients of the overlaps for a stack of characterized matrices.
+
+        Parameters:
+        matrices (Any): A sequence of k characterized matrices.
+        n (int): The dimension of the matrices.
+
+        Returns:
+        np.ndarray: A (k x n(n-1)/2) array; row i holds the coefficients of the equation for the i-th matrix.
+        """
+        squared = self.squared_moduli (matrices, n)
+        products = np.einsum ('kia,kib->kab', squared, squared)
+        rows, columns = self.upper_triangle_indices (n)
+        # The coefficients of (a, b) and (b, a) are equal and both multiply the same unknown
+        return (2 / n) * products [:, rows, columns]
+
+    def calculate_right_hand_sides(self, matrices: Any, expected_variances: Any, n: int) -> np.ndarray:
+        """
+        Calculate the independent terms of the equations for a stack of characterized matrices.
+
+        Parameters:
+        matrices (Any): A sequence of k characterized matrices.
+        expected_variances (Any): The k expected variances measured with each matrix.
+        n (int): The dimension of the matrices.
+
+        Returns:
+        np.ndarray: The k independent terms.
+        """
+        squared = self.squared_moduli (matrices, n)
+        return np.asarray (expected_variances, dtype=float) - 1 + (1/n) * np.sum (squared ** 2, axis=(1, 2))
+
     # Including our own helpers
     def sum_all(self, matrix: List[List[complex]], expected_variance: float, n: int) -> float:
         """
@@ -29,9 +97,7 @@ class GramMatrixFromVariance:
         Returns:
         float: The transformed sum.
         """
-        sum_4 = self.sum_all_4(matrix, n)
-        #print ("Sum 4: ", sum_4)
-        return expected_variance - 1 + 1/n * sum_4
+        return float (self.calculate_right_hand_sides (matrix, [expected_variance], n) [0])
 
     def sum_all_4(self, matrix: List[List[complex]], n: int) -> float:
         """
@@ -44,11 +110,7 @@ class GramMatrixFromVariance:
         Returns:
         float: The sum of the fourth powers.
         """
-        sum_4 = 0
-        for i in range (0, n):
-            for j in range (0, n):
-                sum_4 += abs(matrix [i][j])**4
-        return sum_4
+        return float (np.sum (self.squared_moduli (matrix, n) ** 2))
 
     def calculate_variable_coefficients(self, matrix: List[List[complex]], n: int) -> Dict[Tuple[int, int], float]:
         """
@@ -62,18 +124,9 @@ class GramMatrixFromVariance:
         Returns:
         Dict[Tuple[int, int], float]: A dictionary of variable coefficients.
         """
-        results = {}
-        for j in itertools.product (range (0, n), repeat = 2):
-            (a, b) = j
-            if (a != b):
-                coeficient = (1/n * functools.reduce (lambda x, y: x+y, [abs (matrix [i][a])**2 * abs (matrix [i][b])**2 for i in range (0, n)]))   
-                if b > a:
-                    results [(a, b)] = coeficient
-                else:
-                    results [(b, a)] += coeficient
-           
-        #print ("Coeficients: ",  results)
-        return results
+        rows, columns = self.upper_triangle_indices (n)
+        coefficients = self.calculate_coefficient_rows (matrix, n) [0]
+        return dict (zip (zip (rows.tolist (), columns.tolist ()), coefficients.tolist ()))
 
     def to_vector(self, var_map: Dict[Tuple[int, int], float], n: int) -> List[float]:
         """
@@ -86,20 +139,15 @@ class GramMatrixFromVariance:
         Returns:
         List[float]: The vector of coefficients.
         """
-        var_number = ((n * (n-1)) // 2) 
-        vars = [0 for _ in range (var_number)]
-        
-        for i in var_map:
-            (l,c) = i
-            start_point = sum([n-(d+1) for d in range (l)])
-            #print ("Start point: ", start_point)
-            # pos = l * (n-1) + (c-(l+1))
-            pos = start_point + (c-(l+1))
-            #print ("Pos: ", pos) 
-            vars [pos] = var_map [i]
-    
-        #print (vars)
-        return vars
+        packed_indexes = np.zeros ((n, n), dtype=int)
+        rows, columns = self.upper_triangle_indices (n)
+        packed_indexes [rows, columns] = np.arange (len (rows))
+
+        vars = np.zeros (len (rows))
+        if var_map:
+            pairs = np.array (list (var_map.keys ()))
+            vars [packed_indexes [pairs [:, 0], pairs [:, 1]]] = list (var_map.values ())
+        return vars.tolist ()
 
     # This function solves equations about expected variance of the form A.X = B
     def find_overlaps(self, matrices_variance_pairs: List[Tuple[List[List[complex]], float]], n: int) -> List[float]:
@@ -113,18 +161,18 @@ class GramMatrixFromVariance:
         Returns:
         List[float]: The solution vector X.
         """
-        print ("Matrices: " + str (matrices_variance_pairs))
+        logger.debug ("Matrices: %s", matrices_variance_pairs)
         A, B = self.transform_into_equational_system (matrices_variance_pairs, n)
             
         A_numpy = np.array (A)
         B_numpy = np.array (B)
 
-        print ("A: ", A_numpy)
-        print ("B: ", B_numpy)
+        logger.debug ("A: %s", A_numpy)
+        logger.debug ("B: %s", B_numpy)
         
         det = np.linalg.det (A_numpy)
-        print ("Determinant: ", )
-        print ("Condition number: ", np.linalg.cond (A))
+        logger.debug ("Determinant: %s", det)
+        logger.debug ("Condition number: %s", lazy (np.linalg.cond, A_numpy))
         
         if det != 0:
             X = np.linalg.solve (A_numpy, B_numpy)
@@ -133,15 +181,147 @@ class GramMatrixFromVariance:
             raise Exception ("Indeterminate system")
       
     def transform_into_equational_system(self, matrices_variance_pairs, n):
-        A = []
-        B = []
-        
-        for i in matrices_variance_pairs:
-            B.append (self.sum_all (i [0], i [1], n))
-            A.append (self.to_vector (self.calculate_variable_coefficients (i [0], n),n))
-       
+        matrices = [pair [0] for pair in matrices_variance_pairs]
+        expected_variances = [pair [1] for pair in matrices_variance_pairs]
+
+        A = self.calculate_coefficient_rows (matrices, n)
+        B = self.calculate_right_hand_sides (matrices, expected_variances, n)
         return A,B
 
+    def find_overlaps_weighted_least_squares(self, matrices_variance_pairs: List[Tuple[List[List[complex]], float]], n: int,
+                                             variances_of_expected_variances: Optional[List[float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Solve the (possibly overdetermined) system A.X = B by weighted least squares to find the overlaps.
+
+        Parameters:
+        matrices_variance_pairs (List[Tuple[List[List[float]], float]]): A list of matrices and their expected variances.
+        n (int): The dimension of the matrices.
+        variances_of_expected_variances (Optional[List[float]]): The variance of each measured expected variance, used as inverse weights.
+                                                                  If None every equation has the same weight and the noise level is
+                                                                  estimated from the residuals.
+
+        Returns:
+        Tuple[np.ndarray, np.ndarray]: The overlaps and their covariance matrix.
+        """
+        A, B = self.transform_into_equational_system (matrices_variance_pairs, n)
+        number_of_equations, number_of_unknowns = A.shape
+
+        if np.linalg.matrix_rank (A) < number_of_unknowns:
+            raise Exception ("Indeterminate system")
+
+        if variances_of_expected_variances is None:
+            weights = np.ones (number_of_equations)
+        else:
+            variances = np.asarray (variances_of_expected_variances, dtype=float)
+            positive = variances [variances > 0]
+            if len (positive) == 0:
+                weights = np.ones (number_of_equations)
+            else:
+                # Exact (noiseless) equations get the weight of the most precise noisy one
+                weights = 1 / np.where (variances > 0, variances, np.min (positive))
+
+        sqrt_weights = np.sqrt (weights)
+        X, _, _, _ = np.linalg.lstsq (A * sqrt_weights [:, np.newaxis], B * sqrt_weights, rcond=None)
+        covariance = np.linalg.inv ((A.T * weights) @ A)
+
+        if variances_of_expected_variances is None:
+            degrees_of_freedom = number_of_equations - number_of_unknowns
+            residuals = B - A @ X
+            covariance *= (residuals @ residuals) / degrees_of_freedom if degrees_of_freedom > 0 else np.nan
+        elif len (positive) == 0:
+            # Only exact expected variances, as an analyzer gives them: the overlaps are exact too
+            covariance = np.zeros_like (covariance)
+
+        logger.debug ("[Overlaps estimation] Condition number %s", lazy (np.linalg.cond, A * sqrt_weights [:, np.newaxis]))
+        return X, covariance
+
+    def calculate_condition_number(self, matrices: Any, n: int) -> float:
+        """
+        Calculate the condition number of the system built from a set of interferometers.
+
+        Parameters:
+        matrices (Any): A sequence of interferometer matrices.
+        n (int): The dimension of the matrices.
+
+        Returns:
+        float: The condition number of the coefficient matrix.
+        """
+        return float (np.linalg.cond (self.calculate_coefficient_rows (matrices, n)))
+
+    def select_preparations(self, candidates: Any, number_of_preparations: int, n: int, regularization: float = 1e-9) -> List[int]:
+        """
+        Select, from a pool of candidate interferometers, the ones giving the best conditioned system.
+        The selection is greedy on the determinant of A^T.A, followed by one exchange pass that swaps a
+        selected interferometer for a candidate whenever it lowers the condition number.
+
+        Parameters:
+        candidates (Any): A sequence of candidate interferometer matrices.
+        number_of_preparations (int): The number of interferometers to select, at least n(n-1)/2.
+        n (int): The dimension of the matrices.
+        regularization (float): The ridge added to A^T.A while the selection is still rank deficient.
+
+        Returns:
+        List[int]: The indexes of the selected candidates.
+        """
+        rows = self.calculate_coefficient_rows (candidates, n)
+        number_of_candidates, number_of_unknowns = rows.shape
+        if number_of_preparations < number_of_unknowns or number_of_preparations > number_of_candidates:
+            raise ValueError ("Between {} and {} preparations can be selected.".format (number_of_unknowns, number_of_candidates))
+
+        # Greedy D-optimal selection, with the inverse kept up to date by Sherman-Morrison
+        inverse = np.eye (number_of_unknowns) / regularization
+        available = np.ones (number_of_candidates, dtype=bool)
+        selected = []
+        for _ in range (number_of_preparations):
+            gains = np.einsum ('ci,ij,cj->c', rows, inverse, rows)
+            gains [~available] = -np.inf
+            best = int (np.argmax (gains))
+            projected = inverse @ rows [best]
+            inverse -= np.outer (projected, projected) / (1 + rows [best] @ projected)
+            available [best] = False
+            selected.append (best)
+
+        # Exchange pass, scoring every candidate for a slot with one batched SVD
+        for slot in range (number_of_preparations):
+            trials = np.repeat (rows [selected] [np.newaxis], number_of_candidates, axis=0)
+            trials [:, slot] = rows
+            singular_values = np.linalg.svd (trials, compute_uv=False)
+            conditions = singular_values [:, 0] / np.maximum (singular_values [:, -1], np.finfo (float).tiny)
+            conditions [~available] = np.inf
+            best = int (np.argmin (conditions))
+            if conditions [best] < np.linalg.cond (rows [selected]):
+                available [selected [slot]] = True
+                available [best] = False
+                selected [slot] = best
+
+        return selected
+
+    def design_preparations(self, number_of_modes: int, number_of_preparations: Optional[int] = None, number_of_candidates: Optional[int] = None,
+                            rng: Optional[np.random.Generator] = None) -> AbstractCircuitStack:
+        """
+        Choose the interferometers of the preparations before any experiment runs, from a pool of Haar random candidates.
+
+        Parameters:
+        number_of_modes (int): The number of modes.
+        number_of_preparations (Optional[int]): The number of preparations. Defaults to n(n-1)/2.
+        number_of_candidates (Optional[int]): The size of the candidate pool. Defaults to ten times the number of preparations.
+        rng (Optional[np.random.Generator]): The random generator used for the candidate pool.
+
+        Returns:
+        AbstractCircuitStack: The selected interferometers.
+        """
+        if number_of_preparations is None:
+            number_of_preparations = (number_of_modes * (number_of_modes - 1)) // 2
+        if number_of_candidates is None:
+            number_of_candidates = 10 * number_of_preparations
+
+        candidates = random_unitaries (number_of_candidates, number_of_modes, rng)
+        selected = self.select_preparations (candidates, number_of_preparations, number_of_modes)
+        preparations = AbstractCircuitStack (number_of_modes, candidates [selected], check=False)
+        logger.debug ("[Overlaps estimation] Condition number of the designed system %s", lazy (self.calculate_condition_number, preparations, number_of_modes))
+
+        return preparations
+
     def calculate_expected_variance(self, gram_matrix: List[List[float]], interferometer: List[List[complex]]) -> float:
         """
         Calculate the expected variance for a given Gram matrix and interferometer.
@@ -154,23 +334,18 @@ class GramMatrixFromVariance:
         float: The expected variance.
         """
         n = len (gram_matrix)
-        sum = 0
-        for j in itertools.product (range (0, n), repeat=2):
-            (a, b) = j
-            if a != b:
-                sum += gram_matrix [a][b] * functools.reduce (lambda x, y: x + y, [abs (interferometer [i][a])**2 * abs (interferometer [i][b])**2 for i in range (0, n)])
-    
-        return 1 + (1/n) * sum - (1/n) * self.sum_all_4 (interferometer, n)
+        squared = self.squared_moduli (interferometer, n) [0]
+        products = squared.T @ squared
+        off_diagonal = ~np.eye (n, dtype=bool)
+        sum = np.sum (np.asarray (gram_matrix, dtype=float) [off_diagonal] * products [off_diagonal])
+
+        return float (1 + (1/n) * sum - (1/n) * np.sum (squared ** 2))
 
-    def do_experiments_to_calculate_the_gram_matrix (self, number_of_modes: int):
+    def do_experiments_to_calculate_the_gram_matrix (self, number_of_modes: int, rng: Optional[np.random.Generator] = None):
         number_of_preparations = ((number_of_modes * number_of_modes) - number_of_modes)//2  
         #print ("Number of necessary preparations: ", number_of_preparations)
 
-        matrices = []
-        for i in range (number_of_preparations):
-            matrix = generate_random_circuit (number_of_modes).compute_unitary ()
-            absCirc = AbstractCircuit (number_of_modes, matrix)
-            matrices.append (absCirc)
+        matrices = generate_random_abstract_circuit_stack (number_of_preparations, number_of_modes, rng)
         
         expected_variances_pairs = []
         for i in matrices:
@@ -179,8 +354,36 @@ class GramMatrixFromVariance:
             characterized_matrix = (self.device_characterizer.characterize_device ()) [1]
             self.variance_calculator.device.set_circuit (i)
             
-            expected_variances_pairs.append ((characterized_matrix, self.variance_calculator.execute_experiment_variance ()))
+            expected_variances_pairs.append ((characterized_matrix, self.variance_calculator.execute_experiment_variance (i)))
 
         
-        X = self.find_overlaps (expected_variances_pairs, number_of_preparations)
+        X = self.find_overlaps (expected_variances_pairs, number_of_modes)
         return X
+
+    def do_experiments_to_estimate_the_gram_matrix (self, number_of_modes: int, number_of_preparations: Optional[int] = None,
+                                                    number_of_candidates: Optional[int] = None, rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Estimate the overlaps from designed preparations, by weighted least squares on the measured expected variances.
+
+        Parameters:
+        number_of_modes (int): The number of modes.
+        number_of_preparations (Optional[int]): The number of preparations. Defaults to n(n-1)/2.
+        number_of_candidates (Optional[int]): The size of the candidate pool used to design the preparations.
+        rng (Optional[np.random.Generator]): The random generator used for the candidate pool.
+
+        Returns:
+        Tuple[np.ndarray, np.ndarray]: The overlaps and their covariance matrix.
+        """
+        circuits = self.design_preparations (number_of_modes, number_of_preparations, number_of_candidates, rng)
+
+        expected_variances_pairs = []
+        variances_of_expected_variances = []
+        for circuit in circuits:
+            self.device_characterizer.set_circuit (circuit)
+            characterized_matrix = (self.device_characterizer.characterize_device ()) [1]
+
+            expected_variance, variance_of_expected_variance = self.variance_calculator.execute_experiment_variance_with_uncertainty (circuit)
+            expected_variances_pairs.append ((characterized_matrix, expected_variance))
+            variances_of_expected_variances.append (variance_of_expected_variance)
+
+        return self.find_overlaps_weighted_least_squares (expected_variances_pairs, number_of_modes, variances_of_expected_variances)
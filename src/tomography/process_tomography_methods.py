@@ -12,6 +12,11 @@ from functools import reduce
 import logging
 import numpy as np
 
+from base.instrumentation import PROFILER
+from base.logger import get_logger
+
+logger = get_logger (__name__)
+
 class ProcessTomographyMethod:
     def __init__ (self, number_of_modes:int, single_photon_experiments_results: Optional[Any] = None, double_photon_experiment_results: Optional[Any] = None):
         """
@@ -86,13 +91,13 @@ class SuperStableMethod (ProcessTomographyMethod):
                                self.single_photon_experiments_results [input_index_s].keys ()))
             
             for output_index_s in self.single_photon_experiments_results [input_index_s].keys ():
-                input_index = int (input_index_s [1])
-                output_index = int (output_index_s [1])
+                input_index = int (input_index_s [1:-1])
+                output_index = int (output_index_s [1:-1])
                 matrix [input_index][output_index] = self.single_photon_experiments_results [input_index_s][output_index_s]/sum
                 matrix [input_index][output_index] = np.sqrt (matrix [input_index][output_index])
         
         self.taus = matrix
-        logging.debug ("[Process Tomography methods] Tau matrix {}".format (self.taus))
+        logger.debug ("[Process Tomography methods] Tau matrix %s", self.taus)
 
     # Function that calculates the C's from single states. k, h are input states, 
     # while j,g are output states
@@ -102,7 +107,7 @@ class SuperStableMethod (ProcessTomographyMethod):
         h_s = str ([h])
         g_s = str ([g])
         
-        logging.debug ("Current case: [" + k_s + "," + h_s + ";" + j_s + "," + g_s + "]")
+        logger.debug ("Current case: [%s,%s;%s,%s]", k_s, h_s, j_s, g_s)
         
 
         sum_k = reduce (lambda x, y: x + y, 
@@ -119,8 +124,8 @@ class SuperStableMethod (ProcessTomographyMethod):
         R_gk = self.single_photon_experiments_results [k_s][g_s] / sum_k
         R_jh = self.single_photon_experiments_results [h_s][j_s] / sum_h
 
-        logging.debug ("Rs: " + str (R_jk) + "(r_jk);" + str (R_gh) + "(r_gh);" + str (R_gk) + "(r_gk);" + str (R_jh) + "(r_jh);" )
-        logging.debug ("Total: " + str (R_jk * R_gh + R_gk * R_jh))
+        logger.debug ("Rs: %s(r_jk);%s(r_gh);%s(r_gk);%s(r_jh);", R_jk, R_gh, R_gk, R_jh)
+        logger.debug ("Total: %s", R_jk * R_gh + R_gk * R_jh)
         return R_jk * R_gh + R_gk * R_jh
 
     def calculate_Q_ghjk (self, k, j, h, g):
@@ -175,8 +180,8 @@ class SuperStableMethod (ProcessTomographyMethod):
         inputs = list (sorted ([k, h]))
         outputs = list (sorted ([j, g]))
         key = "[" + str (inputs [0]) + "," + str (inputs [1]) + ";" + str (outputs [0]) + "," + str (outputs [1]) + "]"
-        logging.debug ("Key in calculate phase enhanced:" + str (key))
-        logging.debug (";Visibilities: "+ str (self.visibilities [key]))
+        logger.debug ("Key in calculate phase enhanced:%s", key)
+        logger.debug (";Visibilities: %s", self.visibilities [key])
         return -1/2 * self.visibilities[key] * self.calculate_y_ghjk (k, j, h, g)
     
     def calculate_signals (self, cos_dif, alpha, beta):
@@ -190,26 +195,26 @@ class SuperStableMethod (ProcessTomographyMethod):
         self.phase_signals = np.ones ((self.number_of_modes, self.number_of_modes), dtype=int)
         phase_cos = np.zeros ((self.number_of_modes, self.number_of_modes), dtype=float)
         
-        logging.debug ("Calculating phases for the second line")
+        logger.debug ("Calculating phases for the second line")
         for x in range (2, self.number_of_modes):
             phase_cos [1][x] = self.calculate_cos_for_ghjk (0, 1, 1, x)
             self.phases [1][x] *= self.calculate_signals (phase_cos [1][x], self.phases [1][x], reference_phase)
             
-        logging.debug ("Now for second column")
+        logger.debug ("Now for second column")
         for y in range (2, self.number_of_modes):
             phase_cos [y][1] = self.calculate_cos_for_ghjk (1, 0, y, 1)
             self.phases [y][1] *=  self.calculate_signals (phase_cos [y][1], self.phases [y][1], reference_phase)
                         
-        logging.debug("Now for every other experiment")
+        logger.debug ("Now for every other experiment")
         for y in range (2, self.number_of_modes):
             for x in range (2, self.number_of_modes):
                 phase_cos [y][x] = self.calculate_cos_for_ghjk (0, 1, y, x)
                 self.phases [y][x] *=  self.calculate_signals (phase_cos [y][x], self.phases [y][x], self.phases [y][1])
                 
-        logging.debug ("Phase cos: ")
+        logger.debug ("Phase cos: ")
         self.pretty_print_phases_arg (phase_cos) 
 
-        logging.debug ("Final phases")
+        logger.debug ("Final phases")
         self.pretty_print_phases_arg (self.phases)
       
     def calculate_phases (self):
@@ -227,45 +232,55 @@ class SuperStableMethod (ProcessTomographyMethod):
             y = y + 1
         
     def pretty_print_phases (self):
+        if not logger.isEnabledFor (logging.DEBUG):
+            return
         pretty = map (lambda x:  map (lambda z: str (Fraction (z/np.pi).limit_denominator (10)), x), self.phases)
         
-        logging.debug ("Not pretty phases:")
-        logging.debug (self.phases)
+        logger.debug ("Not pretty phases:")
+        logger.debug ("%s", self.phases)
 
-        logging.debug ("Pretty phases: ")
+        logger.debug ("Pretty phases: ")
         for l in pretty:
-           logging.debug (str (list (l)))
+           logger.debug ("%s", list (l))
 
     def pretty_print_phases_arg (self, some_phases):
+        if not logger.isEnabledFor (logging.DEBUG):
+            return
         pretty = map (lambda x:  map (lambda z: str (Fraction (z/np.pi).limit_denominator (10)), x), some_phases)
         
-        logging.debug ("Not pretty phases:")
-        logging.debug (some_phases)
+        logger.debug ("Not pretty phases:")
+        logger.debug ("%s", some_phases)
 
-        logging.debug ("Pretty phases: ")
+        logger.debug ("Pretty phases: ")
         for l in pretty:
-           logging.debug (str (list (l)))
+           logger.debug ("%s", list (l))
             
     def recover_state (self):
-        self.calculate_tau_matrix ()
-        self.calculate_visibilities ()
+        with PROFILER.span ("reconstruction", modes=self.number_of_modes):
+            with PROFILER.span ("tau matrix"):
+                self.calculate_tau_matrix ()
+            with PROFILER.span ("visibilities"):
+                self.calculate_visibilities ()
+            PROFILER.count ("visibilities", len (self.visibilities))
        
         
-        logging.debug ("----------")
-        self.calculate_phases ()
-        self.pretty_print_phases ()
+            logger.debug ("----------")
+            with PROFILER.span ("phases"):
+                self.calculate_phases ()
+                self.pretty_print_phases ()
 
        
-        self.yet_another_phase_signal_calculation (self.phases [1][1])
+            with PROFILER.span ("phase signs"):
+                self.yet_another_phase_signal_calculation (self.phases [1][1])
         
-        state_matrix = self.taus.copy ()
-        y = 1
-        while y < self.number_of_modes:
-            x = 1 
-            while x < self.number_of_modes:
-                state_matrix [y][x] = self.calculate_tilde_x (0, 0, y, x) * np.exp (self.phases [y][x] * 1j)
-                x = x + 1
-            y = y + 1
+            state_matrix = self.taus.copy ()
+            y = 1
+            while y < self.number_of_modes:
+                x = 1 
+                while x < self.number_of_modes:
+                    state_matrix [y][x] = self.calculate_tilde_x (0, 0, y, x) * np.exp (self.phases [y][x] * 1j)
+                    x = x + 1
+                y = y + 1
 
         return state_matrix
 
@@ -5,20 +5,25 @@
 
 # Including our own helpers
 import numpy as np
-import logging
+
+from typing import Optional
 
 from base.abstract_circuit import AbstractCircuit
 
 
-from base.circuit_helpers import generate_fourier_transform_circuit, random_preparation, is_unitary
-from quandela.circuit_helpers import generate_random_circuit
+from base.circuit_helpers import cached_fourier_transform_circuit, random_preparation, is_unitary
+from tomography.characterization_cache import CharacterizationCache, DriftProbe
 from tomography.process_tomography_methods import ProcessTomographyMethod
 from tomography.tomography_probers import DeviceProcessTomographyProber
+from base.logger import get_logger, lazy
+
+logger = get_logger (__name__)
 
 
 class DeviceCharacterizer:
 
-    def __init__ (self, number_of_modes: int , tomography_device: DeviceProcessTomographyProber, process_tomography_method: ProcessTomographyMethod):
+    def __init__ (self, number_of_modes: int , tomography_device: DeviceProcessTomographyProber, process_tomography_method: ProcessTomographyMethod,
+                  cache: Optional[CharacterizationCache] = None, drift_probe: Optional[DriftProbe] = None, max_age: Optional[float] = None):
         """
         Initialize the DeviceCharacterizer with the number of modes, a tomography device, and a process tomography method.
 
@@ -26,10 +31,16 @@ class DeviceCharacterizer:
         number_of_modes (int): The number of modes for the device.
         tomography_device (DeviceProcessTomographyProber): The device used for process tomography.
         process_tomography_method (ProcessTomographyMethod): The method used for process tomography.
+        cache (Optional[CharacterizationCache]): A store of previous characterizations. If None every call runs the full tomography.
+        drift_probe (Optional[DriftProbe]): The probe deciding whether a cached characterization can be reused. If None cached characterizations are always reused.
+        max_age (Optional[float]): The maximum age in seconds of a reusable characterization. If None any age is accepted.
         """
         self.number_of_modes = number_of_modes
         self.tomography_device = tomography_device
         self.process_tomography_method = process_tomography_method
+        self.cache = cache
+        self.drift_probe = drift_probe
+        self.max_age = max_age
         self.original = None
     
     def set_circuit (self, circuit: AbstractCircuit):
@@ -61,7 +72,7 @@ class DeviceCharacterizer:
         Returns:
         Any: The generated Fourier transform circuit.
         """
-        return generate_fourier_transform_circuit (number_of_modes)
+        return cached_fourier_transform_circuit (number_of_modes)
     
     def calculate_distance_between_matrices (self, matrix_1, matrix_2):
         """
@@ -77,8 +88,8 @@ class DeviceCharacterizer:
         density_operator_1 = np.matrix (matrix_1) * np.matrix (matrix_1).getH() 
         density_operator_2 = np.matrix (matrix_2) * np.matrix (matrix_2).getH()
     
-        logging.debug ("Density operator 1: " + str (density_operator_1))
-        logging.debug ("Density operator 2: " + str (density_operator_2))
+        logger.debug ("Density operator 1: %s", density_operator_1)
+        logger.debug ("Density operator 2: %s", density_operator_2)
     
         return np.trace(np.dot (density_operator_1, density_operator_2))
 
@@ -90,25 +101,55 @@ class DeviceCharacterizer:
         Tuple[np.ndarray, Any, float]: A tuple containing the original unitary, the reconstructed state, and the distance.
         """
         if self.original is None:
-            logging.debug ("The circuit is none, hence generating one!")
+            logger.debug ("The circuit is none, hence generating one!")
             self.original = self.generate_default_circuit (self.number_of_modes)
 
-        logging.debug ("Circuit to be used: " + str (self.original))
+        logger.debug ("Circuit to be used: %s", self.original)
+
+        cached = self.lookup_cached_characterization ()
+        if cached is not None:
+            return cached
+
         self.tomography_device.define_circuit (self.original)
         self.tomography_device.make_experimental_bunch ()
         
-        logging.debug ("[Process Tomography prober] Total single photon results {}".format (self.tomography_device.get_single_photon_experiments ()))
-        logging.debug ("[Process Tomography prober] Total double photon results {}".format (self.tomography_device.get_double_photon_experiments ()))
+        logger.debug ("[Process Tomography prober] Total single photon results %s", lazy (self.tomography_device.get_single_photon_experiments))
+        logger.debug ("[Process Tomography prober] Total double photon results %s", lazy (self.tomography_device.get_double_photon_experiments))
 
         rebuilt = self.reconstruct_state ()
-        logging.debug (rebuilt)
+        logger.debug ("%s", rebuilt)
         
 
         distance = self.calculate_distance_between_matrices (rebuilt, self.original.m)
-        logging.debug ("And the distance is ba-dum-pssh:" + str (distance))
+        logger.debug ("And the distance is ba-dum-pssh:%s", distance)
+
+        if self.cache is not None:
+            self.cache.store (self.original, self.original.m, rebuilt, distance, getattr (self.process_tomography_method, "taus", None))
     
         return (self.original.m, rebuilt, distance)    
 
+    def lookup_cached_characterization (self):
+        """
+        Get a cached characterization of the current circuit, if it can still be trusted.
+
+        Returns:
+        Optional[Tuple[np.ndarray, Any, float]]: The cached characterization, or None if a full characterization is needed.
+        """
+        if self.cache is None:
+            return None
+
+        record = self.cache.lookup (self.original, self.max_age)
+        if record is None:
+            logger.debug ("[Device characterizer] No cached characterization for the circuit")
+            return None
+
+        if self.drift_probe is not None and self.drift_probe.has_drifted (self.original, record.taus):
+            logger.debug ("[Device characterizer] The device drifted, characterizing again")
+            return None
+
+        logger.debug ("[Device characterizer] Reusing the characterization from %s", record.timestamp)
+        return record.to_tuple ()
+
 
 
 
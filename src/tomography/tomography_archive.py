@@ -0,0 +1,87 @@
+import numpy as np
+
+from typing import Any, Dict, Optional, Tuple
+
+from base.results import StatesAndProbabilities
+from base.results_archive import ResultsArchive, save_result_sets
+from base.state_generation_helpers import generate_state_from_list
+
+# The sets of the single and double photon experiments are named after their kind and input, e.g. 'double:[0, 1]'
+SINGLE_PHOTON_PREFIX = "single:"
+DOUBLE_PHOTON_PREFIX = "double:"
+
+def indexes_to_state (indexes: str, number_of_modes: int) -> str:
+    """
+    Convert the modes of the photons, as the tomography probers key them (e.g., '[0, 2]'), to a state string.
+
+    Parameters:
+    indexes (str): The mode of each photon.
+    number_of_modes (int): The number of modes.
+
+    Returns:
+    str: The state (e.g., '|1,0,1>').
+    """
+    occupations = [0] * number_of_modes
+    for index in indexes.strip ("[]").split (","):
+        if index.strip ():
+            occupations [int (index)] += 1
+    return generate_state_from_list (occupations)
+
+def tomography_results_to_sets (number_of_modes: int, single_photon_results: Dict[str, Dict[str, float]],
+                                double_photon_results: Dict[str, Dict[str, float]]) -> Dict[str, StatesAndProbabilities]:
+    """
+    Convert the results of the single and double photon experiments of a tomography to named results.
+
+    Parameters:
+    number_of_modes (int): The number of modes.
+    single_photon_results (Dict[str, Dict[str, float]]): The probability of each output of each single photon experiment, keyed by modes.
+    double_photon_results (Dict[str, Dict[str, float]]): The probability of each output of each double photon experiment, keyed by modes.
+
+    Returns:
+    Dict[str, StatesAndProbabilities]: The results of each experiment.
+    """
+    result_sets = {}
+    for prefix, experiments in ((SINGLE_PHOTON_PREFIX, single_photon_results), (DOUBLE_PHOTON_PREFIX, double_photon_results)):
+        for input_indexes, outputs in experiments.items ():
+            results = StatesAndProbabilities ()
+            results.set_probability_states ({indexes_to_state (output, number_of_modes): probability for output, probability in outputs.items ()})
+            result_sets [prefix + input_indexes] = results
+    return result_sets
+
+def save_tomography_results (path: str, number_of_modes: int, single_photon_results: Dict[str, Dict[str, float]],
+                             double_photon_results: Dict[str, Dict[str, float]], metadata: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Save the results of the single and double photon experiments of a tomography to an .npz archive.
+
+    Parameters:
+    path (str): The file to write.
+    number_of_modes (int): The number of modes.
+    single_photon_results (Dict[str, Dict[str, float]]): The results of the single photon experiments, as the probers return them.
+    double_photon_results (Dict[str, Dict[str, float]]): The results of the double photon experiments, as the probers return them.
+    metadata (Optional[Dict[str, Any]]): Plain values describing the results, stored as JSON.
+    """
+    metadata = dict (metadata or {})
+    metadata ["number_of_modes"] = number_of_modes
+    save_result_sets (path, tomography_results_to_sets (number_of_modes, single_photon_results, double_photon_results), metadata)
+
+def load_tomography_results (path: str, mmap: bool = True) -> Tuple[int, Dict[str, Dict[str, float]], Dict[str, Dict[str, float]]]:
+    """
+    Load the results saved with save_tomography_results, keyed as the probers key them.
+
+    Parameters:
+    path (str): The archive.
+    mmap (bool): Map the columns in memory instead of reading them.
+
+    Returns:
+    Tuple[int, Dict[str, Dict[str, float]], Dict[str, Dict[str, float]]]: The number of modes and the results of the single and double photon experiments, as SuperStableMethod takes them.
+    """
+    archive = ResultsArchive (path, mmap)
+    number_of_modes = archive.metadata ["number_of_modes"]
+    modes = np.arange (number_of_modes)
+
+    experiments = {SINGLE_PHOTON_PREFIX: {}, DOUBLE_PHOTON_PREFIX: {}}
+    for name in archive:
+        prefix = SINGLE_PHOTON_PREFIX if name.startswith (SINGLE_PHOTON_PREFIX) else DOUBLE_PHOTON_PREFIX
+        outputs = [str (np.repeat (modes, occupations).tolist ()) for occupations in archive.occupations (name)]
+        experiments [prefix][name [len (prefix):]] = dict (zip (outputs, archive.probabilities (name).tolist ()))
+    return number_of_modes, experiments [SINGLE_PHOTON_PREFIX], experiments [DOUBLE_PHOTON_PREFIX]
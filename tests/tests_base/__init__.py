@@ -2,4 +2,12 @@ from .test_circuit_helpers import *
 from .tests_abstract_circuit import *
 from .tests_quandela_device import *
 from .tests_state_generation_helpers import *
-from .tests_states_and_probabilties import *
\ No newline at end of file
+from .tests_states_and_probabilties import *
+from .tests_structured_circuit import *
+from .tests_circuit_stack import *
+from .tests_fock_space import *
+from .tests_permanents import *
+from .tests_instrumentation import *
+from .tests_logger import *
+from .tests_experiment_plan import *
+from .tests_results_archive import *
\ No newline at end of file
@@ -1,7 +1,7 @@
 import unittest
 import numpy as np
 import cmath
-from base.circuit_helpers import fourier_matrix, is_unitary, generate_fourier_transform_circuit
+from base.circuit_helpers import fourier_matrix, is_unitary, cached_fourier_transform_circuit, generate_fourier_transform_circuit, random_unitaries, generate_random_abstract_circuits
 from base import AbstractCircuit
 
 class TestFourierTransform(unittest.TestCase):
@@ -25,5 +25,62 @@ class TestFourierTransform(unittest.TestCase):
         self.assertIsInstance(circuit, AbstractCircuit, "Circuit creation failed.")
         np.testing.assert_almost_equal(circuit.m, expected_matrix, decimal=6, err_msg="Fourier transform circuit generation failed.")
 
+    def test_fourier_matrix_matches_definition(self):
+        for dimension in (3, 5, 8):
+            expected = np.array([[cmath.exp(2j * cmath.pi * x * y / dimension) for y in range(dimension)] for x in range(dimension)]) / np.sqrt(dimension)
+            np.testing.assert_array_almost_equal(fourier_matrix(dimension), expected)
+
+    def test_cached_fourier_transform_circuit_is_shared_and_frozen(self):
+        circuit = cached_fourier_transform_circuit(4)
+        self.assertIs(circuit, cached_fourier_transform_circuit(4))
+        self.assertFalse(circuit.m.flags.writeable)
+        with self.assertRaises(ValueError):
+            circuit.compose(AbstractCircuit(4))
+        copy = circuit.copy()
+        copy.compose(AbstractCircuit(4))
+        np.testing.assert_array_almost_equal(copy.m, circuit.m)
+        fourier_matrix(4)[0][0] = 0
+        self.assertNotEqual(cached_fourier_transform_circuit(4).m[0][0], 0)
+
+    def test_generated_fourier_transform_circuit_is_fresh(self):
+        circuit = generate_fourier_transform_circuit(4)
+        self.assertIsNot(circuit, generate_fourier_transform_circuit(4))
+        self.assertFalse(circuit.frozen)
+        circuit.compose(AbstractCircuit(4))
+        other = generate_fourier_transform_circuit(4)
+        other.m[0][0] = 0
+        self.assertNotEqual(generate_fourier_transform_circuit(4).m[0][0], 0)
+        self.assertNotEqual(cached_fourier_transform_circuit(4).m[0][0], 0)
+
+class TestRandomUnitaries(unittest.TestCase):
+
+    def test_random_unitaries_are_unitary(self):
+        unitaries = random_unitaries(5, 4, np.random.default_rng(1))
+        self.assertEqual(unitaries.shape, (5, 4, 4))
+        for unitary in unitaries:
+            self.assertTrue(is_unitary(unitary), "Random unitary is not unitary.")
+
+    def test_random_unitaries_are_reproducible(self):
+        first = random_unitaries(3, 3, np.random.default_rng(7))
+        second = random_unitaries(3, 3, np.random.default_rng(7))
+        np.testing.assert_array_equal(first, second)
+
+    def test_random_unitaries_moments(self):
+        # For Haar random unitaries E|U_ij|^2 = 1/m and E|U_ij|^4 = 2/(m(m+1))
+        unitaries = random_unitaries(20000, 3, np.random.default_rng(3))
+        squared = np.abs(unitaries) ** 2
+        self.assertAlmostEqual(np.mean(squared), 1 / 3, places=3)
+        self.assertAlmostEqual(np.mean(squared ** 2), 2 / 12, places=2)
+
+    def test_generate_random_abstract_circuits(self):
+        circuits = generate_random_abstract_circuits(4, 3, np.random.default_rng(2))
+        self.assertFalse(isinstance(circuits, list))
+        circuits = list(circuits)
+        self.assertEqual(len(circuits), 4)
+        expected = random_unitaries(4, 3, np.random.default_rng(2))
+        for circuit, unitary in zip(circuits, expected):
+            self.assertIsInstance(circuit, AbstractCircuit)
+            np.testing.assert_array_almost_equal(circuit.m, unitary)
+
 if __name__ == "__main__":
     unittest.main()
@@ -34,5 +34,20 @@ class TestAbstractCircuit(unittest.TestCase):
         circuit1.compose(circuit2)
         np.testing.assert_array_almost_equal(circuit1.m, expected_composed_matrix, err_msg="Composition with unitary matrix failed")
 
+    def test_fingerprint_ignores_global_phase(self):
+        hadamard = (1/np.sqrt(2)) * np.array([[1, 1], [1, -1]])
+        circuit = AbstractCircuit(2, hadamard)
+        self.assertEqual(circuit.fingerprint(), AbstractCircuit(2, np.exp(0.7j) * hadamard).fingerprint())
+        self.assertEqual(circuit.fingerprint(), AbstractCircuit(2, hadamard + 1e-12).fingerprint())
+        self.assertNotEqual(circuit.fingerprint(), AbstractCircuit(2).fingerprint())
+
+    def test_fingerprint_follows_composition(self):
+        hadamard = (1/np.sqrt(2)) * np.array([[1, 1], [1, -1]])
+        circuit = AbstractCircuit(2, hadamard)
+        before = circuit.fingerprint()
+        self.assertIs(circuit.fingerprint(), before)
+        circuit.compose(AbstractCircuit(2, hadamard))
+        self.assertEqual(circuit.fingerprint(), AbstractCircuit(2).fingerprint())
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
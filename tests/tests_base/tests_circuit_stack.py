@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+from base.abstract_circuit import AbstractCircuit
+from base.circuit_helpers import fourier_matrix, random_unitaries, generate_random_abstract_circuit_stack
+from base.circuit_stack import AbstractCircuitStack
+
+class TestAbstractCircuitStack(unittest.TestCase):
+
+    def setUp(self):
+        self.unitaries = random_unitaries(5, 3, np.random.default_rng(0))
+        self.stack = AbstractCircuitStack(3, self.unitaries)
+
+    def test_vectorized_unitarity_check(self):
+        matrices = self.unitaries.copy()
+        matrices[2] = 2 * matrices[2]
+        np.testing.assert_array_equal(AbstractCircuitStack(3, matrices, check=False).is_unitary(), [True, True, False, True, True])
+        with self.assertRaises(ValueError):
+            AbstractCircuitStack(3, matrices)
+
+    def test_views_do_not_copy(self):
+        circuit = self.stack[1]
+        self.assertIsInstance(circuit, AbstractCircuit)
+        self.assertTrue(np.shares_memory(circuit.m, self.stack.matrices))
+        sub_stack = self.stack[1:4]
+        self.assertEqual(len(sub_stack), 3)
+        self.assertTrue(np.shares_memory(sub_stack.matrices, self.stack.matrices))
+        self.assertEqual(len(list(self.stack)), 5)
+
+    def test_compose_with_circuit(self):
+        fourier = AbstractCircuit(3, fourier_matrix(3))
+        self.stack.compose(fourier)
+        for i in range(5):
+            np.testing.assert_array_almost_equal(self.stack[i].m, self.unitaries[i] @ fourier.m)
+
+    def test_compose_with_stack(self):
+        other = generate_random_abstract_circuit_stack(5, 3, np.random.default_rng(1))
+        self.stack.compose(other)
+        for i in range(5):
+            np.testing.assert_array_almost_equal(self.stack[i].m, self.unitaries[i] @ other[i].m)
+        with self.assertRaises(ValueError):
+            self.stack.compose(other[:2])
+
+    def test_from_circuits(self):
+        stack = AbstractCircuitStack.from_circuits([AbstractCircuit(3, u) for u in self.unitaries])
+        np.testing.assert_array_almost_equal(np.asarray(stack), self.unitaries)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+from unittest.mock import MagicMock
+
+from base.circuit_helpers import generate_fourier_transform_circuit
+from base.devices import Device
+from base.experiment_plan import ExperimentPlan
+from base.results import StatesAndProbabilities
+from photonic_indistinguishability_measures.bunching import BunchingCalculator
+from photonic_indistinguishability_measures.variance import Variance
+
+def make_device():
+    device = MagicMock(spec=Device)
+    device.number_of_samples = 100
+
+    def execute_experiment(input_state, circuit):
+        # Every photon leaves through the first mode
+        results = StatesAndProbabilities()
+        photons = sum(int(occupation) for occupation in input_state.strip("|>").split(","))
+        results.set_probability_states({"|{}>".format(",".join([str(photons)] + ["0"] * (circuit.m.shape[0] - 1))): 1.0})
+        return results
+    device.execute_experiment.side_effect = execute_experiment
+    return device
+
+class TestExperimentPlan(unittest.TestCase):
+
+    def test_identical_requests_share_results(self):
+        plan = ExperimentPlan()
+        first = plan.request("|1,1>", generate_fourier_transform_circuit(2))
+        second = plan.request("|1,1>", generate_fourier_transform_circuit(2))
+        other = plan.request("|1,0>", generate_fourier_transform_circuit(2))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual((plan.number_of_requests, plan.number_of_experiments), (3, 2))
+
+        device = make_device()
+        plan.execute(device)
+        self.assertEqual(device.execute_experiment.call_count, 2)
+        self.assertIs(plan.get(first), plan.get(second))
+
+        # Only the experiments requested after an execution run on the next one
+        plan.request("|0,1>", generate_fourier_transform_circuit(2))
+        plan.execute(device)
+        self.assertEqual(device.execute_experiment.call_count, 3)
+
+    def test_get_before_execute(self):
+        plan = ExperimentPlan()
+        key = plan.request("|1,1>", generate_fourier_transform_circuit(2))
+        with self.assertRaises(ValueError):
+            plan.get(key)
+
+    def test_number_of_samples(self):
+        plan = ExperimentPlan()
+        circuit = generate_fourier_transform_circuit(2)
+        self.assertNotEqual(plan.request("|1,1>", circuit, 10), plan.request("|1,1>", circuit))
+
+        device = make_device()
+        samples = []
+        plan.execute(device, lambda input_state, circuit: samples.append(device.number_of_samples) or StatesAndProbabilities())
+        self.assertEqual(samples, [10, 100])
+        self.assertEqual(device.number_of_samples, 100)
+
+    def test_default_number_of_samples_is_merged(self):
+        plan = ExperimentPlan()
+        circuit = generate_fourier_transform_circuit(2)
+        implicit = plan.request("|1,1>", circuit)
+        explicit = plan.request("|1,1>", circuit, 100)
+        self.assertEqual(plan.number_of_experiments, 2)
+
+        device = make_device()
+        plan.execute(device)
+        self.assertEqual(device.execute_experiment.call_count, 1)
+        self.assertEqual(plan.number_of_experiments, 1)
+        self.assertIs(plan.get(implicit), plan.get(explicit))
+
+        # A request giving the default explicitly after the execution reuses the results too
+        plan = ExperimentPlan()
+        implicit = plan.request("|1,0>", circuit)
+        plan.execute(device)
+        plan.request("|1,0>", circuit, 10)
+        explicit = plan.request("|1,0>", circuit, 100)
+        plan.execute(device)
+        self.assertEqual(device.execute_experiment.call_count, 3)
+        self.assertIs(plan.get(explicit), plan.get(implicit))
+
+    def test_measures_share_experiments(self):
+        device = make_device()
+        plan = ExperimentPlan()
+        variance = Variance(device, 3)
+        bunching = BunchingCalculator(device, 3)
+        planned = [variance.request_variance_indistinguishable_scenario(plan, 3), variance.request_variance_distinguishable_scenario(plan, 3),
+                   bunching.request_full_bunching_indistinguishable_case(plan), bunching.request_full_bunching_distinguishable_case(plan)]
+        plan.execute(device)
+        self.assertEqual((plan.number_of_requests, device.execute_experiment.call_count), (8, 4))
+
+        separate = make_device()
+        expected = [Variance(separate, 3).execute_experiment_variance_indistinguishable_scenario(3),
+                    Variance(separate, 3).execute_experiment_variance_distinguishable_scenario(3),
+                    BunchingCalculator(separate, 3).do_the_experiments_for_full_bunching_indistinguishable_case(),
+                    BunchingCalculator(separate, 3).do_the_experiments_for_full_bunching_distinguishable_case()]
+        self.assertEqual(separate.execute_experiment.call_count, 8)
+        for value, expected_value in zip(planned, expected):
+            self.assertAlmostEqual(value(), expected_value)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import itertools
+import numpy as np
+from base.fock_space import FockSpaceIndex
+from base.results import StatesAndProbabilities
+
+class TestFockSpaceIndex(unittest.TestCase):
+
+    def test_size(self):
+        self.assertEqual(FockSpaceIndex(3, 3).size, 10)
+        self.assertEqual(FockSpaceIndex(4, 1).size, 1)
+        self.assertEqual(FockSpaceIndex(0, 5).size, 1)
+
+    def test_rank_is_a_bijection(self):
+        for photons, modes in [(3, 3), (4, 5), (2, 1), (0, 3), (5, 2)]:
+            index = FockSpaceIndex(photons, modes)
+            patterns = [p for p in itertools.product(range(photons + 1), repeat=modes) if sum(p) == photons]
+            ranks = index.rank(patterns)
+            self.assertEqual(sorted(ranks.tolist()), list(range(index.size)))
+            np.testing.assert_array_equal(index.unrank(ranks), patterns)
+
+    def test_single_pattern(self):
+        index = FockSpaceIndex(3, 4)
+        rank = index.rank([1, 0, 2, 0])
+        np.testing.assert_array_equal(index.unrank(rank), [1, 0, 2, 0])
+
+    def test_invalid_inputs(self):
+        index = FockSpaceIndex(2, 3)
+        with self.assertRaises(ValueError):
+            index.rank([1, 1, 1])
+        with self.assertRaises(ValueError):
+            index.unrank(index.size)
+
+    def test_dense_round_trip(self):
+        index = FockSpaceIndex(2, 3)
+        results = StatesAndProbabilities()
+        results.set_probability('|2,0,0>', 0.5)
+        results.set_probability('|1,0,1>', 0.25)
+        results.set_probability('|0,1,1>', 0.25)
+
+        dense = index.to_dense(results)
+        self.assertEqual(dense.shape, (6,))
+        self.assertAlmostEqual(dense.sum(), 1)
+        self.assertEqual(dense[index.rank([1, 0, 1])], 0.25)
+        self.assertEqual(index.from_dense(dense).get_probabilities(), results.get_probabilities())
+        self.assertEqual(len(index.states()), 6)
+        self.assertEqual(index.rank_states(index.states()).tolist(), list(range(6)))
+
+if __name__ == "__main__":
+    unittest.main()
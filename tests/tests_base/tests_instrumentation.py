@@ -0,0 +1,107 @@
+import unittest
+import json
+import os
+import tempfile
+
+from base.instrumentation import Instrumentation, NULL_SPAN, PROFILER
+from base.devices import DeviceMode
+from base.circuit_helpers import generate_fourier_transform_circuit
+from quandela.quandela_devices import QuandelaDeviceFactory
+from photonic_indistinguishability_measures.variance import Variance
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_disabled(self):
+        instrumentation = Instrumentation()
+        self.assertIs(instrumentation.span("stage"), NULL_SPAN)
+        with instrumentation.span("stage"):
+            instrumentation.count("things")
+        self.assertEqual(instrumentation.timing_tree()["children"], [])
+        self.assertEqual(dict(instrumentation.counters), {})
+
+    def test_timing_tree(self):
+        instrumentation = Instrumentation()
+        instrumentation.enable()
+        for _ in range(3):
+            with instrumentation.span("outer"):
+                with instrumentation.span("inner"):
+                    instrumentation.count("things", 2)
+        instrumentation.count("runs")
+
+        tree = instrumentation.timing_tree()
+        outer = tree["children"][0]
+        self.assertEqual((outer["name"], outer["calls"]), ("outer", 3))
+        self.assertEqual(outer["children"][0]["counters"], {"things": 6})
+        self.assertGreaterEqual(outer["total_time"], outer["children"][0]["total_time"])
+        self.assertEqual(tree["counters"], {"runs": 1})
+        self.assertEqual(instrumentation.counters["things"], 6)
+
+    def test_reset_inside_a_span(self):
+        instrumentation = Instrumentation()
+        instrumentation.enable()
+        with instrumentation.span("outer"):
+            with instrumentation.span("inner"):
+                instrumentation.reset()
+        with instrumentation.span("next"):
+            instrumentation.count("things")
+
+        tree = instrumentation.timing_tree()
+        self.assertEqual([child["name"] for child in tree["children"]], ["next"])
+        self.assertEqual(tree["children"][0]["counters"], {"things": 1})
+        self.assertEqual(instrumentation.stack(), [instrumentation.root])
+
+    def test_instrumented(self):
+        instrumentation = Instrumentation()
+
+        @instrumentation.instrumented("double")
+        def double(x):
+            return 2 * x
+
+        self.assertEqual(double(2), 4)
+        instrumentation.enable()
+        self.assertEqual(double(3), 6)
+        self.assertEqual(instrumentation.timing_tree()["children"][0]["calls"], 1)
+
+    def test_exports(self):
+        instrumentation = Instrumentation()
+        instrumentation.enable()
+        with instrumentation.span("stage", size=3):
+            instrumentation.count("things")
+
+        with tempfile.TemporaryDirectory() as directory:
+            report_path = os.path.join(directory, "report.json")
+            trace_path = os.path.join(directory, "trace.json")
+            instrumentation.save_json(report_path)
+            instrumentation.save_chrome_trace(trace_path)
+            with open(report_path) as report_file:
+                report = json.load(report_file)
+            with open(trace_path) as trace_file:
+                trace = json.load(trace_file)
+
+        self.assertEqual(report["tree"]["children"][0]["name"], "stage")
+        self.assertEqual(report["counters"], {"things": 1})
+        phases = {event["ph"]: event for event in trace["traceEvents"]}
+        self.assertEqual(phases["X"]["args"], {"size": 3})
+        self.assertEqual(phases["C"]["args"], {"things": 1})
+
+class TestDeviceInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        PROFILER.reset()
+        PROFILER.enable()
+
+    def tearDown(self):
+        PROFILER.disable()
+        PROFILER.reset()
+
+    def test_variance_stages(self):
+        device = QuandelaDeviceFactory().create_local_device("SLOS", DeviceMode.SAMPLER)
+        Variance(device, 3).execute_experiment_variance(generate_fourier_transform_circuit(3))
+
+        variance = PROFILER.timing_tree()["children"][0]
+        self.assertEqual(variance["name"], "variance experiment")
+        self.assertEqual(variance["counters"], {"experiments": 1})
+        stages = [child["name"] for child in variance["children"]]
+        self.assertEqual(stages, ["experiment", "aggregation"])
+        experiment = [child["name"] for child in variance["children"][0]["children"]]
+        self.assertEqual(experiment, ["decomposition", "state parsing", "simulation", "fill_results"])
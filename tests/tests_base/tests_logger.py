@@ -0,0 +1,43 @@
+import unittest
+import io
+import logging
+
+from base.logger import get_logger, lazy, configure_logging, PROJECT_LOGGER_NAME
+
+class TestLogger(unittest.TestCase):
+
+    def setUp(self):
+        self.project_logger = logging.getLogger(PROJECT_LOGGER_NAME)
+        self.level = self.project_logger.level
+
+    def tearDown(self):
+        self.project_logger.setLevel(self.level)
+
+    def test_module_logger(self):
+        self.assertEqual(get_logger("quandela.quandela_devices").name, "quindcert.quandela.quandela_devices")
+
+    def test_lazy_is_not_rendered_when_disabled(self):
+        renders = []
+        def render():
+            renders.append(1)
+            return "matrix"
+
+        logger = get_logger("tests")
+        self.project_logger.setLevel(logging.INFO)
+        logger.debug("%s", lazy(render))
+        self.assertEqual(renders, [])
+
+        with self.assertLogs(logger, level="DEBUG") as logs:
+            logger.debug("Dump %s", lazy(render))
+        self.assertEqual(renders, [1])
+        self.assertIn("Dump matrix", logs.output[0])
+
+    def test_configure_logging(self):
+        stream = io.StringIO()
+        handler = configure_logging(logging.INFO, stream)
+        try:
+            get_logger("tests").debug("hidden")
+            get_logger("tests").info("shown %s", 1)
+        finally:
+            self.project_logger.removeHandler(handler)
+        self.assertEqual(stream.getvalue(), "INFO quindcert.tests: shown 1\n")
@@ -0,0 +1,42 @@
+import unittest
+import itertools
+import math
+import numpy as np
+from base.permanents import permanent, permanents
+
+def naive_permanent(matrix):
+    n = len(matrix)
+    return sum(np.prod([matrix[i, p[i]] for i in range(n)]) for p in itertools.permutations(range(n)))
+
+class TestPermanents(unittest.TestCase):
+
+    def test_permanent_matches_definition(self):
+        rng = np.random.default_rng(0)
+        for n in range(1, 7):
+            matrix = rng.normal(size=(n, n)) + 1j * rng.normal(size=(n, n))
+            self.assertAlmostEqual(permanent(matrix), naive_permanent(matrix))
+
+    def test_permanent_of_ones(self):
+        self.assertAlmostEqual(permanent(np.ones((5, 5))), math.factorial(5))
+        self.assertAlmostEqual(permanent(np.eye(4)), 1)
+
+    def test_batched_and_chunked(self):
+        rng = np.random.default_rng(1)
+        matrices = rng.normal(size=(4, 6, 6))
+        expected = [naive_permanent(matrix) for matrix in matrices]
+        np.testing.assert_array_almost_equal(permanents(matrices), expected)
+        np.testing.assert_array_almost_equal(permanents(matrices, chunk_size=3), expected)
+
+    def test_gray_code_over_many_chunks(self):
+        # 2^11 terms over chunks of 100, so the row sums restart in the middle of the Gray code
+        matrix = np.ones((12, 12))
+        matrix[3, 5] = 2
+        expected = math.factorial(12) + math.factorial(11)
+        self.assertAlmostEqual(permanents(matrix[np.newaxis], chunk_size=100)[0] / expected, 1)
+
+    def test_invalid_shape(self):
+        with self.assertRaises(ValueError):
+            permanents(np.ones((2, 3)))
+
+if __name__ == "__main__":
+    unittest.main()
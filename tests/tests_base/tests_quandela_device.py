@@ -1,4 +1,5 @@
 import unittest
+from unittest.mock import patch
 import perceval as pcvl
 from enum import Enum
 from abc import ABC, abstractmethod
@@ -7,7 +8,9 @@ from typing import List, Dict, Type
 from base.results import StatesAndProbabilities
 from base.devices import DeviceMode
 from quandela.circuit_helpers import generate_fourier_transform_circuit, generate_identity
-from quandela.quandela_devices import QuandelaDeviceFactory
+from quandela.quandela_devices import QuandelaDeviceFactory, QuandelaDevice
+from base.circuit_helpers import generate_fourier_transform_circuit as generate_abstract_fourier_transform_circuit
+from base.circuit_helpers import generate_random_abstract_circuit
 
 
 class TestQuandelaDevice(unittest.TestCase):
@@ -39,7 +42,28 @@ class TestQuandelaDevice(unittest.TestCase):
         circuit = generate_fourier_transform_circuit (3)
         results = self.device.execute_experiment(initial_state, circuit)
         self.assertIsInstance(results, StatesAndProbabilities)
-    
+
+    def test_decomposition_is_reused(self):
+        first = QuandelaDevice.abstract_circuit_to_quandela_circuit (generate_abstract_fourier_transform_circuit (3))
+        second = QuandelaDevice.abstract_circuit_to_quandela_circuit (generate_abstract_fourier_transform_circuit (3))
+        self.assertIsNot (first, second)
+        self.assertIn (generate_abstract_fourier_transform_circuit (3).fingerprint (), QuandelaDevice.decompositions)
+        self.assertEqual (str (first.describe ()), str (second.describe ()))
+
+    def test_decompositions_are_bounded(self):
+        circuits = [generate_random_abstract_circuit (2) for _ in range (3)]
+        QuandelaDevice.clear_decompositions ()
+        with patch.object (QuandelaDevice, "maximum_decompositions", 2):
+            QuandelaDevice.abstract_circuit_to_quandela_circuit (circuits [0])
+            QuandelaDevice.abstract_circuit_to_quandela_circuit (circuits [1])
+            # Using the first circuit again makes the second one the least recently used
+            QuandelaDevice.abstract_circuit_to_quandela_circuit (circuits [0])
+            QuandelaDevice.abstract_circuit_to_quandela_circuit (circuits [2])
+        self.assertEqual (list (QuandelaDevice.decompositions), [circuits [0].fingerprint (), circuits [2].fingerprint ()])
+
+        QuandelaDevice.clear_decompositions ()
+        self.assertEqual (len (QuandelaDevice.decompositions), 0)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from base.results import StatesAndProbabilities
+from base.results_archive import ResultsArchive, load_results, memory_map_npz, save_result_sets, save_results
+from base.state_generation_helpers import occupation_matrix_to_states, states_to_occupation_matrix
+
+def make_results():
+    results = StatesAndProbabilities()
+    results.set_probability_states({"|1,0,2>": 0.25, "|0,3,0>": 0.75})
+    results.set_counting("|1,0,2>", 300)
+    results.set_counting("|2,1,0>", 1)
+    return results
+
+class TestResultsArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "results.npz")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_occupation_matrix_to_states(self):
+        states = ["|1,0,2>", "|0,3,0>", "|0,0,0>"]
+        self.assertEqual(occupation_matrix_to_states(states_to_occupation_matrix(states)), states)
+        self.assertEqual(occupation_matrix_to_states(np.array([[12, 0]])), ["|12,0>"])
+        self.assertEqual(occupation_matrix_to_states(np.zeros((0, 3), dtype=int)), [])
+
+    def test_round_trip(self):
+        other = StatesAndProbabilities()
+        other.set_probability_states({"|1,1>": 1.0})
+        save_result_sets(self.path, {"first": make_results(), "second": other}, {"shots": 300})
+
+        for mmap in (True, False):
+            archive = ResultsArchive(self.path, mmap)
+            self.assertEqual(archive.names, ["first", "second"])
+            self.assertEqual(archive.metadata, {"shots": 300})
+            results = archive.results("first")
+            self.assertEqual(results.states_and_probabilities, make_results().states_and_probabilities)
+            self.assertEqual(results.states_and_countings, make_results().states_and_countings)
+            self.assertEqual(archive.results("second").states_and_probabilities, {"|1,1>": 1.0})
+            np.testing.assert_array_equal(archive.occupations("second"), [[1, 1]])
+            np.testing.assert_array_equal(archive.countings("second"), [-1])
+
+    def test_columns_are_mapped(self):
+        make_results().save(self.path)
+        archive = ResultsArchive(self.path)
+        self.assertIsInstance(archive.columns["probabilities"], np.memmap)
+        self.assertIsInstance(archive.occupations("results"), np.memmap)
+        self.assertEqual(archive.occupations("results").dtype, np.uint8)
+        np.testing.assert_array_equal(archive.probabilities("results")[:2], [0.25, 0.75])
+        self.assertTrue(np.isnan(archive.probabilities("results")[2]))
+        self.assertEqual(StatesAndProbabilities.load(self.path).states_and_countings, make_results().states_and_countings)
+
+        # The mapped arrays are the ones np.load reads
+        with np.load(self.path) as loaded:
+            for name, array in memory_map_npz(self.path).items():
+                np.testing.assert_array_equal(array, loaded[name])
+
+    def test_smaller_than_json(self):
+        rng = np.random.default_rng(0)
+        occupations = rng.integers(0, 3, (2000, 10))
+        results = StatesAndProbabilities()
+        results.set_probability_states(dict(zip(occupation_matrix_to_states(occupations), rng.random(2000).tolist())))
+        save_results(self.path, results)
+        self.assertLess(os.path.getsize(self.path), len(json.dumps(results.states_and_probabilities)))
+        self.assertEqual(load_results(self.path).states_and_probabilities, results.states_and_probabilities)
+
+    def test_compressed_archive(self):
+        np.savez_compressed(self.path, values=np.arange(3))
+        with self.assertRaises(ValueError):
+            memory_map_npz(self.path)
+
+    def test_unknown_set(self):
+        save_results(self.path, make_results())
+        with self.assertRaises(ValueError):
+            ResultsArchive(self.path).results("other")
+
+if __name__ == '__main__':
+    unittest.main()
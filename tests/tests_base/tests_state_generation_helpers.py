@@ -1,4 +1,5 @@
 import unittest
+import itertools
 import numpy as np
 from base.state_generation_helpers import (
     create_dummy_state,
@@ -19,7 +20,11 @@ from base.state_generation_helpers import (
     generate_trivial_orders_for_partitions,
     generate_states_from_orders,
     generate_all_state_combinations,
-    generate_state_combinations_no_orders
+    generate_state_combinations_no_orders,
+    iter_partitions,
+    iter_multiset_permutations,
+    iter_state_combinations,
+    states_to_occupation_matrix
 )
 
 class TestStateGenerationHelpers(unittest.TestCase):
@@ -113,5 +118,38 @@ class TestStateGenerationHelpers(unittest.TestCase):
         expected = {'1 1 1': [[[1, 0, 0], [0, 1, 0], [0, 0, 1]]], '2 1': [[[1, 1, 0], [0, 0, 1]]], '3': [[[1, 1, 1]]]}
         self.assertEqual(states, expected, "State combinations without orders generation failed.")
 
+    def test_iter_partitions(self):
+        for n in range(1, 12):
+            partitions = list(iter_partitions(n))
+            self.assertEqual(len(partitions), len(set(map(tuple, partitions))))
+            self.assertTrue(all(valid(p) and sum(p) == n for p in partitions))
+        self.assertEqual(len(list(iter_partitions(20))), 627)
+
+    def test_iter_multiset_permutations(self):
+        permutations = list(iter_multiset_permutations([3, 1, 1, 2, 2]))
+        self.assertEqual(len(permutations), len(set(permutations)))
+        self.assertEqual(set(permutations), set(itertools.permutations([3, 1, 1, 2, 2])))
+        self.assertEqual(list(iter_multiset_permutations([4])), [(4,)])
+
+    def test_iter_multiset_permutations_is_lazy(self):
+        permutations = iter_multiset_permutations([1] * 10 + [2] * 10)
+        self.assertEqual(len(next(permutations)), 20)
+        self.assertEqual(len(set(itertools.islice(permutations, 1000))), 1000)
+
+    def test_iter_state_combinations(self):
+        combinations = {}
+        for key, states in iter_state_combinations(3):
+            combinations.setdefault(key, []).append(states)
+        expected = generate_all_state_combinations(3)
+        self.assertEqual(set(combinations), set(expected))
+        for key in expected:
+            self.assertEqual(sorted(combinations[key]), sorted(expected[key]))
+        self.assertEqual(dict(iter_state_combinations(4, all_orders=False)), {k: v[0] for k, v in generate_state_combinations_no_orders(4).items()})
+
+    def test_states_to_occupation_matrix(self):
+        matrix = states_to_occupation_matrix(['|1,0,2>', '|0,3,0>'])
+        self.assertEqual(matrix.tolist(), [[1, 0, 2], [0, 3, 0]])
+        self.assertEqual(states_to_occupation_matrix([]).shape, (0, 0))
+
 if __name__ == "__main__":
     unittest.main()
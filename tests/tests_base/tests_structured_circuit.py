@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+from base.abstract_circuit import AbstractCircuit
+from base.circuit_helpers import fourier_matrix, random_unitaries
+from base.structured_circuit import (StructuredCircuit, UnitarityCheck, CircuitFactor, DenseFactor, PermutationFactor, DiagonalPhaseFactor,
+                                     permutation_circuit, phase_circuit, block_diagonal_circuit, fourier_circuit)
+
+def permutation_matrix(permutation):
+    matrix = np.zeros((len(permutation), len(permutation)))
+    for j, i in enumerate(permutation):
+        matrix[i, j] = 1
+    return matrix
+
+class TestStructuredCircuit(unittest.TestCase):
+
+    def setUp(self):
+        self.unitary = random_unitaries(1, 4, np.random.default_rng(0))[0]
+        self.phases = [0.1, 0.2, 0.3, 0.4]
+        self.permutation = [2, 0, 3, 1]
+
+    def test_identity(self):
+        np.testing.assert_array_almost_equal(StructuredCircuit(3).m, np.eye(3))
+
+    def test_structured_factors_match_dense(self):
+        np.testing.assert_array_almost_equal(permutation_circuit(self.permutation).m, permutation_matrix(self.permutation))
+        np.testing.assert_array_almost_equal(phase_circuit(self.phases).m, np.diag(np.exp(1j * np.array(self.phases))))
+        np.testing.assert_array_almost_equal(fourier_circuit(5).m, fourier_matrix(5))
+        hadamard = (1/np.sqrt(2)) * np.array([[1, 1], [1, -1]])
+        np.testing.assert_array_almost_equal(block_diagonal_circuit([hadamard, np.eye(1), hadamard]).m,
+                                             np.block([[hadamard, np.zeros((2, 3))], [np.zeros((1, 2)), np.eye(1), np.zeros((1, 2))],
+                                                       [np.zeros((2, 3)), hadamard]]))
+
+    def test_compose_is_deferred(self):
+        circuit = StructuredCircuit(4, [DenseFactor(self.unitary, verified=True)])
+        circuit.compose(phase_circuit(self.phases))
+        circuit.compose(fourier_circuit(4))
+        circuit.compose(permutation_circuit(self.permutation))
+        self.assertFalse(circuit.is_materialized())
+        self.assertEqual(len(circuit.factors), 4)
+
+        expected = self.unitary @ np.diag(np.exp(1j * np.array(self.phases))) @ fourier_matrix(4) @ permutation_matrix(self.permutation)
+        np.testing.assert_array_almost_equal(circuit.m, expected)
+        self.assertTrue(circuit.is_materialized())
+
+    def test_same_structure_factors_merge(self):
+        circuit = permutation_circuit(self.permutation)
+        circuit.compose(permutation_circuit([1, 2, 3, 0]))
+        circuit.compose(phase_circuit(self.phases))
+        circuit.compose(phase_circuit(self.phases))
+        self.assertEqual(len(circuit.factors), 2)
+        self.assertIsInstance(circuit.factors[0], PermutationFactor)
+        self.assertIsInstance(circuit.factors[1], DiagonalPhaseFactor)
+        expected = permutation_matrix(self.permutation) @ permutation_matrix([1, 2, 3, 0]) @ np.diag(np.exp(2j * np.array(self.phases)))
+        np.testing.assert_array_almost_equal(circuit.m, expected)
+
+    def test_compose_with_abstract_circuit(self):
+        circuit = fourier_circuit(4)
+        circuit.compose(AbstractCircuit(4, self.unitary))
+        np.testing.assert_array_almost_equal(circuit.m, fourier_matrix(4) @ self.unitary)
+
+        dense = AbstractCircuit(4, self.unitary)
+        dense.compose(fourier_circuit(4))
+        np.testing.assert_array_almost_equal(dense.m, self.unitary @ fourier_matrix(4))
+
+    def test_compose_after_materialization(self):
+        circuit = fourier_circuit(4)
+        circuit.m
+        circuit.compose(phase_circuit(self.phases))
+        np.testing.assert_array_almost_equal(circuit.m, fourier_matrix(4) @ np.diag(np.exp(1j * np.array(self.phases))))
+
+    def test_unitarity_check_modes(self):
+        non_unitary = np.array([[1, 2], [3, 4]])
+        with self.assertRaises(ValueError):
+            block_diagonal_circuit([non_unitary]).m
+        with self.assertLogs(level='WARNING'):
+            block_diagonal_circuit([non_unitary], UnitarityCheck.WARN).m
+        np.testing.assert_array_almost_equal(block_diagonal_circuit([non_unitary], UnitarityCheck.SKIP).m, non_unitary)
+
+    def test_invalid_permutation(self):
+        with self.assertRaises(ValueError):
+            permutation_circuit([0, 0, 1])
+
+    def test_dimension_mismatch(self):
+        with self.assertRaises(ValueError):
+            fourier_circuit(3).compose(fourier_circuit(4))
+
+    def test_factor_needs_multiply_right(self):
+        with self.assertRaises(TypeError):
+            CircuitFactor(3)
+
+if __name__ == "__main__":
+    unittest.main()
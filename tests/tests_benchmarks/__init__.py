@@ -0,0 +1,3 @@
+from .test_harness import *
+from .test_backends import *
+from .test_imports import *
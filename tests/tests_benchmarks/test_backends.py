@@ -0,0 +1,32 @@
+import unittest
+
+from base.devices import DeviceMode
+from benchmarks.backends import benchmark_backends, exact_values, recommend_backends
+
+
+class TestBackendBenchmark(unittest.TestCase):
+
+    def test_exact_values(self):
+        values = exact_values(3)
+        self.assertAlmostEqual(values["bunching"], 2/3)
+        # |1,1,1> through the 3 mode Fourier circuit gives |1,1,1> with probability 1/3 and a fully bunched state otherwise
+        self.assertAlmostEqual(values["variance"], 4/3)
+
+    def test_benchmark_and_recommend(self):
+        measurements = benchmark_backends([2], [DeviceMode.SAMPLER], ["SLOS", "Unknown"], number_of_samples=200)
+        self.assertEqual(len(measurements), 2)
+        self.assertTrue(measurements[0]["accurate"])
+        self.assertIn("error", measurements[1])
+
+        recommendations = recommend_backends(measurements)
+        self.assertEqual(recommendations.recommend(2, 2, DeviceMode.SAMPLER), "SLOS")
+        self.assertIsNone(recommendations.recommend(2, 2, DeviceMode.ANALYZER))
+
+    def test_recommend_fastest_accurate(self):
+        measurements = [{"backend": "A", "mode": "Sampler", "photons": 3, "modes": 3, "time": 1.0, "accurate": True},
+                        {"backend": "B", "mode": "Sampler", "photons": 3, "modes": 3, "time": 0.1, "accurate": False},
+                        {"backend": "C", "mode": "Sampler", "photons": 3, "modes": 3, "time": 0.5, "accurate": True}]
+        self.assertEqual(recommend_backends(measurements).recommend(3, 3, DeviceMode.SAMPLER), "C")
+
+if __name__ == '__main__':
+    unittest.main()
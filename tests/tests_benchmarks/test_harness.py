@@ -0,0 +1,47 @@
+import unittest
+import os
+import tempfile
+
+from benchmarks.harness import BenchmarkCase, append_to_history, compare_runs, load_history, measure, run_cases
+from benchmarks.cases import get_cases
+
+
+class TestBenchmarkHarness(unittest.TestCase):
+
+    def setUp(self):
+        self.case = BenchmarkCase("list", lambda number_of_modes: number_of_modes, lambda n: list(range(1000 * n)), modes=[2, 3], repeats=2)
+
+    def test_measure(self):
+        measurement = measure(self.case, 3)
+        self.assertEqual(measurement["case"], "list")
+        self.assertEqual(len(measurement["wall_times"]), 2)
+        self.assertGreater(measurement["peak_memory"], 3000)
+        self.assertGreater(measurement["allocated_blocks"], 0)
+
+    def test_history(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "history.json")
+            self.assertEqual(load_history(path), [])
+            append_to_history(path, run_cases([self.case], modes=[2]))
+            append_to_history(path, run_cases([self.case]))
+            history = load_history(path)
+            self.assertEqual([len(run["results"]) for run in history], [1, 2])
+
+    def test_compare_runs(self):
+        baseline = {"results": [{"case": "a", "modes": 2, "wall_time": 1.0, "peak_memory": 100},
+                                {"case": "b", "modes": 2, "wall_time": 1.0, "peak_memory": 100}]}
+        current = {"results": [{"case": "a", "modes": 2, "wall_time": 1.1, "peak_memory": 100},
+                               {"case": "b", "modes": 2, "wall_time": 1.5, "peak_memory": 100},
+                               {"case": "c", "modes": 2, "wall_time": 1.0, "peak_memory": 100}]}
+        comparisons = compare_runs(baseline, current, threshold=0.2)
+        self.assertEqual([(comparison["case"], comparison["regressed"]) for comparison in comparisons], [("a", False), ("b", True)])
+
+    def test_cases_run_offline(self):
+        for case in get_cases():
+            if case.name != "approximate_with_MZ":
+                measure(case, 3, repeats=1)
+        with self.assertRaises(ValueError):
+            get_cases(["unknown"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+from benchmarks.imports import LIGHT_MODULES, find_import_regressions, measure_import
+
+
+class TestImports(unittest.TestCase):
+
+    def test_light_modules_do_not_import_perceval(self):
+        measurements = [measure_import(module, repeats=1) for module in LIGHT_MODULES]
+        self.assertEqual([measurement["module"] for measurement in find_import_regressions(measurements)], [])
+
+    def test_perceval_integration(self):
+        measurement = measure_import("quandela.quandela_devices", repeats=1)
+        self.assertTrue(measurement["perceval"])
+        self.assertFalse(measurement["light"])
+
+    def test_budget(self):
+        measurements = [{"module": "base", "time": 0.5, "perceval": False, "light": True}]
+        self.assertEqual(find_import_regressions(measurements), [])
+        self.assertEqual(len(find_import_regressions(measurements, budget=0.1)), 1)
+
+    def test_lazy_package_attributes(self):
+        import base
+        self.assertIn("FockSpaceIndex", base.__all__)
+        self.assertIs(base.FockSpaceIndex, __import__("base.fock_space", fromlist=["FockSpaceIndex"]).FockSpaceIndex)
+        self.assertTrue(callable(base.permanent))
+        with self.assertRaises(AttributeError):
+            base.not_an_attribute
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,3 @@
+from .tests_plan import *
+from .tests_checkpoints import *
+from .tests_runner import *
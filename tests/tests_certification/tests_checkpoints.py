@@ -0,0 +1,85 @@
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from base.devices import Device, DeviceMode
+from base.results import StatesAndProbabilities
+from base.results_archive import ResultsArchive
+from certification.checkpoints import CheckpointStore, CheckpointedDevice, results_from_dict, results_to_dict
+from base.circuit_helpers import generate_fourier_transform_circuit
+
+def make_results():
+    results = StatesAndProbabilities()
+    results.set_probability_states({"|1,1>": 0.25, "|2,0>": 0.75})
+    results.set_counting("|1,1>", 25)
+    results.set_counting("|2,0>", 75)
+    return results
+
+class TestCheckpointStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = CheckpointStore(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_results_round_trip(self):
+        results = results_from_dict(results_to_dict(make_results()))
+        self.assertEqual(results.states_and_probabilities, make_results().states_and_probabilities)
+        self.assertEqual(results.states_and_countings, make_results().states_and_countings)
+
+    def test_experiment_key(self):
+        circuit = generate_fourier_transform_circuit(2)
+        key = CheckpointStore.experiment_key("SLOS", "|1,1>", circuit, DeviceMode.SAMPLER, 100)
+        self.assertEqual(key, CheckpointStore.experiment_key("SLOS", "|1,1>", generate_fourier_transform_circuit(2), DeviceMode.SAMPLER, 100))
+        self.assertNotEqual(key, CheckpointStore.experiment_key("SLOS", "|2,0>", circuit, DeviceMode.SAMPLER, 100))
+        self.assertNotEqual(key, CheckpointStore.experiment_key("SLOS", "|1,1>", circuit, DeviceMode.SAMPLER, 200))
+        self.assertNotEqual(key, CheckpointStore.experiment_key("Naive", "|1,1>", circuit, DeviceMode.SAMPLER, 100))
+
+    def test_experiments_and_tasks(self):
+        self.assertIsNone(self.store.load_experiment("key"))
+        self.store.save_experiment("key", make_results())
+        self.assertEqual(self.store.load_experiment("key").states_and_probabilities, make_results().states_and_probabilities)
+        self.assertEqual(self.store.number_of_experiments(), 1)
+
+        self.assertIsNone(self.store.load_task("variance-m2"))
+        self.store.save_task("variance-m2", {"indistinguishable": 1.0})
+        self.assertEqual(self.store.load_task("variance-m2"), {"indistinguishable": 1.0})
+        self.assertEqual(self.store.completed_tasks(), ["variance-m2"])
+
+    def test_archive_experiments(self):
+        self.store.save_experiment("key", make_results(), {"label": "SLOS"})
+        path = self.store.directory + "/experiments.npz"
+        self.assertEqual(self.store.archive_experiments(path), 1)
+        archive = ResultsArchive(path)
+        self.assertEqual(archive.metadata, {"experiments": {"key": {"label": "SLOS"}}})
+        self.assertEqual(archive.results("key").states_and_countings, make_results().states_and_countings)
+
+class TestCheckpointedDevice(unittest.TestCase):
+
+    def test_replay(self):
+        wrapped = MagicMock(spec=Device)
+        wrapped.mode = DeviceMode.SAMPLER
+        wrapped.number_of_samples = 100
+        wrapped.execute_experiment.return_value = make_results()
+        circuit = generate_fourier_transform_circuit(2)
+
+        with tempfile.TemporaryDirectory() as directory:
+            device = CheckpointedDevice(wrapped, CheckpointStore(directory), "SLOS")
+            self.assertEqual(device.number_of_samples, 100)
+            device.execute_experiment("|1,1>", circuit)
+            replayed = device.execute_experiment("|1,1>", generate_fourier_transform_circuit(2))
+
+            # A fresh device on the same store, as after a restart, replays too
+            restarted = CheckpointedDevice(wrapped, CheckpointStore(directory), "SLOS")
+            restarted.set_initial_state("|1,1>")
+            restarted.set_circuit(circuit)
+            restarted.execute_experiment_()
+
+        self.assertEqual(wrapped.execute_experiment.call_count, 1)
+        self.assertEqual((device.executed, device.replayed, restarted.replayed), (1, 1, 1))
+        self.assertEqual(replayed.states_and_probabilities, make_results().states_and_probabilities)
+
+if __name__ == '__main__':
+    unittest.main()
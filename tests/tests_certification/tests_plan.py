@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+
+from base.devices import DeviceMode
+from certification.plan import CertificationMeasure, CertificationPlan
+
+class TestCertificationPlan(unittest.TestCase):
+
+    def test_tasks(self):
+        plan = CertificationPlan(modes=[2, 3], measures=[CertificationMeasure.VARIANCE, CertificationMeasure.BUNCHING])
+        self.assertEqual([task.key for task in plan.tasks()], ["variance-m2", "variance-m3", "bunching-m2", "bunching-m3"])
+        self.assertEqual(len(CertificationPlan().tasks()), len(CertificationMeasure))
+
+    def test_round_trip(self):
+        plan = CertificationPlan("Naive", DeviceMode.ANALYZER, [4], [CertificationMeasure.OVERLAPS], 5, 200, 7, 2)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "plan.json")
+            plan.save(path)
+            loaded = CertificationPlan.load(path)
+        self.assertEqual(loaded.to_dict(), plan.to_dict())
+        self.assertEqual(loaded.device_mode, DeviceMode.ANALYZER)
+        self.assertEqual(loaded.measures, [CertificationMeasure.OVERLAPS])
+
+    def test_defaults_from_partial_dict(self):
+        plan = CertificationPlan.from_dict({"modes": [2]})
+        self.assertEqual(plan.backend, "SLOS")
+        self.assertEqual(plan.measures, list(CertificationMeasure))
+
+    def test_invalid_plan(self):
+        with self.assertRaises(ValueError):
+            CertificationPlan(shots=0)
+        with self.assertRaises(ValueError):
+            CertificationPlan(workers=0)
+
+if __name__ == '__main__':
+    unittest.main()
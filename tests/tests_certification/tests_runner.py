@@ -0,0 +1,84 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from base.circuit_helpers import generate_fourier_transform_circuit
+from base.experiment_plan import ExperimentPlan
+from certification.checkpoints import CheckpointedDevice, CheckpointStore
+from certification.cli import main
+from certification.plan import CertificationMeasure, CertificationPlan
+from certification.runner import CertificationRunner, create_device
+
+class TestCertificationRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = CheckpointStore(os.path.join(self.directory.name, "store"))
+        self.plan = CertificationPlan(modes=[2], measures=[CertificationMeasure.BUNCHING, CertificationMeasure.VARIANCE], shots=100)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_run(self):
+        outcomes = []
+        results = CertificationRunner(self.plan, self.store).run(report=lambda task, outcome: outcomes.append(outcome))
+        self.assertEqual(set(results), {"bunching-m2", "variance-m2"})
+        self.assertAlmostEqual(results["bunching-m2"]["indistinguishable"], 1.0)
+        self.assertAlmostEqual(results["bunching-m2"]["distinguishable"], 0.5, delta=0.2)
+        # The bunching and the variance share their experiments, run once
+        self.assertEqual(len(outcomes), 1)
+        self.assertEqual((outcomes[0]["requested"], outcomes[0]["executed"]), (6, 3))
+
+    def test_resume(self):
+        runner = CertificationRunner(self.plan, self.store)
+        runner.run()
+        experiments = self.store.number_of_experiments()
+
+        # An interrupted run lost its variance task but kept the experiments
+        os.remove(os.path.join(self.store.tasks_directory, "variance-m2.json"))
+        self.assertEqual([task.key for task in runner.pending_tasks()], ["variance-m2"])
+        self.assertEqual([[task.key for task in batch] for batch in runner.pending_batches()], [["variance-m2"]])
+        outcomes = []
+        results = runner.run(report=lambda task, outcome: outcomes.append(outcome))
+        self.assertEqual(len(outcomes), 1)
+        self.assertEqual(outcomes[0]["executed"], 0)
+        self.assertEqual(self.store.number_of_experiments(), experiments)
+        self.assertEqual(set(results), {"bunching-m2", "variance-m2"})
+
+    def test_planned_number_of_samples_reaches_the_device(self):
+        wrapped = create_device(self.plan)
+        device = CheckpointedDevice(wrapped, self.store, self.plan.backend)
+        experiments = ExperimentPlan()
+        key = experiments.request("|1,1>", generate_fourier_transform_circuit(2), number_of_samples=50)
+        experiments.execute(device)
+
+        self.assertEqual(sum(experiments.get(key).states_and_countings.values()), 50)
+        self.assertEqual(wrapped.number_of_samples, 100)
+        self.assertNotIn("number_of_samples", vars(device))
+        # The experiment is checkpointed under the number of samples it ran with
+        wrapped.number_of_samples = 50
+        self.assertIsNotNone(self.store.load_experiment(device.experiment_key("|1,1>", generate_fourier_transform_circuit(2))))
+
+    def test_batches(self):
+        plan = CertificationPlan(modes=[2, 3])
+        batches = CertificationRunner(plan, self.store).pending_batches()
+        self.assertEqual([[task.key for task in batch] for batch in batches],
+                         [["bunching-m2", "variance-m2"], ["bunching-m3", "variance-m3"], ["tomography-m2"], ["tomography-m3"],
+                          ["overlaps-m2"], ["overlaps-m3"]])
+
+    def test_command_line(self):
+        plan = os.path.join(self.directory.name, "plan.json")
+        output = os.path.join(self.directory.name, "results.json")
+        with redirect_stdout(io.StringIO()) as stdout:
+            self.assertEqual(main(["init", plan, "--modes", "2", "--measures", "variance", "--shots", "100"]), 0)
+            self.assertEqual(main(["run", plan, "--store", self.store.directory, "--output", output]), 0)
+            self.assertEqual(main(["plan", plan, "--store", self.store.directory]), 0)
+        self.assertIn("variance-m2                    done", stdout.getvalue())
+        with open(output) as results_file:
+            self.assertIn("variance-m2", json.load(results_file))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,2 +1,4 @@
 from .tests_bunching_calculator import *
-from .tests_variance_calculation import *
\ No newline at end of file
+from .tests_variance_calculation import *
+from .tests_distinguishable_photons import *
+from .tests_sweeps import *
\ No newline at end of file
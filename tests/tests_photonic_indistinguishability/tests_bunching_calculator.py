@@ -1,10 +1,12 @@
 import unittest
 from unittest.mock import MagicMock, patch
+import numpy as np
 from base.results import StatesAndProbabilities
 from base.circuit_helpers import generate_fourier_transform_circuit
 from base.state_generation_helpers import generate_state_from_list
 from base.devices import Device, DeviceMode
-from photonic_indistinguishability_measures.bunching import BunchingCalculator
+from photonic_indistinguishability_measures.bunching import BunchingCalculator, BunchingMode
+from base.circuit_helpers import random_unitaries
 from quandela.quandela_devices import QuandelaDeviceFactory, QuandelaLocalDevices
 
 class TestBunchingCalculator(unittest.TestCase):
@@ -49,17 +51,16 @@ class TestBunchingCalculator(unittest.TestCase):
         self.assertEqual(result, 0.8)
 
     @patch.object(BunchingCalculator, 'make_bunching_experiment')
-    @patch.object(BunchingCalculator, 'calculate_bunching_probability')
-    def test_do_the_experiments_for_full_bunching_distinguishable_case(self, mock_calculate_bunching_probability, mock_make_bunching_experiment):
+    def test_do_the_experiments_for_full_bunching_distinguishable_case(self, mock_make_bunching_experiment):
         self.calculator.number_of_modes = 3
-        mock_make_bunching_experiment.return_value = StatesAndProbabilities()
-        mock_calculate_bunching_probability.return_value = 0.9
+        single_photon_results = StatesAndProbabilities()
+        single_photon_results.set_probability_states({'|1,0,0>': 1/3, '|0,1,0>': 1/3, '|0,0,1>': 1/3})
+        mock_make_bunching_experiment.return_value = single_photon_results
 
         result = self.calculator.do_the_experiments_for_full_bunching_distinguishable_case()
 
         self.assertEqual(mock_make_bunching_experiment.call_count, 3)
-        mock_calculate_bunching_probability.assert_called_once()
-        self.assertEqual(result, 0.9)
+        self.assertAlmostEqual(result, 1/9)
     
     def test_calculate_full_bunching_distinguishable_case (self):
         probability_results = {
@@ -77,6 +78,56 @@ class TestBunchingCalculator(unittest.TestCase):
         result = self.calculator.calculate_full_bunching_probability (states_and_probabilities, 3)
         self.assertEqual(result, 1/9)
     
+    def test_calculate_bunching_statistics (self):
+        probability_results = {
+            '|3,0,0>': 0.1,
+            '|2,1,0>': 0.2,
+            '|1,1,1>': 0.3,
+            '|0,1,2>': 0.25,
+            '|0,0,3>': 0.15
+        }
+        s = StatesAndProbabilities ()
+        s.set_probability_states (probability_results)
+
+        statistics = self.calculator.calculate_bunching_statistics (s, [[0, 1], [2], [1, 2]])
+        np.testing.assert_array_almost_equal (statistics ["curve"], [1, 1, 0.7, 0.25])
+        self.assertAlmostEqual (statistics ["full_bunching"], 0.25)
+        np.testing.assert_array_almost_equal (statistics ["subsets"], [0.3, 0.15, 0.4])
+
+        for k in range (5):
+            old_style = sum (p for state, p in probability_results.items () if max (int (o) for o in state [1:-1].split (",")) >= k)
+            self.assertAlmostEqual (self.calculator.calculate_bunching_probability (s, k), old_style)
+        np.testing.assert_array_almost_equal (self.calculator.calculate_subset_bunching_probabilities (s, [[0]]), [0.1])
+
+    def test_subset_bunching_analytically_matches_simulation (self):
+        import perceval as pcvl
+        from perceval.backends import SLOSBackend
+
+        unitary = random_unitaries (1, 4, np.random.default_rng (1)) [0]
+        backend = SLOSBackend ()
+        backend.set_circuit (pcvl.Unitary (pcvl.Matrix (unitary)))
+        backend.set_input_state (pcvl.BasicState ([1, 1, 0, 1]))
+        distribution = backend.prob_distribution ()
+
+        subsets = [[0, 2], [1], [1, 2, 3], [0, 1, 2, 3]]
+        expected = [sum (p for state, p in distribution.items () if all (state [i] == 0 for i in range (4) if i not in subset)) for subset in subsets]
+        result = BunchingCalculator.calculate_subset_bunching_probabilities_analytically (unitary, subsets, input_modes=[0, 1, 3])
+        np.testing.assert_array_almost_equal (result, expected)
+
+        full_bunching = sum (p for state, p in distribution.items () if max (state) == 3)
+        self.assertAlmostEqual (BunchingCalculator.calculate_full_bunching_probability_analytically (unitary, [0, 1, 3]), full_bunching)
+
+    def test_subset_bunching_analytically_distinguishable (self):
+        unitary = random_unitaries (1, 3, np.random.default_rng (2)) [0]
+        result = BunchingCalculator.calculate_subset_bunching_probabilities_analytically (unitary, [[0, 1]], gram_matrix=np.eye (3))
+        self.assertAlmostEqual (result [0], np.prod (np.sum (np.abs (unitary [[0, 1]]) ** 2, axis=0)))
+
+    def test_analytic_mode (self):
+        bc = BunchingCalculator (self.device, 3, BunchingMode.ANALYTIC)
+        self.assertAlmostEqual (bc.do_the_experiments_for_full_bunching_indistinguishable_case (), 2/3)
+        self.assertAlmostEqual (bc.do_the_experiments_for_full_bunching_distinguishable_case (), 1/9)
+        self.device.execute_experiment.assert_not_called ()
+
     def test_fb_indistinguishable_vs_distinguishable (self):
         number_of_modes = 3
 
@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+
+from base.circuit_helpers import generate_fourier_transform_circuit, random_unitaries
+from base.results import StatesAndProbabilities
+from base.state_generation_helpers import generate_state_from_list, state_to_list
+from photonic_indistinguishability_measures.bunching import BunchingCalculator
+from photonic_indistinguishability_measures.distinguishable import DistinguishablePhotons
+
+
+def single_photon_results(row):
+    results = StatesAndProbabilities()
+    for mode, probability in enumerate(row):
+        results.set_probability(generate_state_from_list([1 if j == mode else 0 for j in range(len(row))]), probability)
+    return results
+
+
+class TestDistinguishablePhotons(unittest.TestCase):
+
+    def setUp(self):
+        self.unitary = random_unitaries(1, 4, np.random.default_rng(3))[0]
+        self.photons = DistinguishablePhotons.from_unitary(self.unitary)
+
+        # The joint distribution the repo used to build with StatesAndProbabilities.aggregate
+        self.aggregated = StatesAndProbabilities()
+        for row in self.photons.transmissions:
+            self.aggregated.aggregate(single_photon_results(row).get_probabilities())
+
+    def test_joint_distribution(self):
+        joint = self.photons.joint_distribution()
+        self.assertEqual(len(joint.get_probability_states()), len(self.aggregated.get_probability_states()))
+        for state in self.aggregated.get_probability_states():
+            self.assertAlmostEqual(joint.get_probability(state), self.aggregated.get_probability(state))
+
+    def test_occupation_statistics(self):
+        states = self.aggregated.get_probability_states()
+        patterns = np.array([state_to_list(state) for state in states])
+        probabilities = np.array([self.aggregated.get_probability(state) for state in states])
+        means = probabilities @ patterns
+        np.testing.assert_array_almost_equal(self.photons.mean_occupations(), means)
+        np.testing.assert_array_almost_equal(self.photons.occupation_variances(), probabilities @ (patterns - means) ** 2)
+
+    def test_bunching_curve(self):
+        expected = BunchingCalculator(None, 4).calculate_bunching_statistics(self.aggregated)["curve"]
+        np.testing.assert_array_almost_equal(self.photons.bunching_curve(), expected)
+        self.assertAlmostEqual(self.photons.full_bunching_probability(), expected[4])
+        self.assertAlmostEqual(self.photons.bunching_probability(2), expected[2])
+
+    def test_bunching_curve_builds_the_pairs_once(self):
+        expected = [1] + [1 - self.photons.probability_of_max_occupation_at_most(k - 1) for k in range(1, 5)]
+        with patch.object(DistinguishablePhotons, 'photon_subset_pairs', wraps=self.photons.photon_subset_pairs) as pairs:
+            curve = self.photons.bunching_curve()
+        self.assertEqual(pairs.call_count, 1)
+        np.testing.assert_array_almost_equal(curve, expected)
+        np.testing.assert_array_almost_equal(self.photons.probabilities_of_max_occupation_at_most([-1, 1, 4]),
+                                             [0, self.photons.probability_of_max_occupation_at_most(1), 1])
+
+    def test_bunching_curve_of_identical_rows(self):
+        photons = DistinguishablePhotons.from_unitary(generate_fourier_transform_circuit(3).m)
+        # 3 photons in 3 modes uniformly: 6 of the 27 outcomes have no bunching, 3 are fully bunched
+        np.testing.assert_array_almost_equal(photons.bunching_curve(), [1, 1, 21/27, 3/27])
+
+    def test_bunching_of_many_photons(self):
+        rows = np.random.default_rng(4).random((DistinguishablePhotons.MAXIMUM_PHOTONS_OF_THE_GENERAL_CASE + 2, 3))
+        with self.assertRaises(ValueError):
+            DistinguishablePhotons(rows).bunching_probability(2)
+        # Identical rows do not need the sets of photons
+        photons = DistinguishablePhotons(np.ones_like(rows))
+        self.assertAlmostEqual(photons.bunching_probability(2), 1)
+
+    def test_subset_bunching_probabilities(self):
+        expected = np.prod(np.sum(np.abs(self.unitary[[0, 2]]) ** 2, axis=0))
+        self.assertAlmostEqual(self.photons.subset_bunching_probabilities([[0, 2]])[0], expected)
+
+    def test_from_results(self):
+        photons = DistinguishablePhotons.from_results([single_photon_results(row) for row in 2 * self.photons.transmissions], 4)
+        np.testing.assert_array_almost_equal(photons.transmissions, self.photons.transmissions)
+
+    def test_invalid_transmissions(self):
+        with self.assertRaises(ValueError):
+            DistinguishablePhotons([[0, 0], [1, 0]])
+        with self.assertRaises(ValueError):
+            DistinguishablePhotons([1, 0])
+
+if __name__ == '__main__':
+    unittest.main()
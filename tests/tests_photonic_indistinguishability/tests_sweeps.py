@@ -0,0 +1,100 @@
+import itertools
+import unittest
+import tempfile
+import numpy as np
+import perceval as pcvl
+
+from base.circuit_helpers import constant_matrix_gram_matrix, generate_matrix_from_parameters, generate_fourier_transform_circuit
+from photonic_indistinguishability_measures.bunching import BunchingCalculator
+from photonic_indistinguishability_measures.sweeps import GramFamily, ParameterGrid, SweepMetric, SweepResults, SweepRunner
+from photonic_indistinguishability_measures.variance import Variance
+
+
+class TestSweeps(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_grid(self):
+        grid = ParameterGrid(GramFamily.PARAMETERS, {"gamma": [0.1, 0.2], "beta": [0.3], "alpha": [0.4, 0.5, 0.6], "phi": [0.7]})
+        self.assertEqual(grid.size, 6)
+        parameters = grid.parameters(4, 5)
+        np.testing.assert_array_almost_equal([parameters[name][0] for name in grid.names], [0.2, 0.3, 0.5, 0.7])
+        np.testing.assert_array_almost_equal(grid.gram_matrices(4, 5)[0], generate_matrix_from_parameters(0.2, 0.3, 0.5, 0.7))
+
+        with self.assertRaises(ValueError):
+            ParameterGrid(GramFamily.CONSTANT, {"gamma": [0.1]})
+
+    def test_expected_variance(self):
+        values = np.linspace(0, 1, 11)
+        grid = ParameterGrid(GramFamily.CONSTANT, {"v": values}, number_of_modes=4)
+        SweepRunner(chunk_size=4).run(grid, SweepMetric.EXPECTED_VARIANCE, self.directory.name)
+
+        results = SweepResults.load(self.directory.name)
+        self.assertEqual(len(results), 11)
+        self.assertEqual(results.metadata["completed"], 11)
+        np.testing.assert_array_almost_equal(results["v"], values)
+        expected = [Variance.calculate_expected_value_of_the_expected_variance(constant_matrix_gram_matrix(4, v), 4) for v in values]
+        np.testing.assert_array_almost_equal(results["expected_variance"], expected)
+
+    def test_bunching_probability(self):
+        grid = ParameterGrid(GramFamily.CONSTANT, {"v": [0, 0.25, 1]})
+        results = SweepRunner().run(grid, SweepMetric.BUNCHING_PROBABILITY, self.directory.name)
+        unitary = generate_fourier_transform_circuit(3).m
+        expected = [BunchingCalculator.calculate_full_bunching_probability_analytically(unitary, gram_matrix=np.sqrt(constant_matrix_gram_matrix(3, v)))
+                    for v in [0, 0.25, 1]]
+        np.testing.assert_array_almost_equal(results["bunching_probability"], expected)
+
+    def test_bunching_probability_with_phases(self):
+        # The photons of the PARAMETERS family in their internal states, each internal state on its own copy of the Fourier circuit
+        gamma, beta, alpha, phi = 0.5, 0.5, 0.5, 0.5
+        g, b, a = gamma * np.pi / 2, beta * np.pi / 2, alpha * np.pi / 2
+        internal_states = [np.array([1, 0, 0]), np.array([np.cos(b), np.sin(b) * np.sin(a) * np.exp(-1j * phi * np.pi), np.sin(b) * np.cos(a)]),
+                           np.array([np.cos(g), np.sin(g), 0])]
+        input_state = pcvl.StateVector()
+        for internal_modes in itertools.product(range(3), repeat=3):
+            occupations = [0] * 9
+            for photon, internal_mode in enumerate(internal_modes):
+                occupations[3 * photon + internal_mode] += 1
+            amplitude = np.prod([internal_states[photon][internal_mode] for photon, internal_mode in enumerate(internal_modes)])
+            input_state += complex(amplitude) * pcvl.StateVector(pcvl.BasicState(occupations))
+        simulator = pcvl.Simulator(pcvl.SLOSBackend())
+        simulator.set_circuit(pcvl.Unitary(pcvl.Matrix(np.kron(generate_fourier_transform_circuit(3).m, np.eye(3)))))
+        expected = sum(probability for state, probability in simulator.probs(input_state).items()
+                       if max(sum(list(state)[3 * mode:3 * mode + 3]) for mode in range(3)) == 3)
+
+        grid = ParameterGrid(GramFamily.PARAMETERS, {"gamma": [gamma], "beta": [beta], "alpha": [alpha], "phi": [phi]})
+        results = SweepRunner().run(grid, SweepMetric.BUNCHING_PROBABILITY, self.directory.name)
+        self.assertAlmostEqual(expected, 0.3194444, places=6)
+        self.assertAlmostEqual(results["bunching_probability"][0], expected, places=6)
+
+        overlaps = grid.overlap_matrices(0, 1)[0]
+        self.assertAlmostEqual(BunchingCalculator.calculate_full_bunching_probability_analytically(generate_fourier_transform_circuit(3).m, gram_matrix=overlaps),
+                               expected, places=6)
+        np.testing.assert_array_almost_equal(np.abs(overlaps) ** 2, grid.gram_matrices(0, 1)[0])
+
+    def test_bunching_probability_needs_overlaps(self):
+        grid = ParameterGrid(GramFamily.RANDOM, {"sample": np.arange(2)}, seed=1)
+        with self.assertRaises(ValueError):
+            grid.overlap_matrices(0, 2)
+        with self.assertRaises(ValueError):
+            SweepRunner().run(grid, SweepMetric.BUNCHING_PROBABILITY, self.directory.name)
+
+    def test_variance_of_expected_variance_in_pool(self):
+        grid = ParameterGrid(GramFamily.RANDOM, {"sample": np.arange(5)}, seed=1)
+        results = SweepRunner(chunk_size=2, max_workers=2).run(grid, SweepMetric.VARIANCE_OF_EXPECTED_VARIANCE, self.directory.name)
+
+        gram_matrices = np.concatenate([grid.gram_matrices(start, stop) for start, stop in grid.chunks(2)])
+        expected = [Variance.calculate_variance_value_of_the_expected_variance(gram_matrix, 3) for gram_matrix in gram_matrices]
+        np.testing.assert_array_almost_equal(results["variance_of_expected_variance"], expected)
+
+    def test_custom_metric(self):
+        grid = ParameterGrid(GramFamily.CONSTANT, {"v": [0.1, 0.2]})
+        results = SweepRunner(max_workers=0).run(grid, np.trace, self.directory.name, "trace")
+        np.testing.assert_array_almost_equal(results["trace"], [3, 3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,11 @@
 import unittest
 from unittest.mock import MagicMock, patch
+import numpy as np
 
 from base.results import StatesAndProbabilities
 from base.state_generation_helpers import generate_state_from_list
-from base.circuit_helpers import generate_fourier_transform_circuit
-from base.devices import Device
+from base.circuit_helpers import generate_fourier_transform_circuit, generate_random_abstract_circuit_stack
+from base.devices import Device, DeviceMode
 from photonic_indistinguishability_measures.variance import Variance
 
 class TestVariance(unittest.TestCase):
@@ -44,15 +45,23 @@ class TestVariance(unittest.TestCase):
         expected = 1 + (1 / (3 * (3 + 1))) * sum_overlaps_ab - (2 / (3 + 1))
         self.assertAlmostEqual(result, expected)
 
-    @patch.object(Variance, 'calculate_expected_variance')
-    def test_execute_experiment_variance_distinguishable_scenario(self, mock_calculate_expected_variance):
-        mock_calculate_expected_variance.return_value = 0.9
+    def test_execute_experiment_variance_distinguishable_scenario(self):
+        single_photon_results = StatesAndProbabilities()
+        single_photon_results.set_probability_states({'|1,0,0>': 1/3, '|0,1,0>': 1/3, '|0,0,1>': 1/3})
+        self.device.execute_experiment.return_value = single_photon_results
 
         result = self.variance_calculator.execute_experiment_variance_distinguishable_scenario(3)
 
         self.assertEqual(self.device.execute_experiment.call_count, 3)
-        mock_calculate_expected_variance.assert_called_once()
-        self.assertEqual(result, 0.9)
+        self.assertAlmostEqual(result, 2/3)
+
+    def test_execute_experiment_variance_distinguishable_scenario_from_transmissions(self):
+        transmissions = np.abs(generate_fourier_transform_circuit(3).m) ** 2
+
+        result = self.variance_calculator.execute_experiment_variance_distinguishable_scenario(3, transmissions)
+
+        self.device.execute_experiment.assert_not_called()
+        self.assertAlmostEqual(result, 2/3)
 
     @patch.object(Variance, 'calculate_expected_variance')
     def test_execute_experiment_variance_indistinguishable_scenario(self, mock_calculate_expected_variance):
@@ -64,5 +73,44 @@ class TestVariance(unittest.TestCase):
         mock_calculate_expected_variance.assert_called_once()
         self.assertEqual(result, 0.8)
 
+    def test_calculate_variance_of_expected_variance_estimate(self):
+        results = StatesAndProbabilities()
+        for state, probability in [('|2,0,0>', 0.5), ('|1,1,0>', 0.25), ('|0,0,2>', 0.25)]:
+            results.set_probability(state, probability)
+        self.assertEqual(self.variance_calculator.calculate_variance_of_expected_variance_estimate(results, 3), 0.0)
+
+        for state, counting in [('|2,0,0>', 50), ('|1,1,0>', 25), ('|0,0,2>', 25)]:
+            results.set_counting(state, counting)
+        # Each sample moves the estimate by (1/3) sum_j (n_j^2 - 2 E[n_j] n_j): -1/3, -1/3 and 2/3, whose variance is 3/16
+        expected = (3 / 16) / 100
+        self.assertAlmostEqual(self.variance_calculator.calculate_variance_of_expected_variance_estimate(results, 3), expected)
+
+    def test_calculate_variance_of_expected_variance_estimate_exact_results(self):
+        results = StatesAndProbabilities()
+        for state, probability in [('|2,0,0>', 0.5), ('|1,1,0>', 0.25), ('|0,0,2>', 0.25)]:
+            results.set_probability(state, probability)
+        self.device.number_of_samples = 1000
+        self.assertEqual(self.variance_calculator.calculate_variance_of_expected_variance_estimate(results, 3), 0.0)
+
+        self.device.mode = DeviceMode.ANALYZER
+        self.assertEqual(self.variance_calculator.calculate_variance_of_expected_variance_estimate(results, 3, number_of_samples=1000), 0.0)
+        for state, counting in [('|2,0,0>', 50), ('|1,1,0>', 25), ('|0,0,2>', 25)]:
+            results.set_counting(state, counting)
+        self.assertEqual(self.variance_calculator.calculate_variance_of_expected_variance_estimate(results, 3), 0.0)
+
+    def test_calculate_expected_variances_from_gram_matrix_and_interferometers(self):
+        gram_matrix = [[1, 0.3, 0.5], [0.3, 1, 0.2], [0.5, 0.2, 1]]
+        circuits = generate_random_abstract_circuit_stack(4, 3, np.random.default_rng(0))
+        result = Variance.calculate_expected_variances_from_gram_matrix_and_interferometers(gram_matrix, circuits)
+        expected = [Variance.calculate_expected_variance_from_gram_matrix_and_interferometer(gram_matrix, circuit.m, 3) for circuit in circuits]
+        np.testing.assert_array_almost_equal(result, expected)
+
+    def test_execute_experiments_variance(self):
+        circuits = generate_random_abstract_circuit_stack(3, 3, np.random.default_rng(1))
+        with patch.object(Variance, 'calculate_expected_variance', return_value=0.5):
+            result = self.variance_calculator.execute_experiments_variance(circuits)
+        self.assertEqual(self.device.execute_experiment.call_count, 3)
+        np.testing.assert_array_equal(result, [0.5, 0.5, 0.5])
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,3 +1,5 @@
 from .test_circuit_helpers import *
 from .test_quandela_device import *
-from .test_quandela_tomography import *
\ No newline at end of file
+from .test_quandela_tomography import *
+from .test_backend_selection import *
+from .test_enhanced_analyzer import *
\ No newline at end of file
@@ -0,0 +1,79 @@
+import unittest
+import os
+import tempfile
+
+from base.circuit_helpers import generate_fourier_transform_circuit
+from base.devices import DeviceMode
+from quandela.backend_selection import BackendRecommendations, BackendSelector, estimate_backend_costs
+from quandela.quandela_devices import AutoQuandelaDevice, QuandelaDeviceFactory, QuandelaLocalDevices
+
+
+class TestBackendRecommendations(unittest.TestCase):
+
+    def setUp(self):
+        self.recommendations = BackendRecommendations()
+        self.recommendations.add(2, 2, DeviceMode.SAMPLER, "SLOS", 0.01)
+        self.recommendations.add(4, 4, DeviceMode.SAMPLER, "MPS", 0.02)
+        self.recommendations.add(4, 4, DeviceMode.ANALYZER, "Naive", 0.03)
+
+    def test_recommend(self):
+        self.assertEqual(self.recommendations.recommend(2, 2, DeviceMode.SAMPLER), "SLOS")
+        # The smallest measured workload covering the request, or the largest one
+        self.assertEqual(self.recommendations.recommend(3, 2, DeviceMode.SAMPLER), "MPS")
+        self.assertEqual(self.recommendations.recommend(8, 8, DeviceMode.SAMPLER), "MPS")
+        self.assertEqual(self.recommendations.recommend(1, 1, DeviceMode.ANALYZER), "Naive")
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "table.json")
+            self.recommendations.save(path)
+            loaded = BackendRecommendations.load(path)
+        self.assertEqual(loaded.to_rows(), self.recommendations.to_rows())
+
+    def test_factory_consults_the_table(self):
+        self.assertIsNone(QuandelaDeviceFactory().recommend_local_backend(2, 2, DeviceMode.SAMPLER))
+        factory = QuandelaDeviceFactory(self.recommendations)
+        self.assertEqual(factory.recommend_local_backend(2, 2, DeviceMode.SAMPLER), "SLOS")
+
+
+class TestBackendSelector(unittest.TestCase):
+
+    def test_costs(self):
+        self.assertNotIn("CliffordClifford2017", estimate_backend_costs(3, 3, DeviceMode.ANALYZER, 1000))
+        self.assertEqual(BackendSelector().select(3, 3, DeviceMode.SAMPLER, 1000)[0], "SLOS")
+        self.assertEqual(BackendSelector().select(12, 24, DeviceMode.SAMPLER, 1000)[0], "CliffordClifford2017")
+        self.assertEqual(BackendSelector().select(12, 24, DeviceMode.ANALYZER, 1000)[0], "SLOS")
+
+    def test_available(self):
+        backend, reasoning = BackendSelector(available=["Naive"]).select(3, 3, DeviceMode.SAMPLER, 1000)
+        self.assertEqual(backend, "Naive")
+        self.assertIn("3 photons in 3 modes", reasoning)
+        with self.assertRaises(ValueError):
+            BackendSelector(available=[]).select(3, 3, DeviceMode.SAMPLER, 1000)
+
+    def test_measured_recommendation_first(self):
+        recommendations = BackendRecommendations()
+        recommendations.add(4, 4, DeviceMode.SAMPLER, "MPS")
+        selector = BackendSelector(recommendations)
+        self.assertEqual(selector.select(3, 3, DeviceMode.SAMPLER, 1000)[0], "MPS")
+        # Workloads bigger than every measured one fall back to the cost model
+        self.assertEqual(selector.select(5, 5, DeviceMode.SAMPLER, 1000)[0], "SLOS")
+
+
+class TestAutoQuandelaDevice(unittest.TestCase):
+
+    def test_auto_device(self):
+        device = QuandelaDeviceFactory().create_local_device(QuandelaLocalDevices.AUTO.value, DeviceMode.SAMPLER)
+        self.assertIsInstance(device, AutoQuandelaDevice)
+
+        with self.assertLogs(level="INFO") as logs:
+            results = device.execute_experiment('|1,1>', generate_fourier_transform_circuit(2))
+            device.execute_experiment('|1,1>', generate_fourier_transform_circuit(2))
+            device.execute_experiment('|1,0>', generate_fourier_transform_circuit(2))
+        self.assertEqual(device.backend, "SLOS")
+        self.assertAlmostEqual(sum(results.get_probability(state) for state in results.get_probability_states()), 1)
+        # The choice is logged again only when the input state changes
+        self.assertEqual(len([line for line in logs.output if "[Auto backend]" in line]), 2)
+
+if __name__ == '__main__':
+    unittest.main()
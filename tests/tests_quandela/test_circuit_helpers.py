@@ -25,8 +25,17 @@ from quandela.circuit_helpers import (
     generate_random_circuit_cut_unused_parameters,
     extract_parameters_from_random_circuit,
     generate_parameters_from_random_circuit,
-    randomize_parameters_from_perceval_circuit
+    randomize_parameters_from_perceval_circuit,
+    mzi_mesh_modes,
+    sample_mzi_phases,
+    create_mzi_mesh_circuit,
+    generate_haar_random_mzi_circuit,
+    fingerprint_perceval_circuit,
+    generate_fourier_butterfly_circuit
 )
+from base.circuit_helpers import fourier_matrix
+from base.abstract_circuit import AbstractCircuit
+from base.fingerprints import fingerprint_state
 
 class TestCircuitHelpers(unittest.TestCase):
 
@@ -89,6 +98,18 @@ class TestCircuitHelpers(unittest.TestCase):
         result = generate_fourier_transform_circuit(4)
         self.assertIsInstance(result, pcvl.Circuit)
     
+    def test_generate_fourier_butterfly_circuit(self):
+        for dimension in (1, 2, 4, 8, 16):
+            unitary = np.array(generate_fourier_butterfly_circuit(dimension).compute_unitary())
+            np.testing.assert_array_almost_equal(unitary, fourier_matrix(dimension))
+        with self.assertRaises(ValueError):
+            generate_fourier_butterfly_circuit(6)
+
+    def test_generate_fourier_transform_circuit_returns_copies(self):
+        first = generate_fourier_transform_circuit(4)
+        self.assertIsNot(first, generate_fourier_transform_circuit(4))
+        np.testing.assert_array_almost_equal(np.array(first.compute_unitary()), fourier_matrix(4))
+
     def test_cut_unused_parameters(self):
         circuit = create_generic_circuit(4)
         result = cut_unused_parameters(circuit)
@@ -122,6 +143,34 @@ class TestCircuitHelpers(unittest.TestCase):
         self.assertEqual(len(result), 9)
         self.assertTrue(all(isinstance(p, float) for p in result))
 
+    def test_generate_parameters_from_random_circuit_any_number_of_modes(self):
+        for number_of_modes in range(2, 8):
+            result = generate_parameters_from_random_circuit(number_of_modes, np.random.default_rng(number_of_modes))
+            self.assertEqual(len(result), (number_of_modes - 1) ** 2)
+
+    def test_extract_parameters_matches_generated_parameters(self):
+        internal, external = sample_mzi_phases(5, np.random.default_rng(4))
+        circuit = create_mzi_mesh_circuit(5, internal, external)
+        expected = generate_parameters_from_random_circuit(5, np.random.default_rng(4))
+        np.testing.assert_array_almost_equal(extract_parameters_from_random_circuit(circuit), expected)
+
+    def test_mzi_mesh_modes(self):
+        self.assertEqual(mzi_mesh_modes(4), [0, 1, 0, 2, 1, 0])
+
+    def test_haar_random_mzi_circuit_moments(self):
+        # Entries of Haar random unitaries satisfy E|U_ij|^4 = 2/(m(m+1)) and E|U_00|^2|U_11|^2 = 1/(m^2-1)
+        rng = np.random.default_rng(5)
+        unitaries = np.array([np.array(generate_haar_random_mzi_circuit(3, rng).compute_unitary()) for _ in range(4000)])
+        squared = np.abs(unitaries) ** 2
+        np.testing.assert_allclose(np.mean(squared ** 2, axis=0), np.full((3, 3), 1 / 6), atol=0.01)
+        self.assertAlmostEqual(np.mean(squared[:, 0, 0] * squared[:, 1, 1]), 1 / 8, delta=0.01)
+
+    def test_fingerprints_match_across_representations(self):
+        circuit = create_mzi_mesh_circuit(3, [0.1, 0.2, 0.3], [0.4, 0.5, 0.6], False)
+        abstract = AbstractCircuit(3, np.array(circuit.compute_unitary()))
+        self.assertEqual(fingerprint_perceval_circuit(circuit), abstract.fingerprint())
+        self.assertEqual(fingerprint_state(pcvl.BasicState("|1,0,1>")), fingerprint_state("|1, 0, 1>"))
+
     def test_randomize_parameters_from_perceval_circuit(self):
         circuit = generate_random_circuit(4)
         result = randomize_parameters_from_perceval_circuit(circuit, 2)
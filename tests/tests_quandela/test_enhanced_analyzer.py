@@ -0,0 +1,58 @@
+import unittest
+import perceval as pcvl
+import numpy as np
+
+from quandela.enchancedanalyzer import EnhancedAnalyzer
+
+def make_analyzer(input_states, mapping=None):
+    # The assembly only needs the input states and the mapping, not a processor
+    analyzer = EnhancedAnalyzer.__new__(EnhancedAnalyzer)
+    analyzer.input_states_list = input_states
+    analyzer._mapping = mapping or {}
+    return analyzer
+
+class TestEnhancedAnalyzer(unittest.TestCase):
+
+    def setUp(self):
+        self.first = pcvl.BasicState([1, 0])
+        self.second = pcvl.BasicState([0, 1])
+        self.both = pcvl.BasicState([1, 1])
+
+    def test_outputs_are_aligned_across_inputs(self):
+        analyzer = make_analyzer([self.first, self.second])
+        probs_res = {self.first: {self.first: 0.5, self.second: 0.5}, self.second: {self.both: 0.75, self.second: 0.25}}
+        output = analyzer.assemble_distribution(probs_res, [1, 0.5])
+
+        self.assertEqual(output['output_states'], [self.first, self.second, self.both])
+        np.testing.assert_allclose(output['results'], [[0.5, 0.5, 0], [0, 0.25, 0.75]])
+        self.assertEqual(output['performance'], 0.5)
+        self.assertEqual(analyzer.output_states_list, output['output_states'])
+
+    def test_normalize(self):
+        analyzer = make_analyzer([self.first, self.second])
+        probs_res = {self.first: {self.first: 0.2, self.second: 0.2}, self.second: {self.second: 0.0}}
+        output = analyzer.assemble_distribution(probs_res, [1, 1], normalize=True)
+        np.testing.assert_allclose(output['results'], [[0.5, 0.5], [0, 0]])
+
+    def test_error_rate(self):
+        analyzer = make_analyzer([self.first, self.second], {self.first: "0", self.second: "1"})
+        probs_res = {self.first: {self.first: 0.3, self.second: 0.1}, self.second: {self.first: 0.2, self.second: 0.6}}
+        output = analyzer.assemble_distribution(probs_res, [1, 1], expected={"0": "0", self.second: self.second})
+
+        expected_error = ((1 - 0.3 / 0.4) + (1 - 0.6 / 0.8)) / 2
+        self.assertAlmostEqual(output['error_rate'], expected_error)
+        self.assertAlmostEqual(output['fidelity'], 1 - expected_error)
+        np.testing.assert_allclose(output['results'].sum(axis=1), [1, 1])
+
+    def test_expected_output_never_produced(self):
+        analyzer = make_analyzer([self.first])
+        output = analyzer.assemble_distribution({self.first: {self.first: 1.0}}, [1], expected={self.first: self.both})
+        self.assertAlmostEqual(output['error_rate'], 1)
+
+    def test_missing_expectation(self):
+        analyzer = make_analyzer([self.first])
+        with self.assertRaises(ValueError):
+            analyzer.assemble_distribution({self.first: {self.first: 1.0}}, [1], expected={self.second: self.second})
+
+if __name__ == '__main__':
+    unittest.main()
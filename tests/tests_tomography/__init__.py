@@ -1,3 +1,5 @@
 from .test_device_characterizer import *
 from .test_estimate_overlaps import *
-from .test_device_characterizer import *
\ No newline at end of file
+from .test_device_characterizer import *
+from .test_characterization_cache import *
+from .test_tomography_archive import *
\ No newline at end of file
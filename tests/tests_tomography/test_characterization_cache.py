@@ -0,0 +1,98 @@
+import unittest
+import tempfile
+from unittest.mock import MagicMock
+import numpy as np
+
+from base.abstract_circuit import AbstractCircuit
+from base.circuit_helpers import generate_fourier_transform_circuit
+from base.devices import Device
+from base.results import StatesAndProbabilities
+from base.state_generation_helpers import generate_state_from_list, state_to_list
+from tomography.characterization_cache import CharacterizationCache, DriftProbe
+from tomography.process_tomography_methods import ProcessTomographyMethod
+from tomography.process_tomography_quandela import DeviceCharacterizer
+from tomography.tomography_probers import DeviceProcessTomographyProber
+
+
+def transmission_results(row):
+    results = StatesAndProbabilities ()
+    for mode, probability in enumerate (row):
+        results.set_probability (generate_state_from_list ([1 if j == mode else 0 for j in range (len (row))]), probability)
+    return results
+
+
+class TestCharacterizationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.circuit = generate_fourier_transform_circuit(3)
+        self.taus = np.abs(self.circuit.m)
+
+    def test_store_and_lookup(self):
+        cache = CharacterizationCache()
+        self.assertIsNone(cache.lookup(self.circuit))
+        cache.store(self.circuit, self.circuit.m, self.circuit.m, 3.0, self.taus, timestamp=1.0)
+        cache.store(self.circuit, self.circuit.m, 2 * self.circuit.m, 2.5, self.taus, timestamp=2.0)
+        record = cache.lookup(self.circuit)
+        self.assertEqual(record.timestamp, 2.0)
+        self.assertEqual(record.distance, 2.5)
+        self.assertIsNone(cache.lookup(AbstractCircuit(3)))
+
+    def test_max_age(self):
+        cache = CharacterizationCache()
+        cache.store(self.circuit, self.circuit.m, self.circuit.m, 3.0, self.taus, timestamp=1.0)
+        self.assertIsNone(cache.lookup(self.circuit, max_age=10))
+        self.assertIsNotNone(cache.lookup(self.circuit))
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as directory:
+            CharacterizationCache(directory).store(self.circuit, self.circuit.m, self.circuit.m, 3.0, self.taus)
+            record = CharacterizationCache(directory).lookup(self.circuit)
+            np.testing.assert_array_almost_equal(record.rebuilt, self.circuit.m)
+            np.testing.assert_array_almost_equal(record.taus, self.taus)
+
+            cache = CharacterizationCache(directory)
+            cache.invalidate(self.circuit)
+            self.assertIsNone(CharacterizationCache(directory).lookup(self.circuit))
+
+
+class TestDriftProbe(unittest.TestCase):
+
+    def setUp(self):
+        self.circuit = generate_fourier_transform_circuit(3)
+        self.taus = np.abs(self.circuit.m)
+        self.device = MagicMock(spec=Device)
+
+    def test_no_drift(self):
+        self.device.execute_experiment.side_effect = lambda state, circuit: transmission_results(self.taus [state_to_list (state).index (1)] ** 2)
+        probe = DriftProbe(self.device, 3, number_of_probes=2)
+        self.assertFalse(probe.has_drifted(self.circuit, self.taus))
+        self.assertEqual(self.device.execute_experiment.call_count, 2)
+        self.assertAlmostEqual(probe.last_distance, 0)
+
+    def test_drift(self):
+        self.device.execute_experiment.return_value = transmission_results([1, 0, 0])
+        probe = DriftProbe(self.device, 3)
+        self.assertTrue(probe.has_drifted(self.circuit, self.taus))
+
+    def test_missing_taus(self):
+        probe = DriftProbe(self.device, 3)
+        self.assertTrue(probe.has_drifted(self.circuit, None))
+        self.device.execute_experiment.assert_not_called()
+
+
+class TestDeviceCharacterizerWithCache(unittest.TestCase):
+
+    def test_reuses_cached_characterization(self):
+        tomography_device = MagicMock(spec=DeviceProcessTomographyProber)
+        process_tomography_method = MagicMock(spec=ProcessTomographyMethod)
+        process_tomography_method.recover_state.return_value = generate_fourier_transform_circuit(3).m
+        characterizer = DeviceCharacterizer(3, tomography_device, process_tomography_method, cache=CharacterizationCache())
+
+        first = characterizer.characterize_device()
+        second = characterizer.characterize_device()
+
+        tomography_device.make_experimental_bunch.assert_called_once()
+        np.testing.assert_array_almost_equal(first[1], second[1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@ from perceval import Matrix
 import cmath
 
 from base.circuit_helpers import random_GramMatrix_three_modes, random_preparation
+from base.abstract_circuit import AbstractCircuit
 from tomography.estimating_overlaps import GramMatrixFromVariance
 
 class TestGramMatrixFromVariance(unittest.TestCase):
@@ -46,5 +47,53 @@ class TestGramMatrixFromVariance(unittest.TestCase):
         result = self.variance_calculator.calculate_expected_variance(gram_matrix, interferometer)
         self.assertIsInstance(result, float)
 
+    def test_calculate_coefficient_rows(self):
+        matrices = [random_preparation(4) for _ in range(6)]
+        rows = self.variance_calculator.calculate_coefficient_rows(matrices, 4)
+        self.assertEqual(rows.shape, (6, 6))
+        for matrix, row in zip(matrices, rows):
+            expected = self.variance_calculator.to_vector(self.variance_calculator.calculate_variable_coefficients(matrix, 4), 4)
+            np.testing.assert_array_almost_equal(row, expected)
+            # (0, 1) is the first unknown, with coefficient 2/n sum_i |U_i0|^2 |U_i1|^2
+            self.assertAlmostEqual(row[0], 0.5 * sum(abs(matrix[i][0])**2 * abs(matrix[i][1])**2 for i in range(4)))
+
+    def test_calculate_right_hand_sides(self):
+        matrices = [random_preparation(3) for _ in range(3)]
+        result = self.variance_calculator.calculate_right_hand_sides(matrices, [0.5, 0.6, 0.7], 3)
+        expected = [self.variance_calculator.sum_all(matrix, variance, 3) for matrix, variance in zip(matrices, [0.5, 0.6, 0.7])]
+        np.testing.assert_array_almost_equal(result, expected)
+
+    def test_find_overlaps_weighted_least_squares(self):
+        gram_matrix = np.array([[1, 0.3, 0.5], [0.3, 1, 0.7], [0.5, 0.7, 1]])
+        matrices = [random_preparation(3) for _ in range(8)]
+        pairs = [(matrix, self.variance_calculator.calculate_expected_variance(gram_matrix, matrix)) for matrix in matrices]
+        overlaps, covariance = self.variance_calculator.find_overlaps_weighted_least_squares(pairs, 3, [1e-4] * 8)
+        np.testing.assert_array_almost_equal(overlaps, [0.3, 0.5, 0.7])
+        self.assertEqual(covariance.shape, (3, 3))
+        self.assertTrue(np.all(np.diag(covariance) > 0))
+
+        overlaps, covariance = self.variance_calculator.find_overlaps_weighted_least_squares(pairs, 3, [0.0] * 8)
+        np.testing.assert_array_almost_equal(overlaps, [0.3, 0.5, 0.7])
+        np.testing.assert_array_equal(covariance, np.zeros((3, 3)))
+
+    def test_find_overlaps_weighted_least_squares_indeterminate(self):
+        pairs = [(np.eye(3), 0.5) for _ in range(4)]
+        with self.assertRaises(Exception):
+            self.variance_calculator.find_overlaps_weighted_least_squares(pairs, 3)
+
+    def test_select_preparations(self):
+        candidates = [random_preparation(3) for _ in range(20)]
+        selected = self.variance_calculator.select_preparations(candidates, 4, 3)
+        self.assertEqual(len(selected), 4)
+        self.assertEqual(len(set(selected)), 4)
+        self.assertTrue(np.isfinite(self.variance_calculator.calculate_condition_number([candidates[i] for i in selected], 3)))
+        with self.assertRaises(ValueError):
+            self.variance_calculator.select_preparations(candidates, 2, 3)
+
+    def test_design_preparations(self):
+        circuits = self.variance_calculator.design_preparations(3, number_of_candidates=12)
+        self.assertEqual(len(circuits), 3)
+        self.assertTrue(all(isinstance(circuit, AbstractCircuit) for circuit in circuits))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from base.results_archive import ResultsArchive
+from tomography.process_tomography_methods import SuperStableMethod
+from tomography.tomography_archive import indexes_to_state, load_tomography_results, save_tomography_results
+
+def fourier_tomography_results(number_of_modes):
+    unitary = np.fft.fft(np.eye(number_of_modes)) / np.sqrt(number_of_modes)
+    single = {str([k]): {str([j]): float(abs(unitary[j][k]) ** 2) for j in range(number_of_modes)} for k in range(number_of_modes)}
+    double = {}
+    for k in range(number_of_modes):
+        for h in range(k + 1, number_of_modes):
+            outputs = {}
+            for j in range(number_of_modes):
+                for g in range(j, number_of_modes):
+                    permanent = unitary[j][k] * unitary[g][h] + unitary[j][h] * unitary[g][k]
+                    outputs[str([j, g])] = float(abs(permanent) ** 2 / (2 if j == g else 1))
+            double[str([k, h])] = outputs
+    return number_of_modes, single, double
+
+class TestTomographyArchive(unittest.TestCase):
+
+    def test_indexes_to_state(self):
+        self.assertEqual(indexes_to_state("[0, 2]", 3), "|1,0,1>")
+        self.assertEqual(indexes_to_state("[1, 1]", 3), "|0,2,0>")
+
+    def test_round_trip(self):
+        number_of_modes, single, double = fourier_tomography_results(3)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tomography.npz")
+            save_tomography_results(path, number_of_modes, single, double, {"circuit": "fourier"})
+            self.assertEqual(ResultsArchive(path).metadata, {"circuit": "fourier", "number_of_modes": 3})
+            loaded = load_tomography_results(path)
+
+        self.assertEqual(loaded, (number_of_modes, single, double))
+        np.testing.assert_allclose(SuperStableMethod(*loaded).recover_state(), SuperStableMethod(number_of_modes, single, double).recover_state())
+
+if __name__ == '__main__':
+    unittest.main()